@@ -10,7 +10,9 @@ import os
 import numpy as np
 from scitools import prange, Plot
 from qsim import pauli, ZERO, kron, Circuit, VqeSolver
-from qsim.dmft import gf_greater, gf_lesser
+from qsim.core.backends import PrefixCache
+from qsim.core.evolution import Propagator
+from qsim.dmft import measure_correlators, greens_function
 from qsim.dmft import fit_gf_measurement, print_popt, get_gf_fit_data, get_gf_spectral_data
 from dmft import TwoSiteSiam, impurity_gf_ref
 
@@ -93,8 +95,18 @@ def get_ground_state(siam, file=STATE_FILE, new=False):
 # =========================================================================
 
 
-def _measure(gs, xy_arg, b_arg, step, alpha, beta, imag=True, shots=None):
+def trotter_step(xy_arg, b_arg):
+    c = Circuit(4, 0)
+    c.xy([[0, 1], [2, 3]], xy_arg)
+    c.b([0, 2], b_arg)
+    return c
+
+
+def _measure(gs, xy_arg, b_arg, step, alpha, beta, imag=True, shots=None, cache=None, target=None):
     c = Circuit(5, 1)
+    if cache is not None:
+        # Circuits of consecutive time steps share their prefix up to the last step
+        c.enable_prefix_cache(cache)
     c.h(0)
     c.add_gate(f"c{alpha.upper()}", qubits=1, con=0, trigger=0)
     for i in range(step):
@@ -103,6 +115,13 @@ def _measure(gs, xy_arg, b_arg, step, alpha, beta, imag=True, shots=None):
 
     c.add_gate(f"c{beta.upper()}", qubits=1, con=0, trigger=1)
     c.h(0)
+    if target is not None:
+        # Sample the ancilla until the standard error of its expectation reaches the target
+        if imag:
+            c.mz(0)
+        else:
+            c.my(0)
+        return c.estimate(0, target, state=gs).value
     c.run_circuit(state=gs)
     if shots is None:
         return c.expectation(sz, 0) if imag else c.expectation(sy, 0)
@@ -113,26 +132,33 @@ def _measure(gs, xy_arg, b_arg, step, alpha, beta, imag=True, shots=None):
         return np.mean(x)
 
 
-def measure_data(siam, gs, nt, tmax, imag=True, shots=None):
+def measure_data(siam, gs, nt, tmax, imag=True, shots=None, target=None):
     n = nt + 1
     dt = tmax / nt
     b_arg = dt * siam.u / 4
     xy_arg = dt * siam.v / 2
     times = np.arange(n) * dt
     data = np.zeros((n, 4), "complex")
+    if shots is None and target is None:
+        # Evolve the system state (without the ancilla) once for all time steps
+        prop = Propagator(trotter_step(xy_arg, b_arg))
+        data[:] = measure_correlators(prop, gs.reshape(2, -1)[0], nt, imag=imag)
+        return times, data
+    # Checkpoint the state after each time step (two instructions)
+    cache = PrefixCache(interval=2)
     header = "Measuring " + ("real" if imag is False else "imaginary")
     for step in prange(n, header=header):
-        xx = _measure(gs, xy_arg, b_arg, step, "x", "x", imag, shots)
-        xy = _measure(gs, xy_arg, b_arg, step, "x", "y", imag, shots)
-        yx = _measure(gs, xy_arg, b_arg, step, "y", "x", imag, shots)
-        yy = _measure(gs, xy_arg, b_arg, step, "y", "y", imag, shots)
+        xx = _measure(gs, xy_arg, b_arg, step, "x", "x", imag, shots, cache, target)
+        xy = _measure(gs, xy_arg, b_arg, step, "x", "y", imag, shots, cache, target)
+        yx = _measure(gs, xy_arg, b_arg, step, "y", "x", imag, shots, cache, target)
+        yy = _measure(gs, xy_arg, b_arg, step, "y", "y", imag, shots, cache, target)
         data[step] = [xx, xy, yx, yy]
     return times, data
 
 
-def get_measurement_data(siam, gs, nt, tmax, file, imag=True, shots=None, new=False):
+def get_measurement_data(siam, gs, nt, tmax, file, imag=True, shots=None, new=False, target=None):
     if new or not os.path.isfile(file):
-        times, data = measure_data(siam, gs, nt, tmax, imag, shots)
+        times, data = measure_data(siam, gs, nt, tmax, imag, shots, target)
         print("Saving data...")
         np.savez(file, times=times, data=data)
         return times, data
@@ -147,22 +173,12 @@ def get_measurement_data(siam, gs, nt, tmax, file, imag=True, shots=None, new=Fa
 # ========================================================================
 
 
-def greens_function(data):
-    n = data.shape[0]
-    gf = np.zeros(n, dtype="complex")
-    for i in range(n):
-        xx, xy, yx, yy = data[i]
-        gf_g = gf_greater(xx, yx, xy, yy)
-        gf_l = gf_lesser(xx, xy, yx, yy)
-        gf[i] = gf_g - gf_l
-    return gf
-
-
-def measure_gf_imag(siam, nt, tmax, shots=None, new_state=True, new_data=True):
+def measure_gf_imag(siam, nt, tmax, shots=None, new_state=True, new_data=True, target=None):
     state_file = STATE_FILE
     data_file = DATA_IM_FILE
     gs = get_ground_state(siam, new=new_state, file=state_file)
-    times, data_im = get_measurement_data(siam, gs, nt, tmax, imag=True, shots=shots, new=new_data, file=data_file)
+    times, data_im = get_measurement_data(siam, gs, nt, tmax, imag=True, shots=shots,
+                                          new=new_data, file=data_file, target=target)
     return times, -greens_function(data_im).imag
 
 
@@ -8,8 +8,13 @@ version: 1.0
 """
 from .utils import *
 from .gates import *
-from .backends import StateVector
+from .backends import StateVector, BatchedStateVector, SnapshotStore
 from .register import Qubit, Clbit, QuRegister, ClRegister
 from .instruction import Gate, Measurement, ParameterMap
-from .circuit import Circuit, Result
+from .table import InstructionTable
+from .compiler import CircuitPlan, FusedGate
+from .result import Result
+from .circuit import Circuit
+from .evolution import Propagator
+from .statistics import RunningStatistics, ShotStream, Estimate
 from .visuals import *
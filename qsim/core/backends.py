@@ -7,12 +7,273 @@ project: qsim
 version: 1.0
 """
 import numpy as np
+from collections import OrderedDict
 import scipy.linalg as la
-from itertools import product
 from .utils import ZERO, ONE, Basis, kron, expectation, get_projector
 from .utils import EIGVALS, EV_X, EV_Y, EV_Z
 from .register import Qubit, QuRegister
-from .gates import GATE_DICT
+from .gates import GATE_DICT, GateSpec, register_gate
+from .kernels import as_tensor, apply_matrix, apply_controlled, apply_diagonal, apply_permutation
+from .kernels import marginal_probabilities, sample_indices
+from .kernels import is_pauli, is_pauli_sum, pauli_expectation, pauli_sum_expectation
+
+
+def gate_kernels(gate):
+    """ Resolves the kernel calls applying a Gate-object to a state vector.
+
+    The kernel is selected from the metadata of the gate in the gate registry: Gates
+    which are diagonal in the computational basis are applied as element-wise
+    multiplication with their local diagonal. Gates which permute the computational
+    basis states (X, Y, SWAP and their controlled versions) only reorder the amplitudes.
+    All other gates are applied by contracting their local matrices.
+
+    Parameters
+    ----------
+    gate: Gate
+        The Gate-instruction.
+
+    Returns
+    -------
+    kernels: list of tuple of (callable, tuple)
+        The kernel functions and their arguments following the state and the number of qubits.
+    """
+    con, trigger = gate.con_indices, gate.con_trigger
+    kernel = gate.kernel
+    if kernel == "diagonal":
+        return [(apply_diagonal, (diag, qubits, con, trigger))
+                for qubits, diag in gate.local_diagonals()]
+    elif kernel == "permutation":
+        return [(apply_permutation, (perm, phases, qubits, con, trigger))
+                for qubits, perm, phases in gate.local_permutations()]
+    elif gate.is_controlled:
+        return [(apply_controlled, (matrix, qubits, con, trigger))
+                for qubits, matrix in gate.local_matrices()]
+    return [(apply_matrix, (matrix, qubits)) for qubits, matrix in gate.local_matrices()]
+
+
+def apply_kernels(amp, n, kernels, inplace=False):
+    """ Applies resolved kernel calls to one or more state vectors.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state(s).
+    n: int
+        Number of qubits of the state(s).
+    kernels: list of tuple of (callable, tuple)
+        The kernel functions and their arguments, see 'gate_kernels'.
+    inplace: bool, optional
+        Flag if the kernels may write into 'amp', see 'kernels.apply_diagonal'.
+        By default a new array is returned and 'amp' is left unchanged.
+
+    Returns
+    -------
+    amp: (..., N) np.ndarray
+    """
+    for func, args in kernels:
+        if func is apply_matrix:
+            # The contraction always returns a new array
+            out = func(amp, n, *args)
+        else:
+            out = func(amp, n, *args, inplace=inplace)
+        # After the first kernel the array is owned by this call and can be updated in place
+        inplace = inplace or out is not amp
+        amp = out
+    return amp
+
+
+def apply_gate(amp, n, gate, inplace=False):
+    """ Applies a Gate-object to one or more state vectors using the local gate matrices.
+
+    See Also
+    --------
+    gate_kernels
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state(s).
+    n: int
+        Number of qubits of the state(s).
+    gate: Gate
+        The Gate-instruction to apply.
+    inplace: bool, optional
+        Flag if the kernels may write into 'amp', see 'apply_kernels'.
+        By default a new array is returned and 'amp' is left unchanged.
+
+    Returns
+    -------
+    amp: (..., N) np.ndarray
+    """
+    return apply_kernels(amp, n, gate_kernels(gate), inplace)
+
+
+# =========================================================================
+#                             SNAPSHOTS
+# =========================================================================
+
+
+class SnapshotStore:
+    """ Ring buffer of state vector snapshots with a fixed capacity.
+
+    The snapshots are stored in a preallocated (capacity, N) array, which is allocated
+    when the first snapshot is saved. If the capacity is reached, the oldest snapshot
+    is overwritten. Optionally the buffer can be memory-mapped to a .npy file.
+    A store with a capacity of 0 discards all snapshots and never allocates a buffer.
+    """
+
+    def __init__(self, capacity=10, file=None):
+        if capacity < 0:
+            raise ValueError(f"Capacity of snapshot store must not be negative: {capacity}")
+        self.capacity = capacity
+        self.file = file
+        self.count = 0
+        self._buffer = None
+
+    def _allocate(self, n):
+        shape = (self.capacity, n)
+        if self.file is None:
+            self._buffer = np.zeros(shape, dtype="complex")
+        else:
+            self._buffer = np.lib.format.open_memmap(self.file, mode="w+", dtype="complex",
+                                                     shape=shape)
+        self.count = 0
+
+    @property
+    def size(self):
+        """ int: Size of the stored state vectors """
+        return self._buffer.shape[1] if self._buffer is not None else 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def __bool__(self):
+        return self.count > 0
+
+    def _position(self, item):
+        n = len(self)
+        if not -n <= item < n:
+            raise IndexError(f"Snapshot index {item} out of range for {n} snapshots")
+        if item < 0:
+            item += n
+        return (self.count - n + item) % self.capacity
+
+    def __getitem__(self, item):
+        return np.copy(self._buffer[self._position(item)])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, amp):
+        """ Save a copy of a state vector, overwriting the oldest snapshot if the store is full.
+
+        Parameters
+        ----------
+        amp: (N) np.ndarray
+            Coefficients of the state.
+        """
+        if self.capacity == 0:
+            return
+        if self._buffer is None or self.size != len(amp):
+            self._allocate(len(amp))
+        self._buffer[self.count % self.capacity] = amp
+        self.count += 1
+
+    def clear(self):
+        """ Removes all snapshots without releasing the buffer. """
+        self.count = 0
+
+    def flush(self):
+        """ Writes the snapshots to the file if the buffer is memory-mapped. """
+        if isinstance(self._buffer, np.memmap):
+            self._buffer.flush()
+
+
+class PrefixCache:
+    """ Memory-bounded cache of intermediate states of circuits.
+
+    The states are keyed by a hash of the initial state and the instructions applied
+    to it (see 'InstructionTable.prefix_hashes'), so a circuit which shares a prefix with
+    a previously simulated circuit can resume from the longest cached state. A state is
+    checkpointed every 'interval' instructions and at the end of the cached prefix. If the
+    total memory of the stored states exceeds 'maxbytes', the least recently used states
+    are evicted. The cache can be shared by multiple circuits.
+    """
+
+    def __init__(self, maxbytes=256 * 2 ** 20, interval=16):
+        if interval < 1:
+            raise ValueError(f"Checkpoint interval must be positive: {interval}")
+        self.maxbytes = maxbytes
+        self.interval = interval
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __str__(self):
+        return (f"PrefixCache(hits={self.hits}, misses={self.misses}, size={len(self)}, "
+                f"bytes={self.nbytes})")
+
+    def is_checkpoint(self, k, stop):
+        """ bool: Flag if the state after 'k' of 'stop' instructions is checkpointed """
+        return k % self.interval == 0 or k == stop
+
+    def lookup(self, hashes):
+        """ Finds the longest prefix with a cached state.
+
+        Parameters
+        ----------
+        hashes: list of bytes
+            Hashes of all prefixes, where the k-th hash refers to the first k instructions.
+
+        Returns
+        -------
+        k: int
+            Number of instructions of the longest cached prefix. If no prefix is cached
+            'k' is 0.
+        amp: np.ndarray or None
+            Copy of the cached state after the prefix or 'None'.
+        """
+        for k in range(len(hashes) - 1, 0, -1):
+            amp = self._items.get(hashes[k])
+            if amp is not None:
+                self._items.move_to_end(hashes[k])
+                self.hits += 1
+                return k, amp.copy()
+        self.misses += 1
+        return 0, None
+
+    def store(self, key, amp):
+        """ Saves a copy of a state and evicts the least recently used states if needed.
+
+        Parameters
+        ----------
+        key: bytes
+            Hash of the prefix leading to the state.
+        amp: (N) np.ndarray
+            Coefficients of the state.
+        """
+        if key in self._items or amp.nbytes > self.maxbytes:
+            return
+        self._items[key] = amp.copy()
+        self.nbytes += amp.nbytes
+        while self.nbytes > self.maxbytes:
+            _, item = self._items.popitem(last=False)
+            self.nbytes -= item.nbytes
+
+    def clear(self):
+        """ Removes all states and resets the counters of the cache. """
+        self._items.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
 
 
 # =========================================================================
@@ -31,7 +292,8 @@ class StateVector:
         self.qubits = None
         self.basis = None
         self.amp = None
-        self.snapshots = list()
+        # Snapshots are only kept after the store has been configured
+        self.snapshots = SnapshotStore(capacity=0)
         self.set_qubits(qubits, basis, amp)
 
     def set_qubits(self, qubits, basis=None, amp=None):
@@ -89,6 +351,8 @@ class StateVector:
     @property
     def last(self):
         """ np.ndarray: The last saved snapshot of the state vector """
+        if not self.snapshots.capacity:
+            raise ValueError("Snapshots are not configured, see 'configure_snapshots'")
         return self.snapshots[-1]
 
     @property
@@ -132,14 +396,33 @@ class StateVector:
         """
         self.amp = np.load(file)
 
+    def configure_snapshots(self, capacity=10, file=None):
+        """ Configure the store of the state vector snapshots.
+
+        By default no snapshots are kept and the snapshot flags of the measurements
+        are off. The buffer of the store is only allocated after it has been configured
+        and the first snapshot is saved.
+
+        Parameters
+        ----------
+        capacity: int, optional
+            Maximal number of stored snapshots. If the capacity is reached the
+            oldest snapshot is overwritten. The default is 10.
+        file: str, optional
+            Filename of a .npy file the snapshots are memory-mapped to.
+            By default the snapshots are kept in memory.
+        """
+        self.snapshots = SnapshotStore(capacity, file)
+
     def save_snapshot(self):
-        """ Save the current state vector as snapshot. """
-        s = StateVector(self.qubits, self.basis, self.amp)
-        self.snapshots.append(s)
+        """ Save a copy of the current state vector as snapshot. """
+        if not self.snapshots.capacity:
+            raise ValueError("Snapshots are not configured, see 'configure_snapshots'")
+        self.snapshots.append(self.amp)
 
     def add_custom_gate(self, name, item):
         """ Add custom Gate to the gate-dictionary """
-        self.GATE_DICT.update({name: item})
+        register_gate(GateSpec(name.lower(), item))
 
     def density_matrix(self):
         """ Constructs the density matrix from the current state vector
@@ -204,9 +487,7 @@ class StateVector:
         -------
         proj: (N, N) np.ndarray
         """
-        parts = [np.eye(2)] * self.n_qubits
-        parts[idx] = op
-        return np.dot(kron(parts), self.amp)
+        return apply_matrix(self.amp, self.n_qubits, op, [idx])
 
     def expectation(self, op, qubit=None):
         r""" Calculates the expectation value of a given operator.
@@ -214,9 +495,18 @@ class StateVector:
         .. math::
             x = <\Psi| \hat{O} |\Psi>
 
+        Besides matrices, the operator can be given as Pauli-string (e.g. "XIZY"), as sparse
+        map of qubit indices to Pauli-operators (e.g. {0: "X", 2: "Z"}) or as weighted sum
+        of Pauli-strings (e.g. [(0.5, "XX"), (0.5, "YY")]). Pauli-operators are evaluated
+        using bit-flips and phase-masks of the state indices, no matrix is built.
+
+        See Also
+        --------
+        qsim.core.kernels.pauli_sum_expectation
+
         Parameters
         ----------
-        op: np.ndarray
+        op: np.ndarray or str or dict or list of tuple
             The exectation of this operator is caluclated
         qubit: Qubit, optional
             Qubit if the operator is a single-qubit operator.
@@ -225,10 +515,15 @@ class StateVector:
         -------
         x: float
         """
+        if is_pauli_sum(op):
+            return pauli_sum_expectation(self.amp, self.n_qubits, op)
+        if is_pauli(op):
+            if qubit is not None:
+                op = {qubit.index: op}
+            return pauli_expectation(self.amp, self.n_qubits, op)
         if qubit is not None and op.shape == (2, 2):
-            parts = [np.eye(2)] * self.n_qubits
-            parts[qubit.index] = op
-            op = kron(parts)
+            projected = apply_matrix(self.amp, self.n_qubits, op, [qubit.index])
+            return np.vdot(self.amp, projected).real
         return expectation(op, self.amp)
 
     def apply_unitary(self, u):
@@ -248,20 +543,36 @@ class StateVector:
     def apply_gate(self, gate):
         r""" Apply Gate (unitary operator) to the statevector
 
+        If a Gate-object is passed only the local matrices of the gate are constructed
+        and contracted onto the axes of the target qubits. Controlled gates are only
+        applied to the slice of the state where the control qubits match the trigger.
+        The full (N, N) matrix of the gate is never built.
+
+        The coefficients are owned by the statevector ('set' copies the input), therefore
+        the kernels update them in place where possible. Arrays obtained from 'amp'
+        before applying the gate have to be copied to keep the previous state.
+
         See Also
         --------
         StateVector.apply_unitary
+        qsim.core.kernels.apply_matrix
+        qsim.core.kernels.apply_controlled
 
         Parameters
         ----------
         gate: np.ndarray or Gate
             Unitary operator or Gate-object to apply to statevector.
         """
-        if not isinstance(gate, np.ndarray):
-            gate = gate.build_matrix(self.n_qubits)
-        self.apply_unitary(gate)
+        if isinstance(gate, np.ndarray):
+            self.apply_unitary(gate)
+        else:
+            self.amp = apply_gate(self.amp, self.n_qubits, gate, inplace=True)
 
-    def measure_qubit(self, qubit, eigvals=None, eigvecs=None, shadow=False):
+    def apply_kernels(self, kernels):
+        """ Apply resolved kernel calls (see 'gate_kernels') in place to the statevector. """
+        self.amp = apply_kernels(self.amp, self.n_qubits, kernels, inplace=True)
+
+    def measure_qubit(self, qubit, eigvals=None, eigvecs=None, shadow=False, rng=None):
         r""" Measure the state of a single qubit in a given eigenbasis.
 
         The probability .math:'p_i' of measuring each eigenstate of the measurement-eigenbasis
@@ -289,6 +600,8 @@ class StateVector:
         shadow: bool, optional
             Flag if state should remain in the pre-measurement state.
             The default is 'False'.
+        rng: np.random.Generator, optional
+            Random generator of the measurement. By default the global random state is used.
 
         Returns
         -------
@@ -313,7 +626,8 @@ class StateVector:
         if abs(p0.imag) > 1e-15:
             raise ValueError(f"Complex probability: {p0}")
         # Simulate measurement probability
-        index = int(np.random.random() > p0.real)
+        rng = np.random if rng is None else rng
+        index = int(rng.random() > p0.real)
         if index == 1:
             # Project state to other eigenstate of the measurement basis
             projector_1 = get_projector(v1)
@@ -324,7 +638,7 @@ class StateVector:
         # return corresponding eigenvalue of the measured eigenstate
         return eigvals[index].real
 
-    def measure(self, qubits, eigvals=None, eigvecs=None, shadow=False, snapshot=True):
+    def measure(self, qubits, eigvals=None, eigvecs=None, shadow=False, snapshot=False, rng=None):
         r""" Measure the state of multiple qubits in a given eigenbasis.
 
         The probability .math:'p_i' of measuring each eigenstate of the measurement-eigenbasis
@@ -354,7 +668,10 @@ class StateVector:
             The default is 'False'.
         snapshot: bool, optional
             Flag if snapshot of statevector should be saved before measurment.
-            The default is 'True'.
+            The store has to be set up with 'configure_snapshots' first.
+            The default is 'False'.
+        rng: np.random.Generator, optional
+            Random generator of the measurement. By default the global random state is used.
 
         Returns
         -------
@@ -366,50 +683,49 @@ class StateVector:
 
         # get eigenbasis of measurment operator.
         # If not specified the computational basis is used
+        rotation = None
         if eigvals is None:
-            eigvecs = np.asarray([ZERO, ONE])
             eigvals = [0, 1]
         else:
             if eigvecs is None:
                 raise ValueError("No Eigenvectors of the measurement-basis are specified "
                                  "(Don't pass any eigenvalues to use comp. basis)")
-            eigvecs = eigvecs.T
-
-        # Calculate probabilities of all posiible results
-        results = list(product([0, 1], repeat=len(qubits)))  # Result indices
-        num_res = len(results)
-        probs = np.zeros(num_res)
-        projections = np.zeros((num_res, self.n), dtype="complex")
-        eye = np.eye(2)
-        for i, res in enumerate(results):
-            # Build projector
-            parts = [eye] * self.n_qubits
-            for r, q in zip(res, qubits):
-                parts[q.index] = get_projector(eigvecs[r])
-            projector = kron(parts)
-
-            # Get projected state and calculate probability
-            projected = np.dot(projector, self.amp)
-            p = np.dot(np.conj(self.amp).T, projected)
-            projections[i] = projected
-            if abs(p.imag) > 1e-15:
-                raise ValueError(f"Complex probability: {p}")
-            probs[i] = p.real
+            rotation = np.conj(eigvecs).T
+
+        # Rotate measured qubits into the computational basis
+        indices = [q.index for q in qubits]
+        amp = self.amp
+        if rotation is not None:
+            for idx in indices:
+                amp = apply_matrix(amp, self.n_qubits, rotation, [idx])
 
         # Simulate measurement probability and get corresponding eigenvalues
-        index = np.random.choice(range(len(results)), p=probs)
-        result = [eigvals[i] for i in results[index]]
+        probs = marginal_probabilities(amp, self.n_qubits, indices)
+        rng = np.random if rng is None else rng
+        index = rng.choice(len(probs), p=probs / np.sum(probs))
+        k = len(indices)
+        bits = [(index >> (k - i - 1)) & 1 for i in range(k)]
+        result = [eigvals[b] for b in bits]
 
         # Project measurement result on the state
         if not shadow:
             # Save snapshot of state before projecting to post-measurement state
             if snapshot:
                 self.save_snapshot()
-            projected = projections[index]
-            self.amp = projected / la.norm(projected)
+            psi = as_tensor(amp, self.n_qubits)
+            for idx, b in zip(indices, bits):
+                part = [slice(None)] * self.n_qubits
+                part[idx] = 1 - b
+                psi[tuple(part)] = 0
+            amp /= np.sqrt(probs[index])
+            # Rotate back into the measurement basis
+            if rotation is not None:
+                for idx in indices:
+                    amp = apply_matrix(amp, self.n_qubits, eigvecs, [idx])
+            self.amp = amp
         return result
 
-    def measure_x(self, qubits, shadow=False, snapshot=True):
+    def measure_x(self, qubits, shadow=False, snapshot=False, rng=None):
         """ Performs a measurement of a single qubit in the x-basis.
 
         When a qubit is in the .math:'|+\rangle' (.math:'|-\rangle') state a measurement
@@ -424,16 +740,19 @@ class StateVector:
             The default is 'False'.
         snapshot: bool, optional
             Flag if snapshot of statevector should be saved before measurment.
-            The default is 'True'.
+            The store has to be set up with 'configure_snapshots' first.
+            The default is 'False'.
+        rng: np.random.Generator, optional
+            Random generator of the measurement. By default the global random state is used.
 
         Returns
         -------
         result: np.ndarray
             Eigenvalue corresponding to the measured eigenstate.
         """
-        return self.measure(qubits, EIGVALS, EV_X, shadow, snapshot)
+        return self.measure(qubits, EIGVALS, EV_X, shadow, snapshot, rng)
 
-    def measure_y(self, qubits, shadow=False, snapshot=True):
+    def measure_y(self, qubits, shadow=False, snapshot=False, rng=None):
         """ Performs a measurement of a single qubit in the y-basis.
 
         When a qubit is in the .math:'|i\rangle' (.math:'|-i\rangle') state a measurement
@@ -448,16 +767,19 @@ class StateVector:
             The default is 'False'.
         snapshot: bool, optional
             Flag if snapshot of statevector should be saved before measurment.
-            The default is 'True'.
+            The store has to be set up with 'configure_snapshots' first.
+            The default is 'False'.
+        rng: np.random.Generator, optional
+            Random generator of the measurement. By default the global random state is used.
 
         Returns
         -------
         result: np.ndarray
             Eigenvalue corresponding to the measured eigenstate.
         """
-        return self.measure(qubits, EIGVALS, EV_Y, shadow, snapshot)
+        return self.measure(qubits, EIGVALS, EV_Y, shadow, snapshot, rng)
 
-    def measure_z(self, qubits, shadow=False, snapshot=True):
+    def measure_z(self, qubits, shadow=False, snapshot=False, rng=None):
         """ Performs a measurement of a single qubit in the z-basis.
 
         When a qubit is in the .math:'|0\rangle' (.math:'|1\rangle') state a measurement
@@ -472,11 +794,173 @@ class StateVector:
             The default is 'False'.
         snapshot: bool, optional
             Flag if snapshot of statevector should be saved before measurment.
-            The default is 'True'.
+            The store has to be set up with 'configure_snapshots' first.
+            The default is 'False'.
+        rng: np.random.Generator, optional
+            Random generator of the measurement. By default the global random state is used.
 
         Returns
         -------
         result: np.ndarray
             Eigenvalue corresponding to the measured eigenstate.
         """
-        return self.measure(qubits, EIGVALS, EV_Z, shadow, snapshot)
+        return self.measure(qubits, EIGVALS, EV_Z, shadow, snapshot, rng)
+
+
+# =========================================================================
+#                          BATCHED STATEVECTOR
+# =========================================================================
+
+
+class BatchedStateVector:
+    """ Block of state vectors of the same qubits, which are evolved simultaneously.
+
+    The coefficients are stored in a (B, N) array. Each gate is applied once to the
+    whole block by contracting the local gate matrix onto the qubit axes of all states.
+    """
+
+    name = "batched_statevector"
+
+    def __init__(self, qubits, amps, basis=None):
+        self.n_qubits = 0
+        self.n = 0
+        self.qubits = None
+        self.basis = None
+        self.amp = None
+        if isinstance(qubits, QuRegister):
+            qubits = qubits.bits
+        self.qubits = qubits
+        self.n_qubits = len(qubits)
+        self.basis = basis or Basis(len(qubits))
+        self.n = 2 ** self.n_qubits
+        self.set(amps)
+
+    def set(self, amps):
+        """ Set the current state-vectors
+
+        Parameters
+        ----------
+        amps: (B, N) array_like
+            Coefficients of the states.
+        """
+        amps = np.array(amps, ndmin=2)
+        if amps.shape[1] != self.n:
+            raise ValueError(f"Dimensions dont't match: {amps.shape[1]} != {self.n}")
+        norms = la.norm(amps, axis=1)
+        if np.any(np.round(norms, decimals=10) != 1.0):
+            raise ValueError(f"States not normalized: |s|={np.round(norms, decimals=15)}")
+        self.amp = amps / norms[:, np.newaxis]
+
+    @property
+    def batch_size(self):
+        """ int: The number of state vectors in the block """
+        return self.amp.shape[0]
+
+    @property
+    def norm(self):
+        """ np.ndarray: The norms of the state vectors """
+        return la.norm(self.amp, axis=1)
+
+    def __len__(self):
+        return self.batch_size
+
+    def __getitem__(self, item):
+        return self.amp[item]
+
+    def apply_unitary(self, u):
+        """ Apply unitary operator to all state vectors of the block.
+
+        Parameters
+        ----------
+        u: (N, N) array_like
+            Unitary operator to apply to the statevectors.
+        """
+        self.amp = np.dot(self.amp, np.asarray(u).T)
+
+    def apply_gate(self, gate):
+        """ Apply Gate (unitary operator) to all state vectors of the block.
+
+        Parameters
+        ----------
+        gate: np.ndarray or Gate
+            Unitary operator or Gate-object to apply to the statevectors.
+            Gate-objects are applied in place where possible, see 'StateVector.apply_gate'.
+        """
+        if isinstance(gate, np.ndarray):
+            self.apply_unitary(gate)
+        else:
+            self.amp = apply_gate(self.amp, self.n_qubits, gate, inplace=True)
+
+    def apply_kernels(self, kernels):
+        """ Apply the resolved kernel calls (see 'gate_kernels') in place to the block. """
+        self.amp = apply_kernels(self.amp, self.n_qubits, kernels, inplace=True)
+
+    def probabilities(self, qubits=None):
+        """ Computes the probabilities of the computational basis states for each state vector.
+
+        Parameters
+        ----------
+        qubits: array_like of Qubit, optional
+            If given, the marginal probabilities of the states of these qubits are computed.
+
+        Returns
+        -------
+        probs: (B, 2^k) np.ndarray
+        """
+        if qubits is None:
+            return np.abs(self.amp) ** 2
+        return marginal_probabilities(self.amp, self.n_qubits, [q.index for q in qubits])
+
+    def expectation(self, op, qubit=None):
+        r""" Calculates the expectation values of a given operator for each state vector.
+
+        .. math::
+            x_b = <\Psi_b| \hat{O} |\Psi_b>
+
+        See Also
+        --------
+        StateVector.expectation
+
+        Parameters
+        ----------
+        op: np.ndarray or str or dict or list of tuple
+            The exectation of this operator is caluclated. Pauli-strings, sparse maps of
+            Pauli-operators and weighted sums of Pauli-strings are supported as well.
+        qubit: Qubit, optional
+            Qubit if the operator is a single-qubit operator.
+
+        Returns
+        -------
+        x: (B) np.ndarray
+        """
+        if is_pauli_sum(op):
+            return pauli_sum_expectation(self.amp, self.n_qubits, op)
+        if is_pauli(op):
+            if qubit is not None:
+                op = {qubit.index: op}
+            return pauli_expectation(self.amp, self.n_qubits, op)
+        if qubit is not None and op.shape == (2, 2):
+            projected = apply_matrix(self.amp, self.n_qubits, op, [qubit.index])
+        else:
+            projected = np.dot(self.amp, np.asarray(op).T)
+        return np.sum(np.conj(self.amp) * projected, axis=1).real
+
+    def sample(self, shots, qubits=None, rng=None):
+        """ Samples computational basis states of (a subset of) the qubits of each state vector.
+
+        Parameters
+        ----------
+        shots: int
+            Number of samples per state vector.
+        qubits: array_like of Qubit, optional
+            The sampled qubits. By default all qubits are sampled.
+        rng: np.random.Generator, optional
+            Random generator of the samples. By default the global random state is used.
+
+        Returns
+        -------
+        samples: (B, shots) np.ndarray of int
+            Indices of the sampled basis states, where the first qubit
+            corresponds to the most significant bit.
+        """
+        return sample_indices(self.probabilities(qubits), shots, rng)
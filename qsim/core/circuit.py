@@ -9,120 +9,17 @@ version: 1.0
 import numpy as np
 from scitools import Terminal
 from .register import Qubit, Clbit, QuRegister, ClRegister
-from .utils import Basis, get_info, binary_histogram, plot_binary_histogram, density_matrix
-from .backends import StateVector
+from .utils import Basis, get_info, packed_to_int
+from .backends import StateVector, BatchedStateVector, PrefixCache
+from .kernels import apply_matrix, marginal_probabilities
+from .executor import run_parallel, run_shots, seed_generator
+from .statistics import ShotStream, adaptive_estimate
+from .result import Result
+from .compiler import CircuitPlan
 from .visuals import CircuitString
 from .instruction import Instruction, ParameterMap, Gate, Measurement
-
-
-class Result:
-
-    def __init__(self, data):
-        self.data = data
-        self.basis = Basis(data.shape[1])
-
-    @classmethod
-    def laod(cls, file):
-        """ Load a measurement result from a file
-
-        Parameters
-        ----------
-        file: file-like or str
-            File or filename from which the data is loaded. If file is a string or Path,
-            a .npy extension will be appended to the file name if it does not already have one.
-
-        Returns
-        -------
-        res: Result
-        """
-        data = np.load(file)
-        return cls(data)
-
-    @property
-    def isnan(self):
-        """ bool: check if data is np.nan"""
-        return np.all(np.isnan(self.data))
-
-    @property
-    def shape(self):
-        """tuple: shape of the data array (n_measurements, n_bits)"""
-        return self.data.shape
-
-    @property
-    def n_samples(self):
-        """int: number of measurments"""
-        return self.shape[0]
-
-    @property
-    def n_bits(self):
-        """int: number of bits"""
-        return self.shape[1]
-
-    @property
-    def labels(self):
-        """list of str: Labels of the basis-states of the measured qubits"""
-        return [r"$|$" + str(x) + r"$\rangle$" for x in self.basis.state_labels]
-
-    def __bool__(self):
-        return not self.isnan
-
-    def save(self, file):
-        """ Save the measurement data to a file
-
-        Parameters
-        ----------
-        file: file-like or str
-            File or filename to which the data is saved. If file is a string or Path,
-            a .npy extension will be appended to the file name if it does not already have one.
-        """
-        np.save(file, self.data)
-
-    def binary(self):
-        """ np.ndarray: Converts measurement data to binary representation"""
-        return (-self.data + 1) / 2
-
-    def mean(self):
-        """ np.ndarray: Computes the mean of the measurement data """
-        return np.mean(self.data, axis=0)
-
-    def binary_mean(self):
-        """ np.ndarray: Computes the mean of the binary data """
-        return (-np.sign(self.mean()) + 1) / 2
-
-    def density_matrix(self):
-        _, hist = self.histogram()
-        return density_matrix(hist)
-
-    def histogram(self, normalize=True):
-        """ Computes the binary histogram of the measurement data
-
-        Parameters
-        ----------
-        normalize: bool, optional
-            Flag if the histogram should be normalized
-
-        Returns
-        -------
-        bins: np.ndarray
-        hist: np.ndarray
-        """
-        return binary_histogram(self.binary(), normalize)
-
-    def show_histogram(self, show=True, padding=0.2, color=None, alpha=0.9, scale=False,
-                       max_line=True, lc="r", lw=1):
-        bins, hist = self.histogram()
-        labels = [r"$|$" + str(x) + r"$\rangle$" for x in self.basis.state_labels]
-        plot = plot_binary_histogram(bins, hist, labels, padding, color, alpha, scale, max_line, lc, lw)
-        plot.set_labels("State", "p")
-        if show:
-            plot.show()
-        return plot
-
-    def __str__(self):
-        string = f"Measurement Result (samples={self.n_samples}):\n"
-        string += f"  Mean:   {self.mean()}\n"
-        string += f"  Binary: {self.binary_mean()}"
-        return string
+from .table import InstructionTable, MEASUREMENT, bit_indices
+from .utils import to_list
 
 
 class Circuit:
@@ -133,8 +30,10 @@ class Circuit:
             clbits = len(self.qubits)
         self.clreg = ClRegister(clbits)
         self.basis = Basis(self.n_qubits)
-        self.instructions = list()
-        self.pmap = ParameterMap.instance()
+        self.pmap = ParameterMap()
+        self.table = InstructionTable(self.qureg, self.clreg, self.pmap)
+        self.plan = None
+        self.prefix_cache = None
 
         self.state = StateVector(self.qubits, self.basis)
 
@@ -161,11 +60,11 @@ class Circuit:
     @property
     def n_params(self):
         """ int: Number of controllable parameters in the circuit """
-        return len(self.pmap.params)
+        return self.pmap.num_params
 
     @property
     def params(self):
-        """ list: List of controllable parameters in the circuit """
+        """ np.ndarray: Array of controllable parameters in the circuit """
         return self.pmap.params
 
     @property
@@ -173,17 +72,38 @@ class Circuit:
         """ list: List of arguments in the circuit """
         return self.pmap.args
 
+    @property
+    def instructions(self):
+        """ list of Instruction: Instructions of the circuit, created from the instruction table """
+        return list(self.table)
+
+    @property
+    def n_instructions(self):
+        """ int: Number of instructions in the circuit """
+        return len(self.table)
+
     @property
     def statevector(self):
         """ (N) np.ndarray: Coefficients of the current state of the circuit"""
         return self.state.amp
 
+    def __getstate__(self):
+        # The state, its snapshots and the prefix cache aren't pickled, such that
+        # only the instructions and parameters are sent to worker processes
+        state = self.__dict__.copy()
+        state["state"] = None
+        state["prefix_cache"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.state = StateVector(self.qubits, self.basis)
+
     def __getitem__(self, item):
-        return self.instructions[item]
+        return self.table[item]
 
     def __iter__(self):
-        for inst in self.instructions:
-            yield inst
+        return iter(self.table)
 
     def __repr__(self):
         return f"Circuit(qubits: {self.qubits}, clbits: {self.clbits})"
@@ -244,19 +164,90 @@ class Circuit:
         """
         self.state.load_state(file)
 
+    def configure_snapshots(self, capacity=10, file=None):
+        """ Configure the store of the state vector snapshots.
+
+        By default no snapshots are kept, no buffer is allocated and the snapshot
+        flags of the measurements are off.
+
+        See Also
+        --------
+        qsim.core.backends.StateVector.configure_snapshots
+
+        Parameters
+        ----------
+        capacity: int, optional
+            Maximal number of stored snapshots. The default is 10.
+        file: str, optional
+            Filename of a .npy file the snapshots are memory-mapped to.
+        """
+        self.state.configure_snapshots(capacity, file)
+
+    def fingerprint(self):
+        """ Computes a hash of the registers, the instructions and the current parameters.
+
+        Results of circuits with equal fingerprints can be merged, see 'Result.concat'.
+
+        Returns
+        -------
+        digest: str
+        """
+        seed = np.array([self.n_qubits, self.n_clbits]).tobytes()
+        return self.table.prefix_hashes(seed, stop=len(self.table))[-1].hex()
+
+    def enable_prefix_cache(self, cache=None, maxbytes=256 * 2 ** 20, interval=16):
+        """ Enables the caching of intermediate states for incremental re-simulation.
+
+        Runs of the circuit resume from the longest cached state whose initial state
+        and instructions match the current ones. This avoids re-simulating unchanged
+        prefixes, for example if instructions are appended or only parameters of the
+        last gates changed. Only the instructions before the first measurement are
+        cached and compiled circuits aren't cached.
+
+        See Also
+        --------
+        qsim.core.backends.PrefixCache
+
+        Parameters
+        ----------
+        cache: PrefixCache, optional
+            Cache of the states, which can be shared by multiple circuits.
+            If not given a new cache is created.
+        maxbytes: int, optional
+            Maximal memory of the cached states if a new cache is created.
+        interval: int, optional
+            Number of instructions between two checkpoints if a new cache is created.
+
+        Returns
+        -------
+        cache: PrefixCache
+        """
+        if cache is None:
+            cache = PrefixCache(maxbytes, interval)
+        self.prefix_cache = cache
+        return cache
+
+    def disable_prefix_cache(self):
+        """ Disables the caching of intermediate states. """
+        self.prefix_cache = None
+
     # =========================================================================
 
     @staticmethod
-    def add_custom_gate(name, item):
-        Gate.add_custom_gate(name, item)
+    def add_custom_gate(name, item=None, **kwargs):
+        Gate.add_custom_gate(name, item, **kwargs)
+
+    @staticmethod
+    def add_two_qubit_gate(name, func, **kwargs):
+        Gate.add_two_qubit_gate(name, func, **kwargs)
 
     def to_string(self, delim="; "):
         info = [f"qubits={self.n_qubits}", f"clbits={self.n_clbits}"]
         string = "".join([x + delim for x in info])
         lines = [string]
-        for inst in self.instructions:
-            string = inst.to_string()
-            lines.append(string)
+        for group in range(len(self.table)):
+            items = self.table.to_dict(group).items()
+            lines.append("".join(f"{key}={val}{delim}" for key, val in items))
         return "\n".join(lines)
 
     @classmethod
@@ -312,9 +303,32 @@ class Circuit:
         """
         self.pmap[idx] = arg
 
-    def add(self, inst):
-        """ Appends a configured Intruction to the instruction list of the Circuit. """
-        self.instructions.append(inst)
+    def add(self, inst, remap=None):
+        """ Appends a configured Intruction to the instruction list of the Circuit.
+
+        Instructions bound to the parameters of another circuit are copied and their
+        arguments are added to the parameters of this circuit.
+
+        Parameters
+        ----------
+        inst: Instruction
+            The instruction to add.
+        remap: dict, optional
+            Parameter slots of the other circuit mapped to the slots of this circuit,
+            see 'Instruction.rebind'. Instructions sharing a parameter keep sharing it
+            if the same dictionary is passed for all of them.
+
+        Returns
+        -------
+        inst: Instruction
+            The instruction bound to the parameters of the circuit.
+        """
+        if inst.pmap is not None and inst.pmap is not self.pmap:
+            inst = inst.rebind(self.pmap, remap)
+        else:
+            inst.bind(self.pmap)
+        self.table.append(inst)
+        self.plan = None
         return inst
 
     def add_gate(self, name, qubits, con=None, arg=None, argidx=None, n=1, trigger=1):
@@ -339,15 +353,26 @@ class Circuit:
 
         Returns
         -------
-        gate: Gate
+        gate: InstructionRef
+            Reference to the Gate, the object is only created if it is accessed.
         """
         if qubits is None:
             qubits = self.qubits
-        qubits = self.qureg.list(qubits)
-        con = self.qureg.list(con)
-        gate = Gate(name, qubits, con, arg, argidx, n, trigger)
-        self.instructions.append(gate)
-        return gate
+        if n > 1:
+            if not hasattr(qubits[0], "__len__"):
+                qubits = [qubits]
+            targets = [bit_indices(q) for q in qubits]
+        else:
+            targets = [[q] for q in bit_indices(to_list(qubits))]
+        con = bit_indices(to_list(con)) if con is not None else None
+        if arg is not None and not hasattr(arg, "__len__"):
+            arg = [arg] * len(targets)
+        if argidx is not None and not hasattr(argidx, "__len__"):
+            argidx = [argidx] * len(targets)
+        argidx = self.pmap.add(arg, argidx)
+        group = self.table.add_gate(name, targets, con, argidx, n, trigger)
+        self.plan = None
+        return self.table.ref(group)
 
     def add_measurement(self, qubits, clbits, basis=None):
         """ Configure and append a new Measurement-Instruction to the Circuit.
@@ -363,17 +388,18 @@ class Circuit:
 
         Returns
         -------
-        inst: Instruction
+        inst: InstructionRef
+            Reference to the Measurement, the object is only created if it is accessed.
         """
         if qubits is None:
             qubits = range(self.n_qubits)
         if clbits is None:
             clbits = qubits
-        qubits = self.qureg.list(qubits)
-        clbits = self.clreg.list(clbits)
-        m = Measurement("m", qubits, clbits, basis=basis)
-        self.instructions.append(m)
-        return m
+        qubits = bit_indices(to_list(qubits))
+        clbits = bit_indices(to_list(clbits))
+        group = self.table.add_measurement("m", qubits, clbits, basis)
+        self.plan = None
+        return self.table.ref(group)
 
     def i(self, qubit=None):
         """ Add an identity gate to the circuit. """
@@ -453,19 +479,15 @@ class Circuit:
 
     def xy(self, qubits, arg=0, argidx=None):
         """ Add a XY-gate to the circuit. """
-        if not hasattr(qubits[0], "__len__"):
-            qubits = [qubits]
-        qubits = [self.qureg.list(pair) for pair in qubits]
-        gate = Gate("XY", qubits, arg=arg, argidx=argidx, n=2)
-        return self.add(gate)
+        return self.add_gate("XY", qubits, arg=arg, argidx=argidx, n=2)
 
     def b(self, qubits, arg=0, argidx=None):
         """ Add a B-gate to the circuit. """
-        if not hasattr(qubits[0], "__len__"):
-            qubits = [qubits]
-        qubits = [self.qureg.list(pair) for pair in qubits]
-        gate = Gate("B", qubits, arg=arg, argidx=argidx, n=2)
-        return self.add(gate)
+        return self.add_gate("B", qubits, arg=arg, argidx=argidx, n=2)
+
+    def swap(self, qubits):
+        """ Add a SWAP-gate to the circuit. """
+        return self.add_gate("SWAP", qubits, n=2)
 
     def m(self, qubits=None, clbits=None):
         """ Add a measurment in the computational basis to the circuit"""
@@ -494,8 +516,10 @@ class Circuit:
 
         Parameters
         ----------
-        operator: np.ndarray
-            The exectation of this operator is caluclated
+        operator: np.ndarray or str or dict or list of tuple
+            The exectation of this operator is caluclated. Pauli-strings, sparse maps of
+            Pauli-operators and weighted sums of Pauli-strings are supported as well,
+            see 'StateVector.expectation'.
         qubit: Qubit or int, optional
             Qubit if the operator is a single-qubit operator.
 
@@ -529,7 +553,7 @@ class Circuit:
         qubits = self.qureg.list(qubits)
         return self.state.measure(qubits, basis)
 
-    def measure_x(self, qubits, shadow=False, snapshot=True):
+    def measure_x(self, qubits, shadow=False, snapshot=False):
         """ Performs a measurement of a single qubit in the x-basis.
 
         See Also
@@ -545,7 +569,8 @@ class Circuit:
             The default is 'False'.
         snapshot: bool, optional
             Flag if snapshot of statevector should be saved before measurment.
-            The default is 'True'.
+            The store has to be set up with 'configure_snapshots' first.
+            The default is 'False'.
 
         Returns
         -------
@@ -555,7 +580,7 @@ class Circuit:
         qubits = self.qureg.list(qubits)
         return self.state.measure_x(qubits, shadow, snapshot)
 
-    def measure_y(self, qubits, shadow=False, snapshot=True):
+    def measure_y(self, qubits, shadow=False, snapshot=False):
         """ Performs a measurement of a single qubit in the y-basis.
 
         See Also
@@ -571,7 +596,8 @@ class Circuit:
             The default is 'False'.
         snapshot: bool, optional
             Flag if snapshot of statevector should be saved before measurment.
-            The default is 'True'.
+            The store has to be set up with 'configure_snapshots' first.
+            The default is 'False'.
 
         Returns
         -------
@@ -581,7 +607,7 @@ class Circuit:
         qubits = self.qureg.list(qubits)
         return self.state.measure_y(qubits, shadow, snapshot)
 
-    def measure_z(self, qubits, shadow=False, snapshot=True):
+    def measure_z(self, qubits, shadow=False, snapshot=False):
         """ Performs a measurement of a single qubit in the z-basis.
 
         See Also
@@ -597,7 +623,8 @@ class Circuit:
             The default is 'False'.
         snapshot: bool, optional
             Flag if snapshot of statevector should be saved before measurment.
-            The default is 'True'.
+            The store has to be set up with 'configure_snapshots' first.
+            The default is 'False'.
 
         Returns
         -------
@@ -607,7 +634,66 @@ class Circuit:
         qubits = self.qureg.list(qubits)
         return self.state.measure_z(qubits, shadow, snapshot)
 
-    def run_circuit(self, state=None):
+    def compile(self, max_width=2):
+        """ Compiles the circuit into an execution plan with fused gates.
+
+        Adjacent gates acting on the same small set of qubits are fused into one local
+        unitary. The plan is used by all following runs of the circuit until a new
+        instruction is added. Gates without parameters are only built once, gates
+        depending on parameters are refreshed when new parameters are set, so the
+        plan can be executed many times with different parameter vectors.
+
+        See Also
+        --------
+        qsim.core.compiler.CircuitPlan
+
+        Parameters
+        ----------
+        max_width: int, optional
+            Maximal number of qubits a fused gate acts on. The default is 2.
+
+        Returns
+        -------
+        plan: CircuitPlan
+            The execution plan. The number of eliminated gate applications is
+            available as 'plan.n_eliminated'.
+        """
+        self.plan = CircuitPlan(self.instructions, max_width, self.pmap)
+        return self.plan
+
+    def _steps(self, cached=True):
+        """ Returns the operations of the circuit and their resolved kernel calls.
+
+        If the circuit isn't compiled the kernels are resolved from the instruction table.
+        If the prefix cache is enabled, the operations start after the longest cached prefix.
+        """
+        if self.plan is not None:
+            return self.plan.steps()
+        if cached and self.prefix_cache is not None:
+            return self._cached_steps()
+        return self.table.steps()
+
+    def _cached_steps(self):
+        cache = self.prefix_cache
+        hashes = self.table.prefix_hashes(self.state.amp.tobytes())
+        stop = len(hashes) - 1
+        start, amp = cache.lookup(hashes)
+        if amp is not None:
+            self.state.amp = amp
+        for k, step in enumerate(self.table.steps(start), start + 1):
+            yield step
+            # The step has been applied to the state when the generator is resumed
+            if k <= stop and cache.is_checkpoint(k, stop):
+                cache.store(hashes[k], self.state.amp)
+
+    @staticmethod
+    def _apply(state, op, kernels=None):
+        if kernels is None:
+            state.apply_gate(op)
+        else:
+            state.apply_kernels(kernels)
+
+    def run_circuit(self, state=None, snapshot=False, rng=None):
         """ Run the configured circuit once.
 
         After initializing the state of the circuit each of the instructions is applied to the state.
@@ -618,6 +704,11 @@ class Circuit:
         ----------
         state: array_like, optional
             State used to initialize the circuit. The default is the .math:'|0>' state.
+        snapshot: bool, optional
+            Flag if snapshots of the statevector should be saved before each measurement.
+            The default is 'False'.
+        rng: np.random.Generator, optional
+            Random generator of the measurements. By default the global random state is used.
 
         Returns
         -------
@@ -625,21 +716,138 @@ class Circuit:
         """
         self.set_state(state)
         data = np.full(self.n_clbits, np.nan)
-        for inst in self.instructions:
-            if isinstance(inst, Gate):
-                self.state.apply_gate(inst)
-            elif isinstance(inst, Measurement):
+        for inst, kernels in self._steps():
+            if isinstance(inst, Measurement):
                 eigvals, eigvecs = inst.eigenbasis()
-                values = self.state.measure(inst.qubits, eigvals, eigvecs)
+                values = self.state.measure(inst.qubits, eigvals, eigvecs, snapshot=snapshot,
+                                            rng=rng)
                 for idx, x in zip(inst.cl_indices, values):
                     data[idx] = x
+            else:
+                self._apply(self.state, inst, kernels)
         return data
 
-    def run(self, shots=1, state=None, verbose=False):
+    def run_batch(self, states):
+        """ Applies the gates of the circuit to a block of initial states at once.
+
+        Each gate is applied once to all states of the block, which amortizes the
+        construction of the gates over the number of states.
+
+        See Also
+        --------
+        qsim.core.backends.BatchedStateVector
+
+        Parameters
+        ----------
+        states: (B, N) array_like
+            Coefficients of the initial states.
+
+        Returns
+        -------
+        batch: BatchedStateVector
+            The evolved states. Expectation values, probabilities and samples
+            of all states can be computed from the block.
+        """
+        batch = BatchedStateVector(self.qubits, states, self.basis)
+        for inst, kernels in self._steps(cached=False):
+            if isinstance(inst, Measurement):
+                raise ValueError("Measurements are not supported when running a batch of states")
+            self._apply(batch, inst, kernels)
+        return batch
+
+    def terminal_measurements(self):
+        """ Returns the measurements of the circuit if all of them are at the end of the circuit.
+
+        Returns
+        -------
+        measurements: list of Measurement or None
+            The measurement-instructions of the circuit. If a gate follows a measurement
+            or a qubit is measured more than once 'None' is returned.
+        """
+        kinds = self.table.kinds
+        groups = np.flatnonzero(kinds == MEASUREMENT)
+        if len(groups) and np.any(kinds[groups[0]:] != MEASUREMENT):
+            return None
+        rows = self.table.rows
+        qubits = rows["targets"][rows["kind"] == MEASUREMENT, 0]
+        if len(np.unique(qubits)) != len(qubits):
+            return None
+        return [self.table.view(group) for group in groups]
+
+    def _terminal_sampler(self, measurements, state=None, rng=None):
+        """ Runs the gates of the circuit once and returns a sampler of the terminal measurements.
+
+        The measured qubits are rotated into the computational basis and the shots
+        are drawn from the marginal probabilities of the measured qubits, which are
+        only computed once. The state of the circuit remains in the pre-measurement state.
+
+        Parameters
+        ----------
+        measurements: list of Measurement
+            The terminal measurements of the circuit.
+        state: array_like, optional
+            State used to initialize the circuit. The default is the .math:'|0>' state.
+        rng: np.random.Generator, optional
+            Random generator of the samples. By default the global random state is used.
+
+        Returns
+        -------
+        sample: callable
+            Function 'sample(shots, format="raw")' returning a Result of the given
+            number of shots in the given representation, see 'Result'.
+        """
+        self.set_state(state)
+        for inst, kernels in self._steps():
+            if not isinstance(inst, Measurement):
+                self._apply(self.state, inst, kernels)
+
+        amp = self.state.amp
+        qubits, clbits, eigvals = list(), list(), list()
+        for m in measurements:
+            vals, vecs = m.eigenbasis()
+            for q, c in zip(m.qu_indices, m.cl_indices):
+                amp = apply_matrix(amp, self.n_qubits, np.conj(vecs).T, [q])
+                qubits.append(q)
+                clbits.append(c)
+                eigvals.append(np.asarray(vals).real)
+
+        probs = marginal_probabilities(amp, self.n_qubits, qubits)
+        probs = probs / np.sum(probs)
+        measured = np.isin(np.arange(self.n_clbits), clbits)
+        k = len(qubits)
+        rng = np.random if rng is None else rng
+
+        def sample(shots, format="raw"):
+            samples = rng.choice(len(probs), size=shots, p=probs)
+            if format == "raw":
+                data = np.full((shots, self.n_clbits), np.nan)
+                for i, (c, vals) in enumerate(zip(clbits, eigvals)):
+                    data[:, c] = vals[(samples >> (k - i - 1)) & 1]
+                return Result(data)
+
+            # The bits are written directly into the packed bytes of each (unique) sample
+            if format == "counts":
+                samples, counts = np.unique(samples, return_counts=True)
+            packed = np.zeros((len(samples), (self.n_clbits + 7) // 8), dtype=np.uint8)
+            for i, (c, vals) in enumerate(zip(clbits, eigvals)):
+                bits = (vals[(samples >> (k - i - 1)) & 1] < 0).astype(np.uint8)
+                packed[:, c // 8] |= bits << (7 - c % 8)
+            if format == "packed":
+                return Result.from_packed(packed, self.n_clbits, measured)
+            outcomes = packed_to_int(packed, self.n_clbits)
+            return Result.from_counts(outcomes, counts, self.n_clbits, measured)
+
+        return sample
+
+    def run(self, shots=1, state=None, verbose=False, snapshot=False, workers=None, seed=None,
+            format="raw"):
         """ Run the configured circuit multiple times.
 
         The circuit is run multiple times to extract state data from the circuit.
-        The data is returned in the Result object.
+        The data is returned in the Result object. If all measurements are at the
+        end of the circuit, the state is only simulated once and all shots are
+        sampled from the final state. Otherwise the shots can be distributed over a
+        pool of worker processes.
 
         See Also
         --------
@@ -653,21 +861,186 @@ class Circuit:
         state: array_like, optional
             State used to initialize the circuit. The default is the .math:'|0>' state.
         verbose: bool, optional
-            Flag for printing progress.
+            Flag for printing the progress of the shots. Only used if the circuit is
+            simulated shot by shot, sampling from the final state prints nothing.
+        snapshot: bool, optional
+            Flag if snapshots of the statevector should be saved before each measurement.
+            If the shots are sampled from the final state, only that state is saved once.
+            The snapshots are kept in the bounded store of the statevector, which has
+            to be set up with 'configure_snapshots' first. The default is 'False'.
+        workers: int, optional
+            Number of worker processes used if the circuit has to be simulated for each shot,
+            see 'run_parallel'. No progress is printed and snapshots can't be saved, since
+            the states only exist in the workers. By default the shots are run serially.
+        seed: int, optional
+            Root seed of the random streams of the workers. If the shots are sampled
+            in this process, a local random generator is seeded instead, the global
+            random state of numpy isn't changed.
+        format: str, optional
+            Representation of the measurement data, one of "raw", "packed" or "counts".
+            The packed and counts representations need 64 times less memory or less,
+            see 'Result'. The counts representation supports at most 64 classical bits.
+            The default is "raw".
 
         Returns
         -------
         res: Result
+            The shots with the seeds of the random streams and the fingerprint of the
+            circuit, see 'Result.concat'.
         """
+        Result.check_format(format, self.n_clbits)
+        measurements = self.terminal_measurements()
+        if measurements is None and workers is not None:
+            if snapshot:
+                raise ValueError("Snapshots can't be saved if the shots are run by workers")
+            return run_parallel(self, shots, state, workers, seed, format)
+
+        fingerprint = self.fingerprint()
+        rng, seeds = None, None
+        if seed is not None:
+            rng, provenance = seed_generator(seed)
+            seeds = [provenance]
+        if measurements is not None:
+            sample = self._terminal_sampler(measurements, state, rng)
+            if snapshot:
+                # The state of the circuit is the final state before the measurements
+                self.state.save_snapshot()
+            res = sample(shots, format)
+            res.seeds = tuple(seeds or ())
+            res.circuit_hash = fingerprint
+            return res
+
         terminal = Terminal()
         header = "Running experiment"
         if verbose:
             terminal.write(header)
         data = np.zeros((shots, self.n_clbits), dtype="float")
         for i in range(shots):
-            data[i] = self.run_circuit(state)
+            data[i] = self.run_circuit(state, snapshot, rng)
             if verbose:
                 terminal.updateln(header + f": {100*(i + 1)/shots:.1f}% ({i+1}/{shots})")
         if verbose:
             terminal.writeln()
-        return Result(data)
+        return Result(data, seeds=seeds, circuit_hash=fingerprint).convert(format)
+
+    def stream(self, chunk_size=1024, shots=None, state=None, format="raw", spill=None, seed=None):
+        """ Samples the circuit in chunks of shots and keeps running statistics.
+
+        In contrast to 'Circuit.run' the shots are not preallocated. The returned
+        stream yields the shots chunk by chunk and updates the mean, standard error
+        and histogram of all shots so far, which allows to monitor the convergence
+        and to stop the sampling at any point with bounded memory.
+
+        See Also
+        --------
+        qsim.core.statistics.ShotStream
+
+        Examples
+        --------
+        >>> stream = circuit.stream(chunk_size=1000, spill="shots.npy")
+        >>> for chunk in stream:
+        ...     if np.all(stream.stats.stderr() < 1e-2):
+        ...         break
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            Number of shots of each chunk. The default is 1024.
+        shots: int, optional
+            Total number of shots. By default the stream is open-ended.
+        state: array_like, optional
+            State used to initialize the circuit. The default is the .math:'|0>' state.
+        format: str, optional
+            Representation of the chunks, see 'Result'. The counts representation
+            supports at most 64 classical bits. The default is "raw".
+        spill: str or Path, optional
+            If given, the chunks are appended to this .npy file, which can be
+            memory-mapped during and after the sampling. Not supported for counts.
+        seed: int or np.random.SeedSequence, optional
+            Seed of a local random generator used for all shots, the global random
+            state of numpy isn't changed. By default the global random state is used.
+
+        Returns
+        -------
+        stream: ShotStream
+        """
+        Result.check_format(format, self.n_clbits)
+        if spill is not None and format == "counts":
+            raise ValueError("Shots in the counts representation can't be spilled")
+        sampler = self._sampler(state, format, seed)
+        return ShotStream(sampler, self.n_clbits, chunk_size, shots, spill)
+
+    def _sampler(self, state=None, format="raw", seed=None):
+        """ Returns a function 'sampler(shots)' drawing Results of a number of shots.
+
+        Terminal measurements are sampled from the final state, which is only
+        simulated once, otherwise the circuit is run for each shot. If a seed is given,
+        all shots are drawn from one local random generator.
+        """
+        fingerprint = self.fingerprint()
+        measurements = self.terminal_measurements()
+        rng, seeds = None, ()
+        if seed is not None:
+            rng, provenance = seed_generator(seed)
+            seeds = (provenance,)
+        if measurements is not None:
+            sample = self._terminal_sampler(measurements, state, rng)
+
+            def sampler(size):
+                res = sample(size, format)
+                res.seeds = seeds
+                res.circuit_hash = fingerprint
+                return res
+        else:
+            def sampler(size):
+                data = run_shots(self, size, state, rng=rng)
+                return Result(data, seeds=seeds, circuit_hash=fingerprint).convert(format)
+
+        return sampler
+
+    def estimate(self, observable, target, confidence=None, state=None, initial_shots=100,
+                 growth=2.0, max_shots=1_000_000, min_shots=1, seed=None):
+        """ Estimates the expectation value of a measured observable to a target precision.
+
+        The circuit is sampled in growing batches until the standard error of the
+        estimate (or the half-width of its confidence interval) reaches the target.
+        Observables with a low variance therefore need much less shots than a fixed
+        budget.
+
+        See Also
+        --------
+        qsim.core.statistics.adaptive_estimate
+
+        Parameters
+        ----------
+        observable: int or array_like of int or callable
+            Index or indices of the classical bits whose product of eigenvalues is estimated,
+            or a function mapping (shots, n_clbits) eigenvalue data to (shots) values.
+        target: float
+            Target standard error or, if a confidence level is given, the target
+            half-width of the confidence interval.
+        confidence: float, optional
+            Confidence level of the interval, for example 0.95.
+        state: array_like, optional
+            State used to initialize the circuit. The default is the .math:'|0>' state.
+        initial_shots: int, optional
+            Number of shots of the first batch. The default is 100.
+        growth: float, optional
+            Maximal growth factor of the total number of shots per batch. The default is 2.
+        max_shots: int, optional
+            Maximal number of shots. The default is 1 000 000.
+        min_shots: int, optional
+            Minimal number of shots before the estimate is considered converged.
+            The default is 1.
+        seed: int or np.random.SeedSequence, optional
+            Seed of a local random generator used for all shots, the global random
+            state of numpy isn't changed. By default the global random state is used.
+
+        Returns
+        -------
+        estimate: Estimate
+            The estimated value, the achieved standard error and the number of shots used.
+        """
+        format = "counts" if self.n_clbits <= 64 else "raw"
+        return adaptive_estimate(self._sampler(state, format, seed), observable, target, confidence,
+                                 initial_shots, growth, max_shots, min_shots)
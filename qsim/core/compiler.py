@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import numpy as np
+from .gates import cgate, expand_gate
+from .kernels import apply_matrix
+from .instruction import Measurement
+from .backends import gate_kernels
+
+
+def gate_operations(gate):
+    """ Splits a gate into its elementary operations.
+
+    Parameters
+    ----------
+    gate: Gate
+        The gate-instruction.
+
+    Returns
+    -------
+    ops: list of tuple of (Gate, int, list of int)
+        The gate, the index of the local matrix and the qubits of each operation.
+        The qubits of controlled gates include the control qubits.
+    """
+    ops = list()
+    for i, (qubits, _) in enumerate(gate.local_matrices()):
+        if gate.is_controlled:
+            qubits = gate.con_indices + list(qubits)
+        ops.append((gate, i, list(qubits)))
+    return ops
+
+
+def operation_matrix(gate, i):
+    """ Builds the local matrix of an elementary operation of a gate, including control qubits.
+
+    Parameters
+    ----------
+    gate: Gate
+        The gate-instruction.
+    i: int
+        Index of the local matrix of the gate.
+
+    Returns
+    -------
+    matrix: (2^k, 2^k) np.ndarray
+    """
+    matrix = gate.local_matrices()[i][1]
+    if gate.is_controlled:
+        n_con = gate.n_con
+        matrix = cgate(list(range(n_con)), n_con, matrix, n_con + 1, gate.con_trigger)
+    return matrix
+
+
+class FusedGate:
+    """ Gate consisting of multiple elementary operations acting on a small set of qubits.
+
+    The matrix of the fused gate is the product of the local matrices of all operations
+    embedded into the qubits of the fused gate. The matrix is built from the current
+    arguments of the gates, so changed parameters are respected.
+    """
+
+    TYPE = "FusedGate"
+    name = "fused"
+    is_controlled = False
+    is_diagonal = False
+    is_permutation = False
+    kernel = "matrix"
+    con_indices = None
+    con_trigger = 1
+
+    def __init__(self, qubits, operations):
+        self.qubits = sorted(qubits)
+        self.operations = operations
+
+    @property
+    def n_qubits(self):
+        return len(self.qubits)
+
+    @property
+    def n_operations(self):
+        return len(self.operations)
+
+    @property
+    def is_parametric(self):
+        """ bool: Flag if any of the fused gates depends on parameters of the circuit """
+        return any(gate.is_parametric for gate, _, _ in self.operations)
+
+    def __str__(self):
+        names = ", ".join(gate.name for gate, _, _ in self.operations)
+        return f"{self.TYPE}(qBits: {self.qubits}, gates: [{names}])"
+
+    def matrix(self):
+        """ Builds the local (2^k, 2^k) matrix of the fused gate.
+
+        Returns
+        -------
+        matrix: (2^k, 2^k) np.ndarray
+        """
+        n = self.n_qubits
+        # The rows of the transposed matrix are treated as states
+        arr = np.eye(2 ** n, dtype="complex")
+        for gate, i, qubits in self.operations:
+            positions = [self.qubits.index(q) for q in qubits]
+            arr = apply_matrix(arr, n, operation_matrix(gate, i), positions)
+        return arr.T
+
+    def local_matrices(self):
+        return [(self.qubits, self.matrix())]
+
+    def build_matrix(self, n_qubits):
+        return expand_gate(self.matrix(), self.qubits, n_qubits)
+
+
+class CircuitPlan:
+    """ Execution plan of a circuit, where adjacent gates are fused into larger local gates.
+
+    Elementary operations of the gates are collected in blocks acting on at most
+    'max_width' qubits. Blocks on disjoint qubits are kept open simultaneously, since
+    their operations commute. A block is closed if an operation acting on one of its
+    qubits would exceed the maximal width, or if a measurement follows.
+
+    The kernel calls of all operations are resolved when the plan is built. Operations
+    without parameters are never rebuilt, only the kernels of parametric operations
+    are refreshed if the parameters changed, see 'ParameterMap.version'.
+    """
+
+    def __init__(self, instructions, max_width=2, pmap=None):
+        self.max_width = max_width
+        self.pmap = pmap
+        self.ops = list()
+        self.kernels = list()
+        self.parametric = list()
+        self.n_operations = 0
+        self._compile(instructions)
+        self._resolve()
+        # Version of the parameters the kernels were resolved with
+        self._version = None if pmap is None else pmap.version
+
+    @property
+    def n_applications(self):
+        """ int: Number of gate applications of the plan """
+        return sum(not isinstance(op, Measurement) for op in self.ops)
+
+    @property
+    def n_eliminated(self):
+        """ int: Number of gate applications eliminated by the fusion """
+        return self.n_operations - self.n_applications
+
+    @property
+    def n_parametric(self):
+        """ int: Number of operations which are refreshed when binding parameters """
+        return len(self.parametric)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        return iter(self.ops)
+
+    def __getitem__(self, item):
+        return self.ops[item]
+
+    def __str__(self):
+        return f"CircuitPlan(operations={self.n_operations}, applications={self.n_applications}, " \
+               f"eliminated={self.n_eliminated})"
+
+    def steps(self):
+        """ Iterates over the operations of the plan and their resolved kernel calls.
+
+        The parametric operations are refreshed first if the parameters changed.
+
+        Yields
+        ------
+        op: Gate or FusedGate or Measurement
+            The operation of the plan.
+        kernels: list of tuple of (callable, tuple) or None
+            The kernel calls of the operation, see 'qsim.core.backends.gate_kernels'.
+            Measurements don't have kernels.
+        """
+        if self.pmap is not None and self.pmap.version != self._version:
+            self.refresh()
+        return zip(self.ops, self.kernels)
+
+    def refresh(self):
+        """ Rebuilds the kernel calls of all operations which depend on parameters. """
+        for i in self.parametric:
+            self.kernels[i] = gate_kernels(self.ops[i])
+        if self.pmap is not None:
+            self._version = self.pmap.version
+
+    def bind(self, params):
+        """ Sets the parameters of the circuit and refreshes the parametric operations.
+
+        Parameters
+        ----------
+        params: array_like
+            All arguments for the parameters of the circuit.
+
+        Returns
+        -------
+        plan: CircuitPlan
+        """
+        if self.pmap is None:
+            raise ValueError("The plan isn't linked to a parameter table")
+        self.pmap.set(params)
+        self.refresh()
+        return self
+
+    def _resolve(self):
+        for i, op in enumerate(self.ops):
+            if isinstance(op, Measurement):
+                self.kernels.append(None)
+            else:
+                self.kernels.append(gate_kernels(op))
+                if op.is_parametric:
+                    self.parametric.append(i)
+
+    def _emit(self, block):
+        qubits, operations = block
+        gate = operations[0][0]
+        if len(operations) == 1 and len(gate.local_matrices()) == 1:
+            # Keep unfused gates, so specialized kernels can be used
+            self.ops.append(gate)
+        else:
+            self.ops.append(FusedGate(qubits, operations))
+
+    def _compile(self, instructions):
+        blocks = list()
+        for inst in instructions:
+            if isinstance(inst, Measurement):
+                for block in blocks:
+                    self._emit(block)
+                blocks = list()
+                self.ops.append(inst)
+                continue
+
+            for op in gate_operations(inst):
+                self.n_operations += 1
+                qubits = set(op[2])
+                touching = [b for b in blocks if b[0] & qubits]
+                blocks = [b for b in blocks if not b[0] & qubits]
+                merged = qubits.union(*[b[0] for b in touching])
+                if len(merged) <= self.max_width:
+                    operations = [o for b in touching for o in b[1]] + [op]
+                    blocks.append((merged, operations))
+                else:
+                    for block in touching:
+                        self._emit(block)
+                    blocks.append((qubits, [op]))
+        for block in blocks:
+            self._emit(block)
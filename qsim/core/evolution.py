@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import numpy as np
+import scipy.linalg as la
+from .backends import apply_kernels
+from .table import MEASUREMENT
+
+
+class Propagator:
+    """ Time-evolution operator of a repeated block of gates (e.g. a Trotter step).
+
+    The kernels of the block are resolved once and applied to the state for each
+    step, so the states of all step counts cost about one simulation of the full
+    evolution. For small registers the step operator can be diagonalized once,
+    which allows to jump to any step count directly.
+
+    Parameters
+    ----------
+    block: Circuit
+        Circuit containing the gates of one step. Measurements aren't supported.
+    spectral: bool, optional
+        Flag if the spectral decomposition of the step operator is used.
+        The default is 'False'.
+    max_width: int, optional
+        Maximal number of qubits of the fused gates of the block. The default is 2.
+    """
+
+    def __init__(self, block, spectral=False, max_width=2):
+        if np.any(block.table.kinds == MEASUREMENT):
+            raise ValueError("Measurements are not supported in the block of a propagator")
+        self.block = block
+        self.n_qubits = block.n_qubits
+        self.plan = block.compile(max_width)
+        self.eigvals = None
+        self.eigvecs = None
+        if spectral:
+            self.diagonalize()
+
+    @property
+    def is_spectral(self):
+        """ bool: Flag if the spectral decomposition of the step operator is used """
+        return self.eigvals is not None
+
+    def refresh(self):
+        """ Updates the propagator after the parameters of the block have changed. """
+        self.plan.refresh()
+        if self.is_spectral:
+            self.diagonalize()
+
+    def matrix(self):
+        """ Builds the (N, N) step operator by applying the block to all basis states.
+
+        Returns
+        -------
+        u: (N, N) np.ndarray
+        """
+        # Row j of the batch is the block applied to the basis state j, i.e. column j of U
+        batch = self.block.run_batch(np.eye(2 ** self.n_qubits, dtype="complex"))
+        return batch.amp.T
+
+    def diagonalize(self):
+        """ Computes the spectral decomposition of the step operator.
+
+        The Schur decomposition of the unitary step operator is used, which results
+        in orthonormal eigenvectors even for degenerate eigenvalues.
+        """
+        t, z = la.schur(self.matrix(), output="complex")
+        self.eigvals = np.diag(t)
+        self.eigvecs = z
+
+    def apply(self, amp, steps=1):
+        """ Evolves a state by a number of steps.
+
+        Parameters
+        ----------
+        amp: (..., N) array_like
+            Coefficients of the initial state(s).
+        steps: int, optional
+            Number of applications of the block. The default is 1.
+
+        Returns
+        -------
+        amp: (..., N) np.ndarray
+        """
+        amp = np.array(amp, dtype="complex")
+        if self.is_spectral:
+            coeffs = amp @ np.conj(self.eigvecs)
+            return (self.eigvals ** steps * coeffs) @ self.eigvecs.T
+        kernels = [k for _, k in self.plan.steps()]
+        # The copy above is owned by this call, so the kernels can update it in place
+        for _ in range(steps):
+            for kernel in kernels:
+                amp = apply_kernels(amp, self.n_qubits, kernel, inplace=True)
+        return amp
+
+    def evolve(self, amp, steps):
+        """ Yields the evolved state after each number of steps.
+
+        Parameters
+        ----------
+        amp: (..., N) array_like
+            Coefficients of the initial state(s).
+        steps: int
+            Maximal number of applications of the block.
+
+        Yields
+        ------
+        amp: (..., N) np.ndarray
+            The state after 0, 1, ..., 'steps' applications of the block.
+        """
+        amp = np.array(amp, dtype="complex")
+        yield amp.copy()
+        for _ in range(steps):
+            amp = self.apply(amp)
+            yield amp.copy()
+
+    def states(self, amp, steps):
+        """ Computes the evolved states for a range or a list of step counts.
+
+        Parameters
+        ----------
+        amp: (..., N) array_like
+            Coefficients of the initial state(s).
+        steps: int or array_like of int
+            Maximal number of steps or the step counts of the states. Arbitrary
+            step counts require the spectral decomposition.
+
+        Returns
+        -------
+        states: (M, ..., N) np.ndarray
+        """
+        if not hasattr(steps, "__len__"):
+            steps = np.arange(steps + 1)
+        steps = np.asarray(steps)
+        amp = np.array(amp, dtype="complex")
+        if self.is_spectral:
+            coeffs = amp @ np.conj(self.eigvecs)
+            shape = (len(steps),) + (1,) * (amp.ndim - 1) + (-1,)
+            phases = (self.eigvals[np.newaxis, :] ** steps[:, np.newaxis]).reshape(shape)
+            return (phases * coeffs) @ self.eigvecs.T
+        if np.any(np.diff(steps) < 0):
+            raise ValueError("Step counts must be sorted if no spectral decomposition is used")
+        states = np.zeros((len(steps),) + amp.shape, dtype="complex")
+        current, step = amp, 0
+        for i, target in enumerate(steps):
+            current = self.apply(current, target - step)
+            step = target
+            states[i] = current
+        return states
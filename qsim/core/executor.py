@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import os
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .gates import register_gate, custom_gates
+from .result import Result
+
+
+def split_shots(shots, chunks):
+    """ Splits a number of shots into (almost) equally sized chunks.
+
+    Parameters
+    ----------
+    shots: int
+        Total number of shots.
+    chunks: int
+        Number of chunks.
+
+    Returns
+    -------
+    sizes: list of int
+    """
+    chunks = max(min(chunks, shots), 1)
+    size, rest = divmod(shots, chunks)
+    return [size + 1 if i < rest else size for i in range(chunks)]
+
+
+def register_gates(specs):
+    """ Registers gates in a worker process, which doesn't know gates added at runtime.
+
+    Parameters
+    ----------
+    specs: list of GateSpec
+        The registry entries of the gates, see 'gates.custom_gates'.
+    """
+    for spec in specs:
+        register_gate(spec)
+
+
+def seed_generator(seed):
+    """ Creates a local random generator, the global random state of numpy isn't changed.
+
+    Parameters
+    ----------
+    seed: np.random.SeedSequence or int or None
+        The seed of the random stream. A new random entropy is drawn for 'None'.
+
+    Returns
+    -------
+    rng: np.random.Generator
+        The random generator used by the measurements.
+    provenance: tuple
+        The entropy and spawn key of the seed sequence, which reproduce the stream.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.default_rng(seed), (seed.entropy, tuple(seed.spawn_key))
+
+
+def run_shots(circuit, shots, state=None, seed=None, rng=None):
+    """ Runs a circuit shot by shot with an independent random stream.
+
+    Parameters
+    ----------
+    circuit: Circuit
+        The circuit to run.
+    shots: int
+        Number of times the circuit is run.
+    state: array_like, optional
+        State used to initialize the circuit. The default is the .math:'|0>' state.
+    seed: np.random.SeedSequence or int, optional
+        Seed of the random stream used for the measurements.
+    rng: np.random.Generator, optional
+        Random generator used for the measurements, if no seed is given.
+        By default the global random state of numpy is used.
+
+    Returns
+    -------
+    data: (shots, n_clbits) np.ndarray
+    """
+    if seed is not None:
+        rng, _ = seed_generator(seed)
+    data = np.zeros((shots, circuit.n_clbits), dtype="float")
+    for i in range(shots):
+        data[i] = circuit.run_circuit(state, rng=rng)
+    return data
+
+
+def run_chunk(circuit, shots, state=None, seed=None, format="raw"):
+    """ Runs a chunk of shots and returns the result in the given representation.
+
+    The packed and counts representations keep the data sent back from a worker
+    process small.
+
+    Parameters
+    ----------
+    circuit: Circuit
+        The circuit to run.
+    shots: int
+        Number of times the circuit is run.
+    state: array_like, optional
+        State used to initialize the circuit. The default is the .math:'|0>' state.
+    seed: np.random.SeedSequence or int, optional
+        Seed of the random stream used for the measurements.
+    format: str, optional
+        Representation of the result, see 'Result'. The default is "raw".
+
+    Returns
+    -------
+    res: Result
+    """
+    rng, provenance = seed_generator(seed)
+    data = run_shots(circuit, shots, state, rng=rng)
+    return Result(data, seeds=[provenance]).convert(format)
+
+
+def run_parallel(circuit, shots, state=None, workers=None, seed=None, format="raw",
+                 mp_context=None):
+    """ Runs the shots of a circuit distributed over a pool of processes.
+
+    The shots are split into one chunk per worker. Each chunk is simulated with an
+    independent child of a 'np.random.SeedSequence', so the results are reproducible
+    for the same seed and number of workers. The results of the chunks are merged in order,
+    see 'Result.concat'.
+
+    Only the instructions and parameters of the circuit are sent to the workers, its
+    state, snapshots and prefix cache are not pickled. Gates registered at runtime are
+    registered in each worker when it starts. With the "spawn" and "forkserver" start
+    methods their gate-functions have to be picklable (e.g. module-level functions).
+
+    Parameters
+    ----------
+    circuit: Circuit
+        The circuit to run.
+    shots: int
+        Total number of times the circuit is run.
+    state: array_like, optional
+        State used to initialize the circuit. The default is the .math:'|0>' state.
+    workers: int, optional
+        Number of worker processes. The default is the number of CPUs.
+    seed: int or np.random.SeedSequence, optional
+        Root seed of the random streams of the workers. A given seed sequence isn't
+        modified, so passing it again reproduces the results.
+    format: str, optional
+        Representation of the results of the workers, see 'Result'. The default is "raw".
+    mp_context: str or multiprocessing.context.BaseContext, optional
+        Start method or context of the worker processes. The default context of
+        'multiprocessing' is used by default.
+
+    Returns
+    -------
+    res: Result
+        The merged result with the seeds of all chunks and the fingerprint of the circuit,
+        see 'Circuit.fingerprint'.
+    """
+    if isinstance(mp_context, str):
+        mp_context = multiprocessing.get_context(mp_context)
+    workers = workers or os.cpu_count() or 1
+    if isinstance(seed, np.random.SeedSequence):
+        # Spawning children from the sequence of the caller would change its state
+        seed = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key,
+                                      pool_size=seed.pool_size)
+    else:
+        seed = np.random.SeedSequence(seed)
+    sizes = split_shots(shots, workers)
+    children = seed.spawn(len(sizes))
+    with ProcessPoolExecutor(len(sizes), mp_context, register_gates, (custom_gates(),)) as executor:
+        futures = [executor.submit(run_chunk, circuit, n, state, child, format)
+                   for n, child in zip(sizes, children)]
+        results = [future.result() for future in futures]
+    res = Result.concat(results)
+    res.circuit_hash = circuit.fingerprint()
+    return res
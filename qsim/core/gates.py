@@ -9,7 +9,9 @@ version: 1.0
 import numpy as np
 from scipy.linalg import expm
 from itertools import product
+from collections import OrderedDict
 from .utils import kron, P0, P1
+from .kernels import parity, apply_matrix
 
 
 # ======================== SINGLE QUBIT GATES =======================
@@ -193,7 +195,7 @@ def cgate(con, t, gate, n=None, trigger=1):
         # Projections without applying gate
         projections = [P1 if x else P0 for x in vals]
         items = list(zip(con, projections))
-        if np.all(vals) == trigger:
+        if all(x == trigger for x in vals):
             # Projection with applying gate
             items.append((t, gate))
         # Build projection array and add to matrix
@@ -204,39 +206,547 @@ def cgate(con, t, gate, n=None, trigger=1):
 # =========================================================================
 
 
+def z_parity(qubits, n):
+    r""" Computes the diagonal of a product of Pauli-Z operators.
+
+    Parameters
+    ----------
+    qubits: int or list of int
+        Indices of the qubits the Z-operators act on.
+    n: int
+        Total number of qubits.
+
+    Returns
+    -------
+    z: (2^n) np.ndarray
+        The eigenvalues .math:'\pm 1' of the Z-product for each basis state.
+    """
+    mask = 0
+    for q in np.atleast_1d(qubits):
+        mask |= 1 << (n - 1 - int(q))
+    return 1 - 2 * parity(np.arange(2 ** n) & mask)
+
+
+def expand_gate(gate, qubits, n):
+    """ Builds the full matrix of a local gate acting on a subset of qubits.
+
+    Parameters
+    ----------
+    gate: (2^k, 2^k) array_like
+        Matrix of the gate acting on the k qubits.
+    qubits: list of int
+        Indices of the qubits the gate acts on.
+    n: int
+        Total number of qubits.
+
+    Returns
+    -------
+    gate: (2^n, 2^n) np.ndarray
+    """
+    # Each row of the identity is treated as state, which results in the transposed matrix
+    return apply_matrix(np.eye(2 ** n), n, gate, qubits).T
+
+
+def two_qubit_gatefunc(func):
+    """ Creates the full-size gate function of a local two-qubit gate.
+
+    Parameters
+    ----------
+    func: callable
+        Function returning the (4, 4) matrix of the two-qubit gate for a given argument.
+
+    Returns
+    -------
+    gatefunc: callable
+        Function with the signature 'gatefunc(qubits, n, arg)'.
+    """
+    def gatefunc(qubits, n, arg):
+        return expand_gate(func(arg), qubits, n)
+    return gatefunc
+
+
+def xy_gate(arg=0):
+    r""" Functional for the two-qubit XY (hopping) gate .math:'e^{-i \theta (XX + YY)}'
+
+    Parameters
+    ----------
+    arg: float
+        Argument .math:'\theta' of the gate.
+
+    Returns
+    -------
+    xy: (4, 4) np.ndarray
+    """
+    c, s = np.cos(2 * arg), -1j * np.sin(2 * arg)
+    return np.array([[1, 0, 0, 0],
+                     [0, c, s, 0],
+                     [0, s, c, 0],
+                     [0, 0, 0, 1]])
+
+
+def b_gate(arg=0):
+    r""" Functional for the two-qubit B-gate .math:'e^{-i \theta Z Z}'
+
+    Parameters
+    ----------
+    arg: float
+        Argument .math:'\theta' of the gate.
+
+    Returns
+    -------
+    b: (4, 4) np.ndarray
+    """
+    return np.diag(b_diag(arg))
+
+
+def swap_gate(*args):
+    """ Functional for the two-qubit SWAP gate
+
+    Returns
+    -------
+    swap: (4, 4) np.ndarray
+    """
+    return np.array([[1, 0, 0, 0],
+                     [0, 0, 1, 0],
+                     [0, 1, 0, 0],
+                     [0, 0, 0, 1]])
+
+
 def xy_gatefunc(qubits, n, arg):
-    q1, q2 = qubits
-    notc = cgate(q2, q1, X_GATE, n)
-    crx = cgate(q1, q2, rx_gate(4*arg), n)
-    return np.dot(notc, crx.dot(notc))
-    # xx = single_gate(qubits, [X_GATE, X_GATE], n)
-    # yy = single_gate(qubits, [Y_GATE, Y_GATE], n)
-    # return expm(-1j * (xx + yy) * arg)
+    return expand_gate(xy_gate(arg), qubits, n)
 
 
 def b_gatefunc(qubits, n, arg):
-    sigma = single_gate(qubits, [Z_GATE, Z_GATE], n)
-    gate = expm(-1j * sigma * arg)
-    return gate
+    return np.diag(np.exp(-1j * arg * z_parity(qubits, n)))
 
 
 def c_gatefunc(qubit, n, arg):
-    sigma = single_gate(qubit, Z_GATE, n)
-    gate = expm(1j * sigma * arg)
-    return gate
+    return np.diag(np.exp(1j * arg * z_parity(qubit, n)))
 
 
 def d_gatefunc(qubit, n, arg):
-    sigma = single_gate(qubit, Z_GATE, n)
-    gate = expm(1j * sigma * arg)
-    return gate
+    return np.diag(np.exp(1j * arg * z_parity(qubit, n)))
+
+
+# ========================= DIAGONAL GATES ==========================
+
+Z_PARITY_2 = np.array([1, -1, -1, 1])
+
+
+def id_diag(*args):
+    """ Diagonal of the single-qubit identity gate """
+    return np.ones(2)
+
+
+def z_diag(*args):
+    """ Diagonal of the single-qubit Pauli-Z gate """
+    return np.array([1, -1])
+
+
+def s_diag(*args):
+    """ Diagonal of the single-qubit phase (S) gate """
+    return np.array([1, 1j])
+
+
+def t_diag(*args):
+    """ Diagonal of the single-qubit T gate """
+    return np.array([1, np.exp(1j*np.pi/4)])
+
+
+def rz_diag(phi=0):
+    """ Diagonal of the single-qubit Pauli-Z rotation-gate """
+    arg = 1j * phi / 2
+    return np.array([np.exp(-arg), np.exp(arg)])
+
+
+def b_diag(arg=0):
+    r""" Diagonal of the two-qubit B-gate .math:'e^{-i \theta Z Z}' """
+    return np.exp(-1j * arg * Z_PARITY_2)
+
+
+def c_diag(arg=0):
+    r""" Diagonal of the single-qubit C-gate .math:'e^{i \theta Z}' """
+    return np.exp(1j * arg * np.array([1, -1]))
+
+
+def d_diag(arg=0):
+    r""" Diagonal of the single-qubit D-gate .math:'e^{i \theta Z}' """
+    return np.exp(1j * arg * np.array([1, -1]))
+
+
+# ======================== PERMUTATION GATES ========================
+
+
+def x_perm(*args):
+    """ Permutation of the single-qubit Pauli-X gate """
+    return np.array([1, 0]), None
+
+
+def y_perm(*args):
+    """ Signed permutation of the single-qubit Pauli-Y gate """
+    return np.array([1, 0]), np.array([-1j, 1j])
+
+
+def swap_perm(*args):
+    """ Permutation of the two-qubit SWAP gate """
+    return np.array([0, 2, 1, 3]), None
+
+
+# =========================================================================
+
+
+class GateSpec:
+    r""" Registry entry of a gate declaring the structure of the gate.
+
+    The metadata is used to select the cheapest kernel for applying the gate:
+    Diagonal gates are applied as element-wise multiplication, permutation gates
+    by reordering the amplitudes and all other gates by contracting the local matrix.
+
+    Parameters
+    ----------
+    name: str
+        Name of the gate.
+    func: callable, optional
+        Function building the matrix of the gate. Single-qubit gates have the signature
+        'func(arg)', multi-qubit gates the signature 'func(qubits, n, arg)'. If not given,
+        the function is constructed from the local matrix or the diagonal.
+    arity: int, optional
+        Number of qubits the gate acts on. The default is 1.
+    n_params: int, optional
+        Number of parameters of the gate. The default is 0.
+    local: callable, optional
+        Function returning the local (2^k, 2^k) matrix of the gate for a given argument.
+    diagonal: callable, optional
+        Function returning the local diagonal, if the gate is diagonal in the
+        computational basis.
+    permutation: callable, optional
+        Function returning the permutation of the local basis states and the phases
+        (or 'None'), if the gate is a (signed) permutation of the computational basis.
+    hermitian: bool, optional
+        Flag if the gate is hermitian (self-inverse). The default is False.
+    clifford: bool, optional
+        Flag if the gate is a Clifford gate. The default is False.
+    generator: (2^k, 2^k) array_like, optional
+        Generator .math:'G' of a rotation gate .math:'U(\theta) = e^{-i \theta G}'.
+    """
+
+    def __init__(self, name, func=None, arity=1, n_params=0, local=None, diagonal=None,
+                 permutation=None, hermitian=False, clifford=False, generator=None):
+        if func is None and local is None and diagonal is None:
+            raise ValueError(f"Gate \'{name}\' requires a gate-function, local matrix or diagonal")
+        self.name = name.lower()
+        self.arity = arity
+        self.n_params = n_params
+        self.diagonal = diagonal
+        self.permutation = permutation
+        self.hermitian = hermitian
+        self.clifford = clifford
+        self.generator = None if generator is None else np.asarray(generator)
+        self._local = local
+        self._builds_func = func is None
+        # Number of times the functions of the gate were replaced in the registry
+        self.revision = 0
+        self.func = self._local_gatefunc() if func is None else func
+
+    def _local_gatefunc(self):
+        return self.local_matrix if self.arity == 1 else two_qubit_gatefunc(self.local_matrix)
+
+    def _builders(self):
+        # Functions the cached matrices of the gate are built from
+        func = None if self._builds_func else self.func
+        return func, self._local, self.diagonal, self.permutation
+
+    def __getstate__(self):
+        # Gate-functions built from the local matrix are closures, which can't be pickled
+        state = self.__dict__.copy()
+        if self._builds_func:
+            state["func"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.func is None:
+            self.func = self._local_gatefunc()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name}, arity={self.arity}, kernel={self.kernel})"
+
+    @property
+    def is_diagonal(self):
+        """ bool: Flag if the gate is diagonal in the computational basis """
+        return self.diagonal is not None
+
+    @property
+    def is_permutation(self):
+        """ bool: Flag if the gate is a (signed) permutation of the computational basis """
+        return self.permutation is not None
+
+    @property
+    def is_parametric(self):
+        """ bool: Flag if the gate depends on parameters """
+        return self.n_params > 0
+
+    @property
+    def kernel(self):
+        """ str: Name of the cheapest kernel for applying the gate """
+        if self.is_diagonal:
+            return "diagonal"
+        elif self.is_permutation:
+            return "permutation"
+        return "matrix"
+
+    def local_matrix(self, arg=None, n=None):
+        """ Builds the local (2^k, 2^k) matrix of the gate.
+
+        Parameters
+        ----------
+        arg: float, optional
+            Argument of the gate.
+        n: int, optional
+            Number of qubits k of the gate. The default is the arity of the gate.
+
+        Returns
+        -------
+        matrix: (2^k, 2^k) np.ndarray
+        """
+        n = n or self.arity
+        if self._local is not None:
+            return self._local(arg)
+        elif self.diagonal is not None:
+            return np.diag(self.diagonal(arg))
+        elif n == 1:
+            return self.func(arg)
+        return self.func(list(range(n)), n, arg)
+
+
+GATE_REGISTRY = dict()
+
+# Gate-functions of the registered gates, see 'GateSpec.func'
+GATE_DICT = dict()
+
+
+def register_gate(spec):
+    """ Adds a gate to the registry, replacing any gate with the same name.
+
+    If a gate with different functions was registered under the same name, the cached
+    matrices of that gate are removed from 'GATE_CACHE' and the revision of the gate is
+    increased, which invalidates the states cached for the gate in any 'PrefixCache'.
+
+    Parameters
+    ----------
+    spec: GateSpec
+        Registry entry of the gate.
+
+    Returns
+    -------
+    spec: GateSpec
+    """
+    previous = GATE_REGISTRY.get(spec.name)
+    if previous is not None and previous is not spec:
+        spec.revision = previous.revision
+        if previous._builders() != spec._builders():
+            spec.revision += 1
+            GATE_CACHE.invalidate(spec.name)
+    GATE_REGISTRY[spec.name] = spec
+    GATE_DICT[spec.name] = spec.func
+    return spec
+
+
+def strip_controls(name):
+    """ Removes the prefix of the control qubits from the name of a gate.
+
+    Leading "c" characters are only removed while the name isn't a registered gate,
+    so gates whose names start with "c" are kept intact.
+
+    Parameters
+    ----------
+    name: str
+        Name of the gate, e.g. "cX" or "ccX".
+
+    Returns
+    -------
+    base_name: str
+    """
+    base = name
+    while len(base) > 1 and base[0] in "cC" and base.lower() not in GATE_DICT:
+        base = base[1:]
+    return base
+
+
+def get_gate_spec(name):
+    """ Returns the registry entry of a gate.
+
+    Gate-functions which were only added to 'GATE_DICT' are wrapped in an entry
+    without any structural metadata.
+
+    Parameters
+    ----------
+    name: str
+        Name of the gate (case insensitive).
+
+    Returns
+    -------
+    spec: GateSpec
+    """
+    name = name.lower()
+    spec = GATE_REGISTRY.get(name)
+    if spec is None or spec.func is not GATE_DICT.get(name, spec.func):
+        func = GATE_DICT.get(name)
+        if func is None:
+            raise KeyError(f"Gate-function \'{name}\' not in dictionary")
+        spec = register_gate(GateSpec(name, func))
+    return spec
+
+
+XX_YY = np.kron(X_GATE, X_GATE) + np.kron(Y_GATE, Y_GATE)
+ZZ = np.kron(Z_GATE, Z_GATE)
+
+register_gate(GateSpec("i", id_gate, diagonal=id_diag, hermitian=True, clifford=True))
+register_gate(GateSpec("x", x_gate, permutation=x_perm, hermitian=True, clifford=True))
+register_gate(GateSpec("y", y_gate, permutation=y_perm, hermitian=True, clifford=True))
+register_gate(GateSpec("z", z_gate, diagonal=z_diag, hermitian=True, clifford=True))
+register_gate(GateSpec("h", h_gate, hermitian=True, clifford=True))
+register_gate(GateSpec("s", s_gate, diagonal=s_diag, clifford=True))
+register_gate(GateSpec("t", t_gate, diagonal=t_diag))
+register_gate(GateSpec("rx", rx_gate, n_params=1, generator=X_GATE / 2))
+register_gate(GateSpec("ry", ry_gate, n_params=1, generator=Y_GATE / 2))
+register_gate(GateSpec("rz", rz_gate, n_params=1, diagonal=rz_diag, generator=Z_GATE / 2))
+register_gate(GateSpec("c", c_gatefunc, n_params=1, diagonal=c_diag, generator=-Z_GATE))
+register_gate(GateSpec("d", d_gatefunc, n_params=1, diagonal=d_diag, generator=-Z_GATE))
+register_gate(GateSpec("xy", xy_gatefunc, arity=2, n_params=1, local=xy_gate, generator=XX_YY))
+register_gate(GateSpec("b", b_gatefunc, arity=2, n_params=1, local=b_gate, diagonal=b_diag,
+                       generator=ZZ))
+register_gate(GateSpec("swap", arity=2, local=swap_gate, permutation=swap_perm, hermitian=True,
+                       clifford=True))
+
+# Registry entries of the built-in gates, see 'custom_gates'
+BUILTIN_GATES = dict(GATE_REGISTRY)
+
+
+def custom_gates():
+    """ Returns the registry entries of all gates added or replaced at runtime.
+
+    Gates which were only added to 'GATE_DICT' are registered first, see 'get_gate_spec'.
+
+    Returns
+    -------
+    specs: list of GateSpec
+    """
+    for name in list(GATE_DICT):
+        get_gate_spec(name)
+    return [spec for name, spec in GATE_REGISTRY.items() if BUILTIN_GATES.get(name) is not spec]
 
 
 # =========================================================================
 
 
-GATE_DICT = {"i": id_gate, "x": x_gate, "y": y_gate, "z": z_gate,
-             "h": h_gate, "s": s_gate, "t": t_gate,
-             "rx": rx_gate, "ry": ry_gate, "rz": rz_gate,
-             "xy": xy_gatefunc, "b": b_gatefunc, "d": d_gatefunc, "c": c_gatefunc
-             }
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(x) for x in value)
+    return 0
+
+
+def _freeze(value):
+    # Cached arrays are shared by all callers, so read-only copies are stored
+    if isinstance(value, np.ndarray):
+        value = np.array(value)
+        value.setflags(write=False)
+        return value
+    if isinstance(value, list):
+        return [_freeze(x) for x in value]
+    if isinstance(value, tuple):
+        return tuple(_freeze(x) for x in value)
+    return value
+
+
+class GateCache:
+    """ Least-recently-used cache of gate matrices.
+
+    The cache is bounded by the number of entries and the total memory of the
+    stored arrays. If one of the limits is exceeded the least recently used
+    entries are evicted. Keys of gate matrices are tuples with the name of the
+    gate as second item, see 'invalidate'. The arrays of the stored values are
+    read-only, since they are shared by all callers.
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=64 * 2 ** 20):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __str__(self):
+        return (f"GateCache(hits={self.hits}, misses={self.misses}, size={len(self)}, "
+                f"bytes={self.nbytes})")
+
+    def get(self, key, func, *args):
+        """ Returns the cached value of a key or computes and stores it.
+
+        Parameters
+        ----------
+        key: hashable
+            Key of the cached value. If the key isn't hashable the value is computed
+            without being cached.
+        func: callable
+            Function computing the value if it isn't cached.
+        args: list
+            Positional arguments of the function.
+
+        Returns
+        -------
+        value: np.ndarray or list
+            The value with read-only arrays, if it is cached.
+        """
+        try:
+            value = self._items.get(key)
+        except TypeError:
+            self.misses += 1
+            return func(*args)
+        if value is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = func(*args)
+        size = _nbytes(value)
+        if size <= self.maxbytes:
+            value = _freeze(value)
+            self._items[key] = value
+            self.nbytes += size
+            while len(self._items) > self.maxsize or self.nbytes > self.maxbytes:
+                _, item = self._items.popitem(last=False)
+                self.nbytes -= _nbytes(item)
+        return value
+
+    def invalidate(self, name):
+        """ Removes all entries of a gate, including the entries of its controlled versions.
+
+        Parameters
+        ----------
+        name: str
+            Name of the gate (case insensitive).
+        """
+        name = name.lower()
+        keys = [key for key in self._items if isinstance(key, tuple) and len(key) > 1
+                and isinstance(key[1], str) and strip_controls(key[1]).lower() == name]
+        for key in keys:
+            self.nbytes -= _nbytes(self._items.pop(key))
+
+    def clear(self):
+        """ Removes all entries of the cache, the hit and miss counters are kept. """
+        self._items.clear()
+        self.nbytes = 0
+
+
+GATE_CACHE = GateCache()
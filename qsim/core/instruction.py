@@ -6,25 +6,33 @@ author: Dylan Jones
 project: qsim
 version: 1.0
 """
+import copy
 import numpy as np
 from .utils import to_list, str_to_list
 from .utils import EIGVALS, EV_X, EV_Y, EV_Z
-from .gates import GATE_DICT, single_gate, cgate
+from .gates import GATE_DICT, GATE_CACHE, GateSpec, register_gate, get_gate_spec, strip_controls
+from .gates import single_gate, cgate
 
 
 class ParameterMap:
+    """ Table of the parameters of a circuit backed by a NumPy array.
 
-    INSTANCE = None
+    The arguments of each instruction are stored as an index array into the
+    parameter array. Setting all parameters is a single assignment and looking up
+    the arguments of an instruction a single indexing operation. Each circuit owns
+    its own table, which is released together with the circuit.
 
-    def __init__(self):
-        self.indices = list()
-        self.params = list()
+    The parameters can only be changed through the methods of the table, which
+    increment the 'version' counter, so compiled plans can detect the changes.
+    """
 
-    @classmethod
-    def instance(cls):
-        if cls.INSTANCE is None:
-            cls.INSTANCE = cls()
-        return cls.INSTANCE
+    def __init__(self, params=None, dtype="float"):
+        self._params = np.zeros(8, dtype=dtype)
+        self._size = 0
+        self.indices = list()
+        self.version = 0
+        if params is not None:
+            self.set(params)
 
     @property
     def n(self):
@@ -36,7 +44,14 @@ class ParameterMap:
 
     @property
     def num_params(self):
-        return len(self.params)
+        return self._size
+
+    @property
+    def params(self):
+        """ np.ndarray: Read-only view of the current parameters """
+        params = self._params[:self._size]
+        params.setflags(write=False)
+        return params
 
     @property
     def args(self):
@@ -53,67 +68,102 @@ class ParameterMap:
         return self.params[item]
 
     def __setitem__(self, key, value):
-        self.params[key] = value
+        self._reserve(self._size, np.asarray(value).dtype)
+        self._params[:self._size][key] = value
+        self.version += 1
+
+    def _reserve(self, size, dtype=None):
+        dtype = self._params.dtype if dtype is None else np.result_type(self._params.dtype, dtype)
+        if size > len(self._params) or dtype != self._params.dtype:
+            params = np.zeros(max(size, 2 * len(self._params)), dtype=dtype)
+            params[:self._size] = self.params
+            self._params = params
 
     def set(self, args):
-        self.params = list(args)
+        args = np.asarray(args)
+        self._reserve(len(args), args.dtype)
+        self._params[:len(args)] = args
+        self._size = len(args)
+        self.version += 1
 
     def add_param(self, value):
-        self.params.append(value)
+        self._reserve(self._size + 1, np.asarray(value).dtype)
+        self._params[self._size] = value
+        self._size += 1
+        self.version += 1
+        return self._size - 1
 
     def link_param(self, idx):
-        self.indices.append(idx)
+        indices = np.atleast_1d(np.asarray(idx, dtype="int"))
+        self.indices.append(indices)
+        return indices
 
     def add_arg(self, args, idx=None):
-        if not hasattr(args, "__len__"):
-            args = [args]
-        indices = list()
-        for i, x in enumerate(args):
-            indices.append(len(self.params) if idx is None else idx[i])
-            self.params.append(x)
+        args = np.atleast_1d(args)
+        start, stop = self._size, self._size + len(args)
+        self._reserve(stop, args.dtype)
+        self._params[start:stop] = args
+        self._size = stop
+        self.version += 1
+        if idx is None:
+            indices = np.arange(start, stop)
+        else:
+            indices = np.atleast_1d(np.asarray(idx, dtype="int"))
         self.indices.append(indices)
+        return indices
 
     def add_empty(self):
         self.indices.append(None)
 
     def add(self, arg=None, idx=None):
         if arg is not None:
-            self.add_arg(arg, idx)
+            return self.add_arg(arg, idx)
         elif idx is not None:
-            self.link_param(idx)
-        else:
-            self.add_empty()
+            return self.link_param(idx)
+        self.add_empty()
+        return None
 
-    def get(self, i):
-        indices = self.indices[i]
+    def lookup(self, indices):
+        """ Returns the parameters of an index array or 'None' if no indices are given. """
         if indices is None:
             return None
-        args = [self.params[i] for i in indices]
-        return args
+        # Only the current parameters are valid, slots past the size raise an IndexError
+        return self.params[indices]
+
+    def get(self, i):
+        return self.lookup(self.indices[i])
 
     def __str__(self):
         return f"Params: {self.params}, Indices: {self.indices}"
 
 
+def _freeze(x):
+    """ Converts (nested) lists to tuples, so they can be used as keys. """
+    if isinstance(x, np.ndarray):
+        return tuple(x.tolist())
+    if isinstance(x, (list, tuple)):
+        return tuple(_freeze(item) for item in x)
+    return x
+
+
 def get_bit(bit_list, idx):
     for bit in bit_list:
         if bit.index == idx:
             return bit
 
 
-pmap = ParameterMap.instance()
-
-
 class Instruction:
 
     INDEX = 0
     TYPE = "Instruction"
     GATE_DICT = GATE_DICT
-    pmap = ParameterMap.instance()
 
-    def __init__(self, name, qubits=None, con=None, clbits=None, n=1, arg=None, argidx=None, trigger=1):
-        self.idx = Instruction.INDEX
-        Instruction.INDEX += 1
+    def __init__(self, name, qubits=None, con=None, clbits=None, n=1, arg=None, argidx=None,
+                 trigger=1, idx=None):
+        if idx is None:
+            idx = Instruction.INDEX
+            Instruction.INDEX += 1
+        self.idx = idx
         self.size = n
         self.name = name
 
@@ -121,10 +171,32 @@ class Instruction:
         self.con = None
         self.clbits = None
         self.con_trigger = trigger
-        self.pmap.add(arg, argidx)
+
+        # The arguments are registered in the parameter table of the circuit
+        # the instruction is added to, see 'bind'
+        self.pmap = None
+        self.argidx = None
+        if arg is not None:
+            arg = np.atleast_1d(arg)
+        self._init_args = (arg, argidx)
 
         self._init(qubits, con, clbits)
 
+    def __setattr__(self, key, value):
+        if self.__dict__.get("_read_only", False):
+            raise AttributeError(f"Can't set '{key}' of {self.TYPE} {self.idx}, "
+                                 f"views of an instruction table are read-only")
+        super().__setattr__(key, value)
+
+    def set_read_only(self, flag=True):
+        """ Prevents changing the attributes of the instruction, used for views of tables. """
+        self.__dict__["_read_only"] = flag
+
+    @property
+    def is_read_only(self):
+        """ bool: Flag if the instruction is a read-only view of an instruction table """
+        return self.__dict__.get("_read_only", False)
+
     def _init(self, qubits, con, clbits):
         self.qubits = to_list(qubits) if qubits is not None else None
         self.con = to_list(con) if con is not None else None
@@ -178,12 +250,77 @@ class Instruction:
         return [c.index for c in self.clbits] if self.clbits is not None else None
 
     @property
-    def argidx(self):
-        return self.pmap.indices[self.idx]
+    def is_bound(self):
+        """ bool: Flag if the arguments are stored in the parameter table of a circuit """
+        return self.pmap is not None
+
+    def bind(self, pmap, argidx=None):
+        """ Registers the arguments of the instruction in a parameter table.
+
+        An instruction can only be bound to one table. Instructions which are
+        already bound keep the table they were registered in first, see 'rebind'
+        for adding them to another table.
+
+        Parameters
+        ----------
+        pmap: ParameterMap
+            The parameter table of the circuit.
+        argidx: np.ndarray of int, optional
+            Parameter slots already registered in the table. If given, the
+            instruction is linked to the slots instead of adding its arguments.
+        """
+        if self.pmap is not None:
+            return
+        if argidx is None:
+            arg, argidx = self._init_args
+            argidx = pmap.add(arg, argidx)
+        self.argidx = argidx
+        self.pmap = pmap
+        self._init_args = None
+
+    def rebind(self, pmap, remap=None):
+        """ Returns a copy of the instruction registered in another parameter table.
+
+        The current arguments of the instruction are added to the new table, the
+        instruction itself stays bound to its table.
+
+        Parameters
+        ----------
+        pmap: ParameterMap
+            The parameter table of the other circuit.
+        remap: dict, optional
+            Slots of the current table mapped to the slots of the new table. Slots which
+            aren't in the dictionary are added to the table and the dictionary, so
+            instructions sharing a parameter keep sharing it if the same dictionary is used.
+
+        Returns
+        -------
+        inst: Instruction
+        """
+        inst = copy.copy(self)
+        inst.set_read_only(False)
+        inst.pmap = None
+        inst._init_args = (None, None)
+        if self.argidx is None:
+            inst.bind(pmap)
+            return inst
+        remap = dict() if remap is None else remap
+        for idx, arg in zip(self.argidx.tolist(), self.args):
+            if idx not in remap:
+                remap[idx] = pmap.add_param(arg)
+        inst.bind(pmap, pmap.link_param([remap[idx] for idx in self.argidx.tolist()]))
+        return inst
+
+    @property
+    def is_parametric(self):
+        """ bool: Flag if the arguments are controllable parameters of a circuit """
+        return self.argidx is not None
 
     @property
     def args(self):
-        return self.pmap.get(self.idx)
+        if self.pmap is None:
+            return self._init_args[0]
+        return self.pmap.lookup(self.argidx)
 
     def get_arg(self, i=0):
         return self.args[i] if self.args is not None else None
@@ -204,9 +341,11 @@ class Instruction:
         return f"{self.TYPE}({self._attr_str()})"
 
     def to_dict(self):
+        args, argidx = self.args, self.argidx
         return dict(idx=self.idx, name=self.name, qbits=self.qu_indices,
-                    con=self.con_indices, cbits=self.cl_indices, arg=self.args,
-                    argidx=self.argidx)
+                    con=self.con_indices, cbits=self.cl_indices,
+                    arg=None if args is None else args.tolist(),
+                    argidx=None if argidx is None else argidx.tolist())
 
     def to_string(self, delim="; "):
         string = ""
@@ -248,10 +387,10 @@ class Measurement(Instruction):
 
     TYPE = "Measurement"
 
-    def __init__(self, name, qubits, clbits=None, basis=None):
+    def __init__(self, name, qubits, clbits=None, basis=None, idx=None):
         if clbits is None:
             clbits = qubits
-        super().__init__(name, qubits, clbits=clbits)
+        super().__init__(name, qubits, clbits=clbits, idx=idx)
         self.basis = basis
 
     @classmethod
@@ -282,20 +421,55 @@ class Measurement(Instruction):
 class Gate(Instruction):
 
     TYPE = "Gate"
+    cache = GATE_CACHE
 
-    def __init__(self, name, qubits, con=None, arg=None, argidx=None, n=1, trigger=1):
+    def __init__(self, name, qubits, con=None, arg=None, argidx=None, n=1, trigger=1, idx=None):
         if hasattr(qubits, "__len__"):
             if arg is not None and not hasattr(arg, "__len__"):
                 arg = [arg] * len(qubits)
             if argidx is not None and not hasattr(argidx, "__len__"):
                 argidx = [argidx] * len(qubits)
-        super().__init__(name, qubits, con=con, n=n, arg=arg, argidx=argidx, trigger=trigger)
+        super().__init__(name, qubits, con=con, n=n, arg=arg, argidx=argidx, trigger=trigger,
+                         idx=idx)
         if con is not None:
             self.name = "c" * len(self.con) + self.name
 
     @classmethod
-    def add_custom_gate(cls, name, item):
-        cls.GATE_DICT.update({name: item})
+    def add_custom_gate(cls, name, item=None, **kwargs):
+        """ Registers a custom gate.
+
+        The structure of the gate can be declared via the keyword arguments, which
+        allows the simulator to use the specialized kernels for the gate.
+
+        Parameters
+        ----------
+        name: str
+            Name of the gate.
+        item: callable or GateSpec, optional
+            Function building the matrix of the gate or the registry entry of the gate.
+        **kwargs
+            Metadata of the gate, see 'GateSpec'.
+        """
+        spec = item if isinstance(item, GateSpec) else GateSpec(name, item, **kwargs)
+        register_gate(spec)
+
+    @classmethod
+    def add_two_qubit_gate(cls, name, func, **kwargs):
+        """ Registers a custom two-qubit gate with a local (4, 4) matrix.
+
+        Gates registered this way are applied to a state by contracting the local matrix
+        onto the axes of the two qubits, the full matrix of the gate is only built if needed.
+
+        Parameters
+        ----------
+        name: str
+            Name of the gate.
+        func: callable
+            Function returning the (4, 4) matrix of the gate for a given argument.
+        **kwargs
+            Additional metadata of the gate, see 'GateSpec'.
+        """
+        cls.add_custom_gate(name, arity=2, local=func, **kwargs)
 
     @classmethod
     def x(cls, qubits, con=None, trigger=1):
@@ -337,6 +511,10 @@ class Gate(Instruction):
     def xy(cls, qubit1, qubit2, arg=0, argidx=None):
         return cls("XY", [qubit1, qubit2], arg=arg, argidx=argidx, n=2)
 
+    @classmethod
+    def swap(cls, qubit1, qubit2):
+        return cls("SWAP", [qubit1, qubit2], n=2)
+
     @classmethod
     def custom(cls, name, func, qubits, con=None, arg=None, argidx=None, n=1, trigger=1):
         cls.add_custom_gate(name, func)
@@ -344,19 +522,143 @@ class Gate(Instruction):
 
     @classmethod
     def _get_gatefunc(cls, name):
-        func = cls.GATE_DICT.get(name.lower())
-        if func is None:
-            raise KeyError(f"Gate-function \'{name}\' not in dictionary")
-        return func
+        return get_gate_spec(name).func
 
     def _qubit_gate_matrix(self, idx):
-        arg = self.get_arg(idx)
-        func = self._get_gatefunc(self.name)
-        return func(arg)
+        return self.spec.local_matrix(self.get_arg(idx))
+
+    def cache_key(self, n_qubits=None, kind="matrix"):
+        """ Key identifying the matrices of the gate with the current arguments.
+
+        Parameters
+        ----------
+        n_qubits: int, optional
+            Total number of qubits if the key refers to the full matrix of the gate.
+        kind: str, optional
+            Kind of the cached representation of the gate. The default is "matrix".
+
+        Returns
+        -------
+        key: tuple
+        """
+        return (kind, self.name, _freeze(self.qu_indices), _freeze(self.con_indices),
+                self.con_trigger, _freeze(self.args), n_qubits)
+
+    @property
+    def base_name(self):
+        """ str: Name of the gate without the prefix of the control qubits """
+        return strip_controls(self.name)
+
+    @property
+    def spec(self):
+        """ GateSpec: Registry entry of the gate """
+        return get_gate_spec(self.base_name)
+
+    @property
+    def kernel(self):
+        """ str: Name of the cheapest kernel for applying the gate """
+        return self.spec.kernel
+
+    @property
+    def is_diagonal(self):
+        """ bool: Flag if the gate is diagonal in the computational basis """
+        return self.spec.is_diagonal
+
+    def local_diagonals(self):
+        """ Builds the local diagonals of a diagonal gate and the qubits they act on.
+
+        For controlled gates the diagonal of the target qubit is returned
+        without the control qubits.
+
+        Returns
+        -------
+        ops: list of tuple of (list of int, np.ndarray)
+            The qubit indices and the diagonal of each operation of the gate.
+        """
+        return self.cache.get(self.cache_key(kind="diagonal"), self._build_local_diagonals)
+
+    def _build_local_diagonals(self):
+        func = self.spec.diagonal
+        if self.is_controlled:
+            return [([self.qu_indices[0]], func(self.get_arg()))]
+        ops = list()
+        for i, indices in enumerate(self.qu_indices):
+            ops.append((to_list(indices), func(self.get_arg(i))))
+        return ops
+
+    @property
+    def is_permutation(self):
+        """ bool: Flag if the gate is a (signed) permutation of the computational basis """
+        return self.spec.is_permutation
+
+    def local_permutations(self):
+        """ Builds the local permutations of a permutation gate and the qubits they act on.
+
+        For controlled gates the permutation of the target qubit is returned
+        without the control qubits.
+
+        Returns
+        -------
+        ops: list of tuple of (list of int, np.ndarray, np.ndarray or None)
+            The qubit indices, the permutation and the phases of each operation of the gate.
+        """
+        return self.cache.get(self.cache_key(kind="permutation"), self._build_local_permutations)
+
+    def _build_local_permutations(self):
+        func = self.spec.permutation
+        if self.is_controlled:
+            return [([self.qu_indices[0]], *func(self.get_arg()))]
+        ops = list()
+        for i, indices in enumerate(self.qu_indices):
+            ops.append((to_list(indices), *func(self.get_arg(i))))
+        return ops
+
+    def local_matrices(self):
+        """ Builds the local matrices of the gate and the qubits they act on.
+
+        In contrast to 'build_matrix' only the (2^k, 2^k) matrices of the involved
+        qubits are constructed, which can be applied to a state vector by contracting
+        the corresponding axes. For controlled gates the matrix of the target qubit
+        is returned without the control qubits.
+
+        Returns
+        -------
+        ops: list of tuple of (list of int, np.ndarray)
+            The qubit indices and the matrix of each operation of the gate.
+        """
+        return self.cache.get(self.cache_key(), self._build_local_matrices)
+
+    def _build_local_matrices(self):
+        spec = self.spec
+        if self.is_controlled:
+            return [([self.qu_indices[0]], spec.local_matrix(self.get_arg()))]
+
+        ops = list()
+        if self.size > 1:
+            for i, indices in enumerate(self.qu_indices):
+                ops.append((indices, spec.local_matrix(self.get_arg(i), len(indices))))
+        else:
+            for i, idx in enumerate(self.qu_indices):
+                ops.append(([idx], spec.local_matrix(self.get_arg(i))))
+        return ops
 
     def build_matrix(self, n_qubits):
+        """ Builds the full (N, N) matrix of the gate.
+
+        Parameters
+        ----------
+        n_qubits: int
+            Total number of qubits.
+
+        Returns
+        -------
+        arr: (N, N) np.ndarray
+        """
+        return self.cache.get(self.cache_key(n_qubits), self._build_matrix, n_qubits)
+
+    def _build_matrix(self, n_qubits):
         if self.is_controlled:
-            name = self.name.replace("c", "")
+            name = self.base_name
             gate_func = self._get_gatefunc(name)
             gate_arr = gate_func(self.get_arg())
             arr = cgate(self.con_indices, self.qu_indices[0], gate_arr, n_qubits, self.con_trigger)
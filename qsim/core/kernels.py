@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import numpy as np
+
+
+def as_tensor(amp, n):
+    """ Reshapes a state vector to a tensor with one axis per qubit.
+
+    The first qubit corresponds to the first (most significant) axis,
+    consistent with the ordering used by 'kron'. Leading batch axes of
+    the input are kept.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+
+    Returns
+    -------
+    psi: (..., 2, ..., 2) np.ndarray
+    """
+    return amp.reshape(amp.shape[:-1] + (2,) * n)
+
+
+def _qubit_axes(amp, qubits):
+    """ Returns the tensor axes of the given qubits, taking leading batch axes into account. """
+    offset = np.ndim(amp) - 1
+    return [q + offset for q in qubits]
+
+
+def _contract(psi, matrix, axes):
+    """ Contracts a (2^k, 2^k) matrix onto k axes of a state tensor. """
+    k = len(axes)
+    u = np.asarray(matrix).reshape((2,) * (2 * k))
+    psi = np.tensordot(u, psi, axes=(list(range(k, 2 * k)), list(axes)))
+    return np.moveaxis(psi, list(range(k)), list(axes))
+
+
+def _writable(amp, dtype, inplace):
+    """ Returns 'amp' if it can be updated in place, otherwise a contiguous copy. """
+    if inplace and amp.dtype == dtype and amp.flags.c_contiguous and amp.flags.writeable:
+        return amp
+    return np.array(amp, dtype=dtype, order="C")
+
+
+def apply_matrix(amp, n, matrix, targets):
+    """ Applies a local gate matrix to the target qubits of a state vector.
+
+    Instead of building the full (N, N) operator the (2^k, 2^k) matrix of the gate
+    is contracted onto the k target axes of the state tensor. A block of state vectors
+    can be passed by adding leading batch axes. The contraction always returns a new
+    array, 'amp' is never changed.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+    matrix: (2^k, 2^k) array_like
+        Matrix of the gate acting on the target qubits.
+    targets: list of int
+        Indices of the k qubits the gate acts on. The order of the indices
+        corresponds to the order of the qubits in the gate matrix.
+
+    Returns
+    -------
+    amp: (..., N) np.ndarray
+    """
+    psi = _contract(as_tensor(amp, n), matrix, _qubit_axes(amp, targets))
+    return psi.reshape(amp.shape)
+
+
+def apply_controlled(amp, n, matrix, targets, controls, trigger=1, inplace=False):
+    """ Applies a controlled local gate matrix to the target qubits of a state vector.
+
+    Only the slice of the state tensor where all control qubits are in the
+    trigger state is updated, all other amplitudes are copied unchanged.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+    matrix: (2^k, 2^k) array_like
+        Matrix of the gate acting on the target qubits.
+    targets: list of int
+        Indices of the k qubits the gate acts on.
+    controls: list of int
+        Indices of the control qubits.
+    trigger: int, optional
+        Value of the control qubits that triggers the gate. The default is 1.
+    inplace: bool, optional
+        Flag if the result is written into 'amp'. This is only done if the data type
+        and memory layout of 'amp' allow it, so the returned array has to be used
+        either way. By default a new array is returned and 'amp' is left unchanged.
+
+    Returns
+    -------
+    amp: (..., N) np.ndarray
+    """
+    matrix = np.asarray(matrix)
+    amp = _writable(amp, np.result_type(amp, matrix), inplace)
+    psi = as_tensor(amp, n)
+    index = [slice(None)] * psi.ndim
+    for axis in _qubit_axes(amp, controls):
+        index[axis] = trigger
+    index = tuple(index)
+    # Axes of the targets in the sliced tensor, where the control axes are removed
+    axes = _qubit_axes(amp, [t - sum(c < t for c in controls) for t in targets])
+    psi[index] = _contract(psi[index], matrix, axes)
+    return amp
+
+
+def apply_diagonal(amp, n, diag, targets, controls=None, trigger=1, inplace=False):
+    """ Applies a diagonal local gate to the target qubits of a state vector.
+
+    The state is multiplied element-wise with the diagonal of the gate, which is broadcasted
+    over all other qubits. If control qubits are given, only the slice of the state where
+    all control qubits are in the trigger state is multiplied.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+    diag: (2^k) array_like
+        Diagonal of the gate acting on the target qubits.
+    targets: list of int
+        Indices of the k qubits the gate acts on. The order of the indices
+        corresponds to the order of the qubits in the diagonal.
+    controls: list of int, optional
+        Indices of the control qubits.
+    trigger: int, optional
+        Value of the control qubits that triggers the gate. The default is 1.
+    inplace: bool, optional
+        Flag if the result is written into 'amp'. This is only done if the data type
+        and memory layout of 'amp' allow it, so the returned array has to be used
+        either way. By default a new array is returned and 'amp' is left unchanged.
+
+    Returns
+    -------
+    amp: (..., N) np.ndarray
+    """
+    k = len(targets)
+    diag = np.asarray(diag)
+    amp = _writable(amp, np.result_type(amp, diag), inplace)
+    psi = as_tensor(amp, n)
+    index = [slice(None)] * psi.ndim
+    axes = list(targets)
+    if controls:
+        for axis in _qubit_axes(amp, controls):
+            index[axis] = trigger
+        axes = [t - sum(c < t for c in controls) for t in targets]
+    index = tuple(index)
+    sub = psi[index]
+    axes = _qubit_axes(amp, axes)
+
+    # Sort the axes of the diagonal and broadcast it over the other qubits
+    order = np.argsort(axes)
+    diag = diag.reshape((2,) * k).transpose(order)
+    shape = [1] * sub.ndim
+    for axis in axes:
+        shape[axis] = 2
+    sub *= diag.reshape(shape)
+    return amp
+
+
+def apply_permutation(amp, n, perm, phases, targets, controls=None, trigger=1, inplace=False):
+    r""" Applies a (signed) permutation gate to the target qubits of a state vector.
+
+    The local amplitudes of the target qubits are permuted according to
+    .math:'\tilde{c}_j = \phi_j c_{p(j)}', where .math:'p' is the permutation of the local
+    basis states and .math:'\phi_j' the phases. The amplitudes are only reordered,
+    no matrix product is performed. If control qubits are given, only the slice of
+    the state where all control qubits are in the trigger state is permuted.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+    perm: (2^k) array_like of int
+        Permutation of the local basis states of the target qubits.
+    phases: (2^k) array_like or None
+        Phases of the permuted amplitudes. If 'None' the permutation is unsigned.
+    targets: list of int
+        Indices of the k qubits the gate acts on.
+    controls: list of int, optional
+        Indices of the control qubits.
+    trigger: int, optional
+        Value of the control qubits that triggers the gate. The default is 1.
+    inplace: bool, optional
+        Flag if the result is written into 'amp'. This is only done if the data type
+        and memory layout of 'amp' allow it, so the returned array has to be used
+        either way. By default a new array is returned and 'amp' is left unchanged.
+
+    Returns
+    -------
+    amp: (..., N) np.ndarray
+    """
+    k = len(targets)
+    dtype = amp.dtype if phases is None else np.result_type(amp, np.asarray(phases))
+    amp = _writable(amp, dtype, inplace)
+    psi = as_tensor(amp, n)
+    index = [slice(None)] * psi.ndim
+    axes = list(targets)
+    if controls:
+        for axis in _qubit_axes(amp, controls):
+            index[axis] = trigger
+        axes = [t - sum(c < t for c in controls) for t in targets]
+    sub = psi[tuple(index)]
+
+    # Move the target axes to the front and permute the local basis states
+    local = np.moveaxis(sub, _qubit_axes(amp, axes), list(range(k)))
+    flat = np.take(local.reshape((2 ** k, -1)), perm, axis=0)
+    if phases is not None:
+        flat *= np.asarray(phases)[:, np.newaxis]
+    local[...] = flat.reshape(local.shape)
+    return amp
+
+
+def marginal_probabilities(amp, n, qubits):
+    """ Computes the probabilities of the computational basis states of a subset of qubits.
+
+    The probabilities .math:'|c_i|^2' of the state are summed over the axes of all
+    qubits that are not contained in 'qubits'.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+    qubits: list of int
+        Indices of the k qubits. The first qubit corresponds to the most significant bit
+        of the index of the resulting probabilities.
+
+    Returns
+    -------
+    probs: (..., 2^k) np.ndarray
+    """
+    k = len(qubits)
+    batch = amp.shape[:-1]
+    probs = np.abs(as_tensor(amp, n)) ** 2
+    probs = np.moveaxis(probs, _qubit_axes(amp, qubits), _qubit_axes(amp, range(k)))
+    return probs.reshape(batch + (2 ** k, -1)).sum(axis=-1)
+
+
+def sample_indices(probs, shots, rng=None):
+    """ Draws samples of the outcome indices of one or more probability distributions.
+
+    The samples of all distributions are drawn at once by inverting the
+    cumulative distributions with a single sorted search.
+
+    Parameters
+    ----------
+    probs: (M) or (B, M) np.ndarray
+        Probabilities of the M outcomes of the B distributions.
+    shots: int
+        Number of samples drawn from each distribution.
+    rng: np.random.Generator, optional
+        Random generator of the samples. By default the global random state is used.
+
+    Returns
+    -------
+    samples: (shots) or (B, shots) np.ndarray of int
+    """
+    probs = np.asarray(probs, dtype="float")
+    batch = np.atleast_2d(probs)
+    b, m = batch.shape
+    cdf = np.cumsum(batch, axis=1)
+    cdf /= cdf[:, -1:]
+    # Shift each distribution into its own unit interval to search all rows at once
+    offsets = np.arange(b)[:, np.newaxis]
+    rng = np.random if rng is None else rng
+    values = rng.random((b, shots)) + offsets
+    samples = np.searchsorted((cdf + offsets).ravel(), values.ravel(), side="right")
+    samples = np.minimum(samples.reshape(b, shots) - offsets * m, m - 1)
+    return samples if probs.ndim > 1 else samples[0]
+
+
+# =========================================================================
+
+
+def parity(x):
+    """ Computes the parity of the set bits of (arrays of) integers.
+
+    Parameters
+    ----------
+    x: int or np.ndarray of int
+
+    Returns
+    -------
+    parity: int or np.ndarray of int
+    """
+    x = np.array(x, dtype=np.int64)
+    shift = 32
+    while shift:
+        x ^= x >> shift
+        shift //= 2
+    return x & 1
+
+
+def pauli_masks(pauli, n):
+    r""" Computes the bit-masks of a Pauli-string.
+
+    A Pauli-string acts on a basis state .math:'|i>' as
+    .. math::
+        P |i> = i^{n_y} (-1)^{|i \& z|} |i \oplus x>
+
+    where .math:'x' is the mask of the X- and Y-operators, .math:'z' the mask of the
+    Z- and Y-operators and .math:'n_y' the number of Y-operators.
+
+    Parameters
+    ----------
+    pauli: str or dict
+        Pauli-string with one character ('I', 'X', 'Y' or 'Z') for each qubit,
+        for example "XIZY", or a sparse map of qubit indices to Pauli-characters,
+        for example {0: "X", 2: "Z"}.
+    n: int
+        Number of qubits of the state.
+
+    Returns
+    -------
+    xmask: int
+    zmask: int
+    ny: int
+    """
+    if isinstance(pauli, str):
+        if len(pauli) != n:
+            raise ValueError(f"Length of Pauli-string doesn't match number of qubits: "
+                             f"{len(pauli)} != {n}")
+        pauli = dict(enumerate(pauli))
+    xmask, zmask, ny = 0, 0, 0
+    for qubit, char in pauli.items():
+        char = char.upper()
+        qubit = int(qubit)
+        if not 0 <= qubit < n:
+            raise ValueError(f"Qubit index {qubit} out of range for {n} qubits")
+        bit = 1 << (n - 1 - qubit)
+        if char in "XY":
+            xmask |= bit
+        if char in "ZY":
+            zmask |= bit
+        if char == "Y":
+            ny += 1
+        elif char not in "IXZ":
+            raise ValueError(f"Invalid Pauli-operator: {char}")
+    return xmask, zmask, ny
+
+
+def pauli_expectation(amp, n, pauli):
+    """ Computes the expectation value of a Pauli-string without building its matrix.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+    pauli: str or dict
+        Pauli-string or sparse map of qubit indices to Pauli-characters.
+
+    See Also
+    --------
+    pauli_masks
+
+    Returns
+    -------
+    x: float or (...) np.ndarray
+    """
+    return pauli_sum_expectation(amp, n, [(1, pauli)])
+
+
+def pauli_sum_expectation(amp, n, terms):
+    """ Computes the expectation value of a weighted sum of Pauli-strings.
+
+    Terms with the same bit-flip pattern share the product of the permuted and
+    the original amplitudes, so each distinct pattern only requires one pass
+    over the state vector.
+
+    Parameters
+    ----------
+    amp: (..., N) np.ndarray
+        Coefficients of the state.
+    n: int
+        Number of qubits of the state.
+    terms: list of tuple of (complex, str or dict)
+        Coefficients and Pauli-strings of the terms of the sum.
+
+    Returns
+    -------
+    x: float or (...) np.ndarray
+    """
+    indices = np.arange(2 ** n)
+    groups = dict()
+    for coeff, pauli in terms:
+        xmask, zmask, ny = pauli_masks(pauli, n)
+        groups.setdefault(xmask, list()).append((coeff * 1j ** ny, zmask))
+
+    x = 0
+    for xmask, items in groups.items():
+        prod = np.conj(amp[..., indices ^ xmask]) * amp
+        for coeff, zmask in items:
+            if zmask:
+                signs = 1 - 2 * parity(indices & zmask)
+                x += coeff * np.dot(prod, signs)
+            else:
+                x += coeff * np.sum(prod, axis=-1)
+    return np.real(x)
+
+
+def is_pauli(op):
+    """ bool: Checks if an operator is a Pauli-string or a sparse map of Pauli-operators """
+    return isinstance(op, (str, dict))
+
+
+def is_pauli_sum(op):
+    """ bool: Checks if an operator is a list of coefficients and Pauli-strings """
+    if not isinstance(op, (list, tuple)) or not op:
+        return False
+    return all(isinstance(t, tuple) and len(t) == 2 and is_pauli(t[1]) for t in op)
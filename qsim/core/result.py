@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import numpy as np
+from .utils import Basis, binary_histogram, plot_binary_histogram, density_matrix, binstr
+from .utils import pack_binary, unpack_binary, packed_to_int, int_to_binary, int_histogram
+from .utils import packed_histogram, INT_BITS
+
+
+class Result:
+    r""" Measurement data of multiple runs of a circuit.
+
+    The data is stored in one of the following representations:
+
+    - "raw": (shots, n_bits) float array of the eigenvalues .math:'\pm 1' or np.nan
+    - "packed": (shots, ceil(n_bits / 8)) uint8 array of the binary outcome of each shot
+    - "counts": sorted integer outcomes and their frequencies, the order of the shots is lost.
+      The outcomes are 64-bit integers, so at most 'INT_BITS' (64) bits are supported.
+
+    Unmeasured bits are tracked by the 'measured' mask, all other methods
+    work on every representation.
+
+    Results of the same circuit can be merged with 'Result.concat' or 'a + b',
+    which keeps the seeds of the runs and the hash of the circuit.
+
+    Parameters
+    ----------
+    data: (shots, n_bits) array_like
+        Raw measurement data.
+    seeds: iterable, optional
+        Provenance of the random streams used to generate the data.
+    circuit_hash: str, optional
+        Hash of the circuit the data was measured from, see 'Circuit.fingerprint'.
+    """
+
+    FORMATS = ("raw", "packed", "counts")
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, data=None, packed=None, counts=None, n_bits=None, measured=None,
+                 seeds=None, circuit_hash=None):
+        if data is not None:
+            data = np.asarray(data)
+            n_bits = data.shape[1]
+            if measured is None:
+                measured = ~np.all(np.isnan(data), axis=0)
+        if measured is None:
+            measured = np.ones(n_bits, dtype="bool")
+        self._data = data
+        self._packed = packed
+        self._counts = counts
+        self._n_bits = n_bits
+        self.measured = np.asarray(measured, dtype="bool")
+        self.seeds = tuple(seeds or ())
+        self.circuit_hash = circuit_hash
+        self._basis = None
+
+    @classmethod
+    def check_format(cls, format, n_bits):
+        """ Raises a ValueError if data of the given bits can't be stored in a representation.
+
+        Parameters
+        ----------
+        format: str
+            The representation of the data, one of 'Result.FORMATS'.
+        n_bits: int
+            Number of bits of the data.
+        """
+        if format not in cls.FORMATS:
+            raise ValueError(f"Invalid format '{format}', valid formats are {cls.FORMATS}")
+        if format == "counts" and n_bits > INT_BITS:
+            raise ValueError(f"The counts representation supports at most {INT_BITS} bits, "
+                             f"got {n_bits}. Use the packed representation instead")
+
+    @classmethod
+    def from_packed(cls, packed, n_bits, measured=None):
+        """ Creates a result from bit-packed shots, see 'utils.pack_binary'.
+
+        Parameters
+        ----------
+        packed: (shots, ceil(n_bits / 8)) array_like of np.uint8
+            The packed binary outcome of each shot, the first bit being the most significant one.
+        n_bits: int
+            Number of bits of the data.
+        measured: (n_bits) array_like of bool, optional
+            Mask of the measured bits. By default all bits are measured.
+
+        Returns
+        -------
+        res: Result
+        """
+        return cls(packed=np.asarray(packed, dtype=np.uint8), n_bits=n_bits, measured=measured)
+
+    @classmethod
+    def from_counts(cls, outcomes, counts, n_bits, measured=None):
+        """ Creates a result from the frequencies of integer outcomes.
+
+        Parameters
+        ----------
+        outcomes: array_like of int
+            The binary outcomes as integers, the first bit being the most significant one.
+        counts: array_like of int
+            The number of shots of each outcome.
+        n_bits: int
+            Number of bits of the data.
+        measured: (n_bits) array_like of bool, optional
+            Mask of the measured bits. By default all bits are measured.
+
+        Returns
+        -------
+        res: Result
+        """
+        outcomes, inverse = np.unique(np.asarray(outcomes, dtype=np.uint64), return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(outcomes)).astype("int")
+        return cls(counts=(outcomes, counts), n_bits=n_bits, measured=measured)
+
+    @classmethod
+    def laod(cls, file):
+        """ Load a measurement result from a file
+
+        Parameters
+        ----------
+        file: file-like or str
+            File or filename from which the data is loaded. Raw data is stored in .npy
+            files, the packed and counts representations in .npz files.
+
+        Returns
+        -------
+        res: Result
+        """
+        obj = np.load(file)
+        if not isinstance(obj, np.lib.npyio.NpzFile):
+            return cls(obj)
+        with obj:
+            n_bits, measured = int(obj["n_bits"]), obj["measured"]
+            if "packed" in obj:
+                return cls.from_packed(obj["packed"], n_bits, measured)
+            return cls.from_counts(obj["outcomes"], obj["counts"], n_bits, measured)
+
+    @property
+    def format(self):
+        """ str: Representation of the data, one of 'Result.FORMATS' """
+        if self._data is not None:
+            return "raw"
+        return "packed" if self._packed is not None else "counts"
+
+    @property
+    def data(self):
+        r""" np.ndarray: Raw measurement data of the eigenvalues .math:'\pm 1' or np.nan
+
+        The packed and counts representations are expanded to a full (shots, n_bits)
+        array, which needs as much memory as a raw result.
+        """
+        if self._data is not None:
+            return self._data
+        return 1 - 2 * self.binary()
+
+    @property
+    def isnan(self):
+        """ bool: check if data is np.nan"""
+        if self._data is not None:
+            return np.all(np.isnan(self._data))
+        return not np.any(self.measured)
+
+    @property
+    def shape(self):
+        """tuple: shape of the data array (n_measurements, n_bits)"""
+        return self.n_samples, self.n_bits
+
+    @property
+    def n_samples(self):
+        """int: number of measurments"""
+        if self._data is not None:
+            return self._data.shape[0]
+        if self._packed is not None:
+            return self._packed.shape[0]
+        return int(np.sum(self._counts[1]))
+
+    @property
+    def n_bits(self):
+        """int: number of bits"""
+        return self._n_bits
+
+    @property
+    def basis(self):
+        """ Basis: Basis of the measured bits, which is only constructed on first access """
+        if self._basis is None:
+            self._basis = Basis(self.n_bits)
+        return self._basis
+
+    @property
+    def labels(self):
+        """list of str: Labels of the basis-states of the measured qubits"""
+        return [r"$|$" + str(x) + r"$\rangle$" for x in self.basis.state_labels]
+
+    def __bool__(self):
+        return not self.isnan
+
+    def packed(self):
+        """ np.ndarray: Bit-packed binary outcome of each shot, see 'utils.pack_binary' """
+        if self._packed is not None:
+            return self._packed
+        if self._data is not None:
+            return pack_binary(self.binary())
+        outcomes, counts = self._counts
+        return pack_binary(int_to_binary(np.repeat(outcomes, counts), self.n_bits))
+
+    def outcomes(self):
+        """ Returns the integer outcomes and their frequencies.
+
+        Returns
+        -------
+        outcomes: np.ndarray of np.uint64
+            The sorted binary outcomes as integers, the first bit being the most significant one.
+        counts: np.ndarray of int
+        """
+        if self._counts is not None:
+            return self._counts
+        values = packed_to_int(self.packed(), self.n_bits)
+        return np.unique(values, return_counts=True)
+
+    def convert(self, format):
+        """ Returns the result in the given representation.
+
+        Parameters
+        ----------
+        format: str
+            The representation of the data, one of 'Result.FORMATS'. The counts
+            representation supports at most 'INT_BITS' (64) bits.
+
+        Returns
+        -------
+        res: Result
+        """
+        self.check_format(format, self.n_bits)
+        if format == self.format:
+            return self
+        if format == "raw":
+            res = Result(self.data, measured=self.measured)
+        elif format == "packed":
+            res = Result.from_packed(self.packed(), self.n_bits, self.measured)
+        else:
+            res = Result.from_counts(*self.outcomes(), self.n_bits, self.measured)
+        res.seeds = self.seeds
+        res.circuit_hash = self.circuit_hash
+        return res
+
+    @classmethod
+    def concat(cls, results):
+        """ Merges the shots of multiple results of the same circuit.
+
+        The merged result uses the most compact representation of the given results,
+        i.e. merging raw and counts results yields a counts result. Since counts are
+        summed and shots are concatenated in order, merging is associative and can be
+        used for tree reductions of the results of parallel workers.
+
+        Parameters
+        ----------
+        results: iterable of Result
+            The results to merge.
+
+        Returns
+        -------
+        res: Result
+        """
+        results = list(results)
+        if not results:
+            raise ValueError("No results to concatenate")
+        first = results[0]
+        hashes = {res.circuit_hash for res in results if res.circuit_hash is not None}
+        if len(hashes) > 1:
+            raise ValueError("Can't merge results of different circuits")
+        for res in results[1:]:
+            if res.n_bits != first.n_bits or np.any(res.measured != first.measured):
+                raise ValueError("Can't merge results of different measurements")
+
+        format = max((res.format for res in results), key=cls.FORMATS.index)
+        results = [res.convert(format) for res in results]
+        if format == "raw":
+            merged = cls(np.concatenate([res.data for res in results]), measured=first.measured)
+        elif format == "packed":
+            packed = np.concatenate([res.packed() for res in results])
+            merged = cls.from_packed(packed, first.n_bits, first.measured)
+        else:
+            outcomes = np.concatenate([res.outcomes()[0] for res in results])
+            counts = np.concatenate([res.outcomes()[1] for res in results])
+            merged = cls.from_counts(outcomes, counts, first.n_bits, first.measured)
+        merged.seeds = tuple(seed for res in results for seed in res.seeds)
+        merged.circuit_hash = hashes.pop() if hashes else None
+        return merged
+
+    def __add__(self, other):
+        return Result.concat([self, other])
+
+    def __radd__(self, other):
+        # Allows to merge results with the builtin 'sum'
+        if isinstance(other, int) and other == 0:
+            return self
+        return Result.concat([other, self])
+
+    def save(self, file):
+        """ Save the measurement data to a file
+
+        Parameters
+        ----------
+        file: file-like or str
+            File or filename to which the data is saved. If file is a string or Path,
+            a .npy (raw data) or .npz (packed or counts) extension will be appended to
+            the file name if it does not already have one.
+        """
+        if self._data is not None:
+            np.save(file, self._data)
+        elif self._packed is not None:
+            np.savez(file, packed=self._packed, n_bits=self.n_bits, measured=self.measured)
+        else:
+            outcomes, counts = self._counts
+            np.savez(file, outcomes=outcomes, counts=counts, n_bits=self.n_bits,
+                     measured=self.measured)
+
+    def binary(self):
+        """ np.ndarray: Converts measurement data to binary representation
+
+        The packed and counts representations are expanded to a full (shots, n_bits)
+        array, which undoes their memory saving. Use 'mean' or 'histogram' for statistics.
+        """
+        if self._data is not None:
+            return (-self._data + 1) / 2
+        if self._packed is not None:
+            binary = unpack_binary(self._packed, self.n_bits).astype("float")
+        else:
+            outcomes, counts = self._counts
+            binary = int_to_binary(np.repeat(outcomes, counts), self.n_bits).astype("float")
+        binary[:, ~self.measured] = np.nan
+        return binary
+
+    def _bit_counts(self):
+        """ np.ndarray: Number of shots with a binary outcome of 1 for each bit """
+        if self._counts is not None:
+            outcomes, counts = self._counts
+            return counts @ int_to_binary(outcomes, self.n_bits)
+        ones = np.zeros(self.n_bits, dtype="int")
+        for start in range(0, len(self._packed), self.CHUNK_SIZE):
+            chunk = unpack_binary(self._packed[start:start + self.CHUNK_SIZE], self.n_bits)
+            ones += np.sum(chunk, axis=0, dtype="int")
+        return ones
+
+    def mean(self):
+        """ np.ndarray: Computes the mean of the measurement data """
+        if self._data is not None:
+            return np.mean(self._data, axis=0)
+        mean = 1 - 2 * self._bit_counts() / self.n_samples
+        mean[~self.measured] = np.nan
+        return mean
+
+    def binary_mean(self):
+        """ np.ndarray: Computes the mean of the binary data """
+        return (-np.sign(self.mean()) + 1) / 2
+
+    def density_matrix(self):
+        _, hist = self.histogram(sparse=False)
+        return density_matrix(hist)
+
+    def histogram(self, normalize=True, sparse=None):
+        """ Computes the binary histogram of the measurement data
+
+        Parameters
+        ----------
+        normalize: bool, optional
+            Flag if the histogram should be normalized
+        sparse: bool, optional
+            Flag if only the observed outcomes are returned. By default the sparse
+            histogram is used for wide registers, see 'utils.int_histogram'.
+
+        Returns
+        -------
+        bins: np.ndarray
+            The integer outcomes or, for more than 64 bits, the rows of the packed
+            outcomes, see 'utils.packed_histogram'.
+        hist: np.ndarray
+        """
+        if self._data is not None:
+            return binary_histogram(self.binary(), normalize, sparse)
+        if self._packed is not None:
+            bins, hist = packed_histogram(self._packed, self.n_bits, sparse=sparse)
+        else:
+            outcomes, counts = self.outcomes()
+            bins, hist = int_histogram(outcomes, self.n_bits, counts, sparse)
+        if normalize:
+            hist = hist / self.n_samples
+        return bins, hist
+
+    def show_histogram(self, show=True, padding=0.2, color=None, alpha=0.9, scale=False,
+                       max_line=True, lc="r", lw=1, sparse=None):
+        bins, hist = self.histogram(sparse=sparse)
+        # Only the labels of the shown outcomes are built, the bars are placed next to each other
+        if self.n_bits > INT_BITS:
+            strings = ["".join(str(b) for b in row) for row in unpack_binary(bins, self.n_bits)]
+        else:
+            strings = [binstr(int(x), self.n_bits) for x in bins]
+        labels = [r"$|$" + string + r"$\rangle$" for string in strings]
+        bins = np.arange(len(bins))
+        plot = plot_binary_histogram(bins, hist, labels, padding, color, alpha, scale, max_line,
+                                     lc, lw)
+        plot.set_labels("State", "p")
+        if show:
+            plot.show()
+        return plot
+
+    def __str__(self):
+        string = f"Measurement Result (samples={self.n_samples}):\n"
+        string += f"  Mean:   {self.mean()}\n"
+        string += f"  Binary: {self.binary_mean()}"
+        return string
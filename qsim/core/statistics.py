@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import numpy as np
+from scipy import stats
+from .utils import int_histogram, int_to_binary, packed_histogram, INT_BITS
+
+
+class RunningStatistics:
+    """ Online estimates of the mean, standard error and histogram of measurement data.
+
+    The statistics are updated with chunks of measurement results, such that
+    the individual shots don't have to be kept in memory.
+
+    Parameters
+    ----------
+    n_bits: int
+        Number of bits of the measurement data. Outcomes that don't fit into
+        64 bit integers are tracked as rows of packed bytes.
+    """
+
+    def __init__(self, n_bits):
+        self.n_bits = n_bits
+        self.n_samples = 0
+        self._sum = np.zeros(n_bits)
+        self._sumsq = np.zeros(n_bits)
+        if n_bits <= INT_BITS:
+            self._outcomes = np.zeros(0, dtype=np.uint64)
+        else:
+            self._outcomes = np.zeros((0, (n_bits + 7) // 8), dtype=np.uint8)
+        self._counts = np.zeros(0, dtype="int")
+
+    def update(self, res):
+        """ Adds a chunk of measurement data to the statistics.
+
+        Parameters
+        ----------
+        res: Result
+            The measurement result of the chunk in any representation.
+        """
+        n = res.n_samples
+        if res.format == "raw":
+            data = res.data
+            self._sum += np.sum(data, axis=0)
+            self._sumsq += np.sum(data ** 2, axis=0)
+        else:
+            # The eigenvalues of the packed representations are +1 and -1
+            mean = res.mean()
+            self._sum += n * mean
+            self._sumsq += np.where(np.isnan(mean), np.nan, n)
+        self.n_samples += n
+        if self.n_bits <= INT_BITS:
+            outcomes, counts = res.outcomes()
+        else:
+            outcomes, counts = packed_histogram(res.packed(), self.n_bits)
+        outcomes = np.concatenate([self._outcomes, outcomes])
+        self._outcomes, inverse = np.unique(outcomes, axis=0, return_inverse=True)
+        counts = np.concatenate([self._counts, counts])
+        self._counts = np.bincount(inverse.ravel(), weights=counts).astype("int")
+
+    def mean(self):
+        """ np.ndarray: The mean of the measurement data of each bit """
+        return self._sum / self.n_samples
+
+    def variance(self):
+        """ np.ndarray: The (unbiased) sample variance of the measurement data of each bit """
+        n = self.n_samples
+        if n < 2:
+            return np.full(self.n_bits, np.inf)
+        return np.maximum(self._sumsq - self._sum ** 2 / n, 0) / (n - 1)
+
+    def stderr(self):
+        """ np.ndarray: The standard error of the mean of each bit """
+        return np.sqrt(self.variance() / max(self.n_samples, 1))
+
+    def outcomes(self):
+        """ Returns the observed outcomes and their frequencies, see 'Result.outcomes'.
+
+        Returns
+        -------
+        outcomes: np.ndarray
+            The integer outcomes or, for more than 64 bits, the rows of the packed outcomes.
+        counts: np.ndarray of int
+        """
+        return self._outcomes, self._counts
+
+    def histogram(self, normalize=True, sparse=None):
+        """ Computes the binary histogram of the measurement data, see 'Result.histogram'.
+
+        Parameters
+        ----------
+        normalize: bool, optional
+            Flag if the histogram should be normalized
+        sparse: bool, optional
+            Flag if only the observed outcomes are returned, see 'utils.int_histogram'.
+
+        Returns
+        -------
+        bins: np.ndarray
+        hist: np.ndarray
+        """
+        outcomes, counts = self.outcomes()
+        if self.n_bits <= INT_BITS:
+            bins, hist = int_histogram(outcomes, self.n_bits, counts, sparse)
+        else:
+            bins, hist = packed_histogram(outcomes, self.n_bits, counts, sparse)
+        if normalize:
+            hist = hist / self.n_samples
+        return bins, hist
+
+    def __str__(self):
+        string = f"Running statistics (samples={self.n_samples}):\n"
+        string += f"  Mean:   {self.mean()}\n"
+        string += f"  Stderr: {self.stderr()}"
+        return string
+
+
+class ShotSpill:
+    """ Appends chunks of shots to a .npy file.
+
+    The header of the file is rewritten after each chunk, so the file always holds
+    a valid array of all shots written so far and can be memory-mapped with
+    'np.load(file, mmap_mode="r")', even while the shots are still written.
+
+    Parameters
+    ----------
+    file: str or Path
+        Name of the file. A .npy extension is appended if the name doesn't have one.
+    n_cols: int
+        Number of columns of each shot.
+    dtype: np.dtype
+        Data type of the shots.
+    """
+
+    def __init__(self, file, n_cols, dtype):
+        file = str(file)
+        if not file.endswith(".npy"):
+            file += ".npy"
+        self.file = file
+        self.n_cols = n_cols
+        self.n_rows = 0
+        self.dtype = np.dtype(dtype)
+        self._fp = open(file, "wb")
+        self._write_header()
+        self._offset = self._fp.tell()
+
+    @property
+    def closed(self):
+        """ bool: Flag if the file is closed """
+        return self._fp.closed
+
+    def _write_header(self):
+        header = {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False,
+                  "shape": (self.n_rows, self.n_cols)}
+        self._fp.seek(0)
+        # The header is padded by numpy, such that the first axis can grow in place
+        np.lib.format.write_array_header_1_0(self._fp, header)
+
+    def write(self, chunk):
+        """ Appends a (shots, n_cols) chunk of shots to the file. """
+        chunk = np.ascontiguousarray(chunk, dtype=self.dtype)
+        self._fp.seek(0, 2)
+        self._fp.write(chunk.tobytes())
+        self.n_rows += len(chunk)
+        self._write_header()
+        if self._fp.tell() != self._offset:
+            raise IOError(f"The header of '{self.file}' can't be updated in place")
+        self._fp.flush()
+
+    def load(self):
+        """ np.memmap: Memory-map of all shots written to the file """
+        return np.load(self.file, mmap_mode="r")
+
+    def close(self):
+        """ Closes the file. """
+        self._fp.close()
+
+
+class ShotStream:
+    """ Iterator over chunks of shots which updates running statistics.
+
+    Each iteration samples one chunk, updates the running statistics and
+    optionally appends the chunk to a .npy file. The number of shots can be left
+    open, in which case the iteration is stopped by the caller, for example once
+    the standard error is small enough.
+
+    Parameters
+    ----------
+    sampler: callable
+        Function 'sampler(shots)' returning a Result of the given number of shots.
+    n_bits: int
+        Number of bits of the measurement data.
+    chunk_size: int, optional
+        Number of shots of each chunk. The default is 1024.
+    shots: int, optional
+        Total number of shots. By default the stream is open-ended.
+    spill: str or Path, optional
+        If given, the raw (or packed) chunks are written to this .npy file, see 'ShotSpill'.
+    """
+
+    def __init__(self, sampler, n_bits, chunk_size=1024, shots=None, spill=None):
+        self.sampler = sampler
+        self.chunk_size = chunk_size
+        self.shots = shots
+        self.stats = RunningStatistics(n_bits)
+        self.spill_file = spill
+        self.spill = None
+
+    @property
+    def n_samples(self):
+        """ int: Number of shots sampled so far """
+        return self.stats.n_samples
+
+    def _spill(self, chunk):
+        if chunk.format == "counts":
+            raise ValueError("Chunks in the counts representation can't be spilled")
+        data = chunk.data if chunk.format == "raw" else chunk.packed()
+        if self.spill is None:
+            self.spill = ShotSpill(self.spill_file, data.shape[1], data.dtype)
+        self.spill.write(data)
+
+    def __iter__(self):
+        try:
+            while self.shots is None or self.n_samples < self.shots:
+                size = self.chunk_size
+                if self.shots is not None:
+                    size = min(size, self.shots - self.n_samples)
+                chunk = self.sampler(size)
+                self.stats.update(chunk)
+                if self.spill_file is not None:
+                    self._spill(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        """ Closes the spill file, if one is used. """
+        if self.spill is not None:
+            self.spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def observable_values(res, observable):
+    """ Evaluates an observable on the shots of a measurement result.
+
+    Parameters
+    ----------
+    res: Result
+        The measurement result. Counts results are evaluated once per outcome.
+    observable: int or array_like of int or callable
+        Index or indices of the bits whose product of eigenvalues is evaluated,
+        or a function mapping (shots, n_bits) eigenvalue data to (shots) values.
+
+    Returns
+    -------
+    values: np.ndarray
+        The value of the observable for each shot (or outcome).
+    weights: np.ndarray
+        The number of shots of each value.
+    """
+    if res.format == "counts":
+        outcomes, weights = res.outcomes()
+        data = 1 - 2 * int_to_binary(outcomes, res.n_bits).astype("float")
+    else:
+        data = res.data
+        weights = np.ones(len(data), dtype="int")
+    if callable(observable):
+        values = np.asarray(observable(data), dtype="float")
+    else:
+        values = np.prod(data[:, np.atleast_1d(observable)], axis=1)
+    return values, weights
+
+
+class Estimate:
+    """ Estimated expectation value of an observable, see 'adaptive_estimate'.
+
+    Parameters
+    ----------
+    value: float
+        The estimated mean of the observable.
+    stderr: float
+        The achieved standard error of the mean.
+    shots: int
+        Number of shots used.
+    batches: int
+        Number of sampled batches.
+    converged: bool
+        Flag if the target precision was reached.
+    """
+
+    def __init__(self, value, stderr, shots, batches, converged):
+        self.value = value
+        self.stderr = stderr
+        self.shots = shots
+        self.batches = batches
+        self.converged = converged
+
+    def interval(self, confidence=0.95):
+        """ tuple of float: Normal confidence interval of the estimate """
+        width = stats.norm.ppf(0.5 + confidence / 2) * self.stderr
+        return self.value - width, self.value + width
+
+    def __str__(self):
+        string = f"Estimate (shots={self.shots}, batches={self.batches}, "
+        string += f"converged={self.converged}):\n"
+        string += f"  Value:  {self.value}\n"
+        string += f"  Stderr: {self.stderr}"
+        return string
+
+
+def adaptive_estimate(sampler, observable, target, confidence=None, initial_shots=100,
+                      growth=2.0, max_shots=1_000_000, min_shots=1):
+    """ Estimates the mean of an observable by sampling until a target precision is reached.
+
+    The size of each batch is predicted from the sample variance of the previous shots.
+    For +1/-1 observables the variance is bounded from below by the Agresti-Coull estimate,
+    so rare outcomes missing from small samples don't stop the sampling early.
+
+    Parameters
+    ----------
+    sampler: callable
+        Function 'sampler(shots)' returning a Result of the given number of shots.
+    observable: int or array_like of int or callable
+        The observable, see 'observable_values'.
+    target: float
+        Target standard error or, if a confidence level is given, the target
+        half-width of the confidence interval. Must be positive.
+    confidence: float, optional
+        Confidence level of the interval, for example 0.95.
+    initial_shots: int, optional
+        Number of shots of the first batch. The default is 100.
+    growth: float, optional
+        Maximal growth factor of the total number of shots per batch, must be larger
+        than 1. The default is 2.
+    max_shots: int, optional
+        Maximal number of shots. The default is 1 000 000.
+    min_shots: int, optional
+        Minimal number of shots before the estimate is considered converged.
+        The default is 1.
+
+    Returns
+    -------
+    estimate: Estimate
+    """
+    if target <= 0:
+        raise ValueError(f"Target precision must be positive: {target}")
+    if growth <= 1:
+        raise ValueError(f"Growth factor must be larger than 1: {growth}")
+    if min_shots < 1:
+        raise ValueError(f"Minimal number of shots must be positive: {min_shots}")
+    if confidence is not None:
+        target = target / stats.norm.ppf(0.5 + confidence / 2)
+    n, total, total_sq, batches = 0, 0.0, 0.0, 0
+    # Number of -1 values, as long as the observable only takes the values +1 and -1
+    n_neg, signed = 0, True
+    size = min(max(initial_shots, 2), max_shots)
+    while True:
+        values, weights = observable_values(sampler(size), observable)
+        n += size
+        total += np.dot(weights, values)
+        total_sq += np.dot(weights, values ** 2)
+        signed = signed and bool(np.all(np.abs(values) == 1))
+        n_neg += np.dot(weights, values < 0)
+        batches += 1
+
+        mean = total / n
+        variance = max(total_sq - total ** 2 / n, 0) / (n - 1)
+        if signed:
+            p = (n_neg + 2) / (n + 4)
+            variance = max(variance, 4 * p * (1 - p))
+        stderr = np.sqrt(variance / n)
+        converged = bool(stderr <= target and n >= min_shots)
+        if converged or n >= max_shots:
+            return Estimate(mean, stderr, n, batches, converged)
+        needed = max(int(np.ceil(variance / target ** 2)), min_shots) - n
+        size = max(min(needed, int((growth - 1) * n)), 1)
+        size = min(size, max_shots - n)
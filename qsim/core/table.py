@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import hashlib
+import numpy as np
+from .gates import GATE_CACHE, get_gate_spec, strip_controls
+from .kernels import apply_matrix, apply_controlled, apply_diagonal, apply_permutation
+from .instruction import Gate, Measurement
+
+MAX_TARGETS = 4
+GATE, MEASUREMENT = 0, 1
+BASES = [None, "x", "y", "z"]
+
+# Each row is one elementary operation. The rows of an instruction share the group index.
+INSTRUCTION_DTYPE = np.dtype([
+    ("group", "i8"),                     # Index of the instruction
+    ("kind", "i1"),                      # GATE or MEASUREMENT
+    ("opcode", "i4"),                    # Index of the name in 'InstructionTable.names'
+    ("size", "i1"),                      # Number of target qubits
+    ("targets", "i4", (MAX_TARGETS,)),   # Indices of the target qubits
+    ("controls", "i8"),                  # Bit mask of the control qubits
+    ("trigger", "i1"),                   # Value of the control qubits triggering the gate
+    ("param", "i4"),                     # Parameter slot or -1
+    ("clbit", "i4"),                     # Classical bit of a measurement or -1
+    ("basis", "i1"),                     # Index of the measurement basis in 'BASES'
+])
+
+
+def bit_indices(bits):
+    """ Converts a list of bits or indices to a list of indices. """
+    return [b if isinstance(b, (int, np.integer)) else b.index for b in bits]
+
+
+def _mask(indices):
+    mask = 0
+    for i in indices:
+        mask |= 1 << int(i)
+    return mask
+
+
+def _unmask(mask):
+    mask = int(mask)
+    return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+class InstructionRef:
+    """ Reference to an instruction of a table, the view is only created if accessed. """
+
+    __slots__ = ["table", "group", "_inst"]
+
+    def __init__(self, table, group):
+        self.table = table
+        self.group = group
+        self._inst = None
+
+    @property
+    def instruction(self):
+        if self._inst is None:
+            self._inst = self.table.view(self.group)
+        return self._inst
+
+    def __getattr__(self, item):
+        return getattr(self.instruction, item)
+
+    def __repr__(self):
+        return repr(self.instruction)
+
+    def __str__(self):
+        return str(self.instruction)
+
+
+class InstructionTable:
+    """ Compact table of the instructions of a circuit.
+
+    The instructions are stored as rows of a NumPy structured array (see
+    'INSTRUCTION_DTYPE') with one row per elementary operation. 'Gate' and
+    'Measurement' objects are only created on demand as read-only views of the
+    rows, the kernels of the gates can be resolved directly from the table.
+
+    Parameters
+    ----------
+    qureg: QuRegister
+        Quantum register of the circuit.
+    clreg: ClRegister
+        Classical register of the circuit.
+    pmap: ParameterMap
+        Parameter table of the circuit.
+    capacity: int, optional
+        Initial number of allocated rows. The default is 64.
+    """
+
+    def __init__(self, qureg, clreg, pmap, capacity=64):
+        self.qureg = qureg
+        self.clreg = clreg
+        self.pmap = pmap
+        self.names = list()
+        self._opcodes = dict()
+        self._rows = np.zeros(capacity, dtype=INSTRUCTION_DTYPE)
+        self._starts = np.zeros(capacity + 1, dtype="int64")
+        self.n_rows = 0
+        self.n_groups = 0
+        # Created views and the rows converted to lists, see 'view' and 'steps'
+        self._views = dict()
+        self._records = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = dict()
+        state["_records"] = None
+        return state
+
+    @property
+    def rows(self):
+        """ np.ndarray: The rows of all instructions """
+        return self._rows[:self.n_rows]
+
+    @property
+    def starts(self):
+        """ np.ndarray: Index of the first row of each instruction """
+        return self._starts[:self.n_groups]
+
+    @property
+    def kinds(self):
+        """ np.ndarray: Kind (GATE or MEASUREMENT) of each instruction """
+        return self._rows["kind"][self.starts]
+
+    def __len__(self):
+        return self.n_groups
+
+    def __iter__(self):
+        for group in range(self.n_groups):
+            yield self.view(group)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.view(group) for group in range(*item.indices(self.n_groups))]
+        if item < 0:
+            item += self.n_groups
+        if not 0 <= item < self.n_groups:
+            raise IndexError(f"Instruction index {item} out of range")
+        return self.view(item)
+
+    def opcode(self, name):
+        """ Returns the opcode of a name, new names are added to the table. """
+        code = self._opcodes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(name)
+            self._opcodes[name] = code
+        return code
+
+    def group_rows(self, group):
+        """ Returns the rows of an instruction. """
+        start = self._starts[group]
+        stop = self._starts[group + 1] if group + 1 < self.n_groups else self.n_rows
+        return self._rows[start:stop]
+
+    def _reserve(self, n_rows):
+        if self.n_rows + n_rows > len(self._rows):
+            rows = np.zeros(max(self.n_rows + n_rows, 2 * len(self._rows)), dtype=INSTRUCTION_DTYPE)
+            rows[:self.n_rows] = self.rows
+            self._rows = rows
+        if self.n_groups + 1 >= len(self._starts):
+            starts = np.zeros(2 * len(self._starts), dtype="int64")
+            starts[:self.n_groups] = self.starts
+            self._starts = starts
+
+    def _append(self, records):
+        n_rows = len(records)
+        self._reserve(n_rows)
+        start = self.n_rows
+        self._rows[start:start + n_rows] = records
+        self._starts[self.n_groups] = start
+        self.n_rows += n_rows
+        self.n_groups += 1
+        self._records = None
+        return self.n_groups - 1
+
+    def add_gate(self, name, targets, con=None, argidx=None, n=1, trigger=1):
+        """ Appends a gate to the table.
+
+        Parameters
+        ----------
+        name: str
+            Name of the gate. A prefix of the control qubits (e.g. "cX") is removed.
+        targets: list of int or list of list of int
+            Indices of the target qubits of each operation of the gate.
+        con: list of int, optional
+            Indices of the control qubits.
+        argidx: array_like of int, optional
+            Parameter slot of each operation of the gate.
+        n: int, optional
+            Number of qubits each operation acts on. The default is 1.
+        trigger: int, optional
+            The trigger value if the gate is controlled. The default is 1.
+
+        Returns
+        -------
+        group: int
+            Index of the instruction.
+        """
+        if con:
+            # Controlled gates act on the first target only
+            targets = targets[:1]
+        if n > MAX_TARGETS:
+            raise ValueError(f"Gates can act on at most {MAX_TARGETS} qubits, got {n}")
+        group, code = self.n_groups, self.opcode(strip_controls(name))
+        mask = _mask(con) if con else 0
+        padding = (0,) * (MAX_TARGETS - n)
+        records = list()
+        for i, qubits in enumerate(targets):
+            param = argidx[i] if argidx is not None and i < len(argidx) else -1
+            qubits = tuple(qubits) + padding
+            records.append((group, GATE, code, n, qubits, mask, trigger, param, -1, 0))
+        return self._append(records)
+
+    def add_measurement(self, name, qubits, clbits, basis=None):
+        """ Appends a measurement to the table.
+
+        Parameters
+        ----------
+        name: str
+            Name of the measurement.
+        qubits: list of int
+            Indices of the measured qubits.
+        clbits: list of int
+            Indices of the classical bits the results are stored in.
+        basis: str, optional
+            The basis in which is measured.
+
+        Returns
+        -------
+        group: int
+            Index of the instruction.
+        """
+        group, code = self.n_groups, self.opcode(name)
+        basis = BASES.index(basis.lower() if basis else None)
+        padding = (0,) * (MAX_TARGETS - 1)
+        records = [(group, MEASUREMENT, code, 1, (q,) + padding, 0, 0, -1, c, basis)
+                   for q, c in zip(qubits, clbits)]
+        return self._append(records)
+
+    def append(self, inst):
+        """ Appends a bound Gate- or Measurement-object to the table.
+
+        Returns
+        -------
+        group: int
+            Index of the instruction.
+        """
+        if isinstance(inst, Measurement):
+            return self.add_measurement(inst.name, inst.qu_indices, inst.cl_indices, inst.basis)
+        targets = inst.qu_indices
+        if inst.size == 1:
+            targets = [[q] for q in targets]
+        return self.add_gate(inst.base_name, targets, inst.con_indices, inst.argidx,
+                             inst.size, inst.con_trigger)
+
+    def ref(self, group):
+        """ Returns a reference to an instruction, which is only created if accessed. """
+        return InstructionRef(self, group)
+
+    def view(self, group):
+        """ Returns the Gate- or Measurement-object of an instruction.
+
+        The object is created once and is read-only, since changes of its attributes
+        wouldn't be written back to the table. The arguments of the gate are linked to
+        the parameter table of the circuit, so they always reflect the current parameters.
+        """
+        inst = self._views.get(group)
+        if inst is None:
+            inst = self._create_view(group)
+            inst.set_read_only()
+            self._views[group] = inst
+        return inst
+
+    def _create_view(self, group):
+        rows = self.group_rows(group)
+        first = rows[0]
+        name = self.names[first["opcode"]]
+        if first["kind"] == MEASUREMENT:
+            qubits = self.qureg.list(rows["targets"][:, 0].tolist())
+            clbits = self.clreg.list(rows["clbit"].tolist())
+            inst = Measurement(name, qubits, clbits, basis=BASES[first["basis"]], idx=group)
+        else:
+            size = int(first["size"])
+            if size > 1:
+                qubits = [self.qureg.list(t[:size].tolist()) for t in rows["targets"]]
+            else:
+                qubits = self.qureg.list(rows["targets"][:, 0].tolist())
+            con = self.qureg.list(_unmask(first["controls"])) if first["controls"] else None
+            inst = Gate(name, qubits, con, n=size, trigger=int(first["trigger"]), idx=group)
+            params = rows["param"]
+            if params[0] >= 0:
+                inst.bind(self.pmap, params[params >= 0].astype("int"))
+        if inst.pmap is None:
+            # Instructions without arguments are linked to the table without adding slots
+            inst.pmap, inst._init_args = self.pmap, None
+        return inst
+
+    def to_dict(self, group):
+        """ Builds the dictionary of an instruction, see 'Instruction.to_dict'. """
+        rows = self.group_rows(group)
+        first = rows[0]
+        name = self.names[first["opcode"]]
+        size = int(first["size"])
+        if first["kind"] == MEASUREMENT:
+            qbits = rows["targets"][:, 0].tolist()
+            return dict(idx=group, name=name, qbits=qbits, con=None, cbits=rows["clbit"].tolist(),
+                        arg=None, argidx=None)
+        con = _unmask(first["controls"]) or None
+        if con is not None:
+            name = "c" * len(con) + name
+        if size > 1:
+            qbits = [t[:size].tolist() for t in rows["targets"]]
+        else:
+            qbits = rows["targets"][:, 0].tolist()
+        params = rows["param"]
+        argidx = params[params >= 0]
+        if len(argidx):
+            arg, argidx = self.pmap.lookup(argidx).tolist(), argidx.tolist()
+        else:
+            arg, argidx = None, None
+        return dict(idx=group, name=name, qbits=qbits, con=con, cbits=None, arg=arg, argidx=argidx)
+
+    def prefix_hashes(self, seed=b"", stop=None):
+        """ Computes hashes of all prefixes of the instructions.
+
+        The hashes are computed incrementally from the rows, the names, the revisions of
+        the registered gates and the current parameters of the instructions, so equal
+        prefixes of different tables have equal hashes. Replacing a gate in the registry
+        changes the hashes of all prefixes containing the gate.
+
+        Parameters
+        ----------
+        seed: bytes, optional
+            Data the hashes start from, for example the initial state.
+        stop: int, optional
+            Number of instructions to hash. The default is the number of instructions
+            before the first measurement.
+
+        Returns
+        -------
+        hashes: list of bytes
+            The k-th hash refers to the first k instructions.
+        """
+        kinds = self.kinds
+        if stop is None:
+            measurements = np.flatnonzero(kinds == MEASUREMENT)
+            stop = measurements[0] if len(measurements) else self.n_groups
+        rows = self.rows
+        params = self.pmap.params
+        bounds = self.starts.tolist() + [self.n_rows]
+        h = hashlib.blake2b(seed, digest_size=16)
+        hashes = [h.digest()]
+        for group in range(stop):
+            group_rows = rows[bounds[group]:bounds[group + 1]]
+            name = self.names[group_rows[0]["opcode"]]
+            h.update(name.encode())
+            if group_rows[0]["kind"] == GATE:
+                h.update(get_gate_spec(name).revision.to_bytes(8, "little"))
+            h.update(group_rows.tobytes())
+            slots = group_rows["param"]
+            h.update(params[slots[slots >= 0]].tobytes())
+            hashes.append(h.digest())
+        return hashes
+
+    def steps(self, start=0):
+        """ Iterates over the instructions and the kernel calls of the gates.
+
+        Only measurements are created as objects, gates are resolved from the rows.
+
+        Parameters
+        ----------
+        start: int, optional
+            Index of the first instruction. The default is 0.
+
+        Yields
+        ------
+        inst: Measurement or None
+            The measurement-instruction or 'None' for gates.
+        kernels: list of tuple of (callable, tuple) or None
+            The kernel calls of a gate or 'None' for measurements.
+        """
+        # Converting all rows at once is much faster than accessing the fields of each row,
+        # the converted rows are kept until the table is modified
+        if self._records is None:
+            self._records = self.rows.tolist(), self.starts.tolist() + [self.n_rows]
+        records, bounds = self._records
+        params = self.pmap.params
+        for group in range(start, self.n_groups):
+            rows = records[bounds[group]:bounds[group + 1]]
+            if rows[0][1] == MEASUREMENT:
+                yield self.view(group), None
+            else:
+                yield None, self._kernels(rows, params)
+
+    def kernels(self, group):
+        """ Resolves the kernel calls of a gate directly from the rows of the table.
+
+        See Also
+        --------
+        qsim.core.backends.gate_kernels
+
+        Parameters
+        ----------
+        group: int
+            Index of the gate-instruction.
+
+        Returns
+        -------
+        kernels: list of tuple of (callable, tuple)
+        """
+        return self._kernels(self.group_rows(group).tolist(), self.pmap.params)
+
+    def _kernels(self, rows, params):
+        _, _, opcode, size, _, controls, trigger, _, _, _ = rows[0]
+        spec = get_gate_spec(self.names[opcode])
+        kernel = spec.kernel
+        con = _unmask(controls) if controls else None
+        kernels = list()
+        for row in rows:
+            qubits = list(row[4][:size])
+            param = row[7]
+            arg = None if param < 0 else params[param]
+            key = ("local", spec.name, kernel, arg, size)
+            if kernel == "diagonal":
+                diag = GATE_CACHE.get(key, spec.diagonal, arg)
+                kernels.append((apply_diagonal, (diag, qubits, con, trigger)))
+            elif kernel == "permutation":
+                perm, phases = GATE_CACHE.get(key, spec.permutation, arg)
+                kernels.append((apply_permutation, (perm, phases, qubits, con, trigger)))
+            else:
+                matrix = GATE_CACHE.get(key, spec.local_matrix, arg, size)
+                if con:
+                    kernels.append((apply_controlled, (matrix, qubits, con, trigger)))
+                else:
+                    kernels.append((apply_matrix, (matrix, qubits)))
+        return kernels
@@ -37,6 +37,11 @@ P0 = np.dot(ZERO[:, np.newaxis], ZERO[np.newaxis, :])
 P1 = np.dot(ONE[:, np.newaxis], ONE[np.newaxis, :])
 PROJECTIONS = [P0, P1]
 
+# Maximal number of bits of dense histograms over all outcomes
+DENSE_HISTOGRAM_BITS = 20
+# Maximal number of bits of outcomes encoded as integers
+INT_BITS = 64
+
 
 def kron(*args):
     """ Computes the Kronecker product of two or more arrays.
@@ -289,12 +294,165 @@ class Basis:
         return "Basis(" + ", ".join(self.labels) + ")"
 
 
-def binary_histogram(data, normalize=True):
-    n, n_bins = data.shape
-    binvals = np.power(2, np.arange(n_bins))[::-1]
-    data = np.sum(data * binvals[np.newaxis, :], axis=1)
-    hist, edges = np.histogram(data, bins=np.arange(2 ** n_bins + 1))
-    bins = edges[:-1].astype("int")  # + 0.5
+def pack_binary(binary):
+    """ Packs binary measurement data into bytes, the first bit being the most significant one.
+
+    Parameters
+    ----------
+    binary: (..., n_bits) array_like
+        Binary data of 0 and 1. Values of np.nan are packed as 0.
+
+    Returns
+    -------
+    packed: (..., ceil(n_bits / 8)) np.ndarray of np.uint8
+    """
+    binary = np.nan_to_num(np.asarray(binary)).astype(np.uint8)
+    return np.packbits(binary, axis=-1)
+
+
+def unpack_binary(packed, n_bits):
+    """ Unpacks bytes into binary data of the first 'n_bits' bits, see 'pack_binary'.
+
+    Returns
+    -------
+    binary: (..., n_bits) np.ndarray of np.uint8
+    """
+    return np.unpackbits(packed, axis=-1, count=n_bits)
+
+
+def packed_to_int(packed, n_bits):
+    """ Converts packed binary data to integers, the first bit being the most significant one.
+
+    Parameters
+    ----------
+    packed: (..., ceil(n_bits / 8)) array_like of np.uint8
+    n_bits: int
+        Number of bits of the data. At most 'INT_BITS' (64) bits are supported.
+
+    Returns
+    -------
+    values: (...) np.ndarray of np.uint64
+    """
+    if n_bits > INT_BITS:
+        raise ValueError(f"Can't convert {n_bits} bits to integers, "
+                         f"at most {INT_BITS} bits are supported")
+    packed = np.asarray(packed, dtype=np.uint64)
+    n_bytes = packed.shape[-1]
+    values = np.zeros(packed.shape[:-1], dtype=np.uint64)
+    for j in range(n_bytes):
+        values = (values << np.uint64(8)) | packed[..., j]
+    return values >> np.uint64(8 * n_bytes - n_bits)
+
+
+def int_to_binary(values, n_bits):
+    """ Converts integers to binary data, the first bit being the most significant one.
+
+    Returns
+    -------
+    binary: (..., n_bits) np.ndarray of np.uint8
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    shifts = np.arange(n_bits - 1, -1, -1, dtype=np.uint64)
+    return ((values[..., np.newaxis] >> shifts) & np.uint64(1)).astype(np.uint8)
+
+
+def int_histogram(values, n_bits, weights=None, sparse=None):
+    """ Counts integer outcomes of a number of bits.
+
+    Narrow registers are counted with 'np.bincount' into a dense histogram over all
+    .math:'2^n' outcomes. For wide registers the dense histogram doesn't fit into
+    memory, therefore only the observed outcomes and their counts are returned.
+
+    Parameters
+    ----------
+    values: array_like of int
+        The integer outcomes.
+    n_bits: int
+        Number of bits of the outcomes.
+    weights: array_like of int, optional
+        Number of occurrences of each value. By default each value is counted once.
+    sparse: bool, optional
+        Flag if the sparse histogram is returned. By default the sparse histogram is
+        used for more than 'DENSE_HISTOGRAM_BITS' bits.
+
+    Returns
+    -------
+    bins: np.ndarray
+        All .math:'2^n' outcomes or the sorted observed outcomes (sparse).
+    hist: np.ndarray of int
+    """
+    values = np.asarray(values)
+    if sparse is None:
+        sparse = n_bits > DENSE_HISTOGRAM_BITS
+    if sparse:
+        bins, inverse = np.unique(values, return_inverse=True)
+        hist = np.bincount(inverse.ravel(), weights=weights, minlength=len(bins))
+    else:
+        bins = np.arange(2 ** n_bits)
+        hist = np.bincount(values.astype("int"), weights=weights, minlength=len(bins))
+    return bins, hist.astype("int")
+
+
+def packed_histogram(packed, n_bits, weights=None, sparse=None):
+    """ Counts bit-packed outcomes, see 'pack_binary'.
+
+    Outcomes of at most 'INT_BITS' bits are converted to integers and counted with
+    'int_histogram'. Wider outcomes don't fit into integers, their sparse histogram
+    is built from the unique rows of the packed bytes.
+
+    Parameters
+    ----------
+    packed: (n, ceil(n_bits / 8)) array_like of np.uint8
+        The packed outcomes.
+    n_bits: int
+        Number of bits of the outcomes.
+    weights: array_like of int, optional
+        Number of occurrences of each outcome. By default each outcome is counted once.
+    sparse: bool, optional
+        Flag if the sparse histogram is returned, see 'int_histogram'. Outcomes of
+        more than 'INT_BITS' bits only support the sparse histogram.
+
+    Returns
+    -------
+    bins: np.ndarray
+        The integer outcomes or, for more than 'INT_BITS' bits, the sorted observed
+        outcomes as (k, ceil(n_bits / 8)) rows of packed bytes.
+    hist: np.ndarray of int
+    """
+    packed = np.asarray(packed, dtype=np.uint8)
+    if n_bits <= INT_BITS:
+        return int_histogram(packed_to_int(packed, n_bits), n_bits, weights, sparse)
+    if sparse is False:
+        raise ValueError(f"The dense histogram of {n_bits} bits doesn't fit into memory")
+    if weights is None:
+        return np.unique(packed, axis=0, return_counts=True)
+    bins, inverse = np.unique(packed, axis=0, return_inverse=True)
+    hist = np.bincount(inverse.ravel(), weights=weights, minlength=len(bins))
+    return bins, hist.astype("int")
+
+
+def binary_histogram(data, normalize=True, sparse=None):
+    """ Computes the histogram of binary measurement data.
+
+    The shots are packed into bytes, the first bit being the most significant one,
+    and counted with 'packed_histogram'. Values of np.nan (unmeasured bits) are counted as 0.
+
+    Parameters
+    ----------
+    data: (n, n_bits) array_like
+        Binary data of 0 and 1.
+    normalize: bool, optional
+        Flag if the histogram should be normalized
+    sparse: bool, optional
+        Flag if the sparse histogram is returned, see 'int_histogram'.
+
+    Returns
+    -------
+    bins: np.ndarray
+    hist: np.ndarray
+    """
+    n, n_bits = np.shape(data)
+    bins, hist = packed_histogram(pack_binary(data), n_bits, sparse=sparse)
     if normalize:
         hist = hist / n
     return bins, hist
@@ -167,7 +167,7 @@ class CircuitString(Visualizer):
         trig = "0" if gate.con_trigger == 0 else "1"
         idx = gate.qu_indices
         con = gate.con_indices
-        label = gate.name.replace("c", "")
+        label = gate.base_name
         self.add_gate(idx, label, pad)
         # Connect control qubits
         con_out, idx_out = outer_indices(con, idx)
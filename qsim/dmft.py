@@ -8,6 +8,10 @@ version: 1.0
 """
 import numpy as np
 from scipy import optimize
+from qsim.core.gates import X_GATE, Y_GATE
+from qsim.core.kernels import apply_matrix
+
+PAULI_PAIRS = ["xx", "xy", "yx", "yy"]
 
 
 def gf_greater(xx, yx, xy, yy):
@@ -18,6 +22,78 @@ def gf_lesser(xx, xy, yx, yy):
     return +0.25j * (xx - 1j*xy + 1j*yx + yy)
 
 
+def measure_correlators(propagator, amp, steps, qubit=0, imag=True):
+    r""" Computes the Hadamard-test data of the Green's function exactly for all Pauli pairs.
+
+    The Hadamard test of the pair (a, b) controls .math:'\sigma_a' before and
+    .math:'\sigma_b' after the time evolution and measures the real or imaginary
+    part of the two-time correlator
+
+    .. math::
+        C_{ba}(t) = <\Psi| \sigma_b(t) \sigma_a |\Psi>,
+        \quad \sigma_b(t) = U^\dagger(t) \sigma_b U(t)
+
+    Here the correlators are evaluated directly on the system state instead of running
+    a circuit with an ancilla qubit for each pair. The states .math:'|\Psi>',
+    .math:'\sigma_x |\Psi>' and .math:'\sigma_y |\Psi>' are evolved together, such that
+    all four pairs share one evolution:
+
+    .. math::
+        C_{ba}(t) = <\sigma_b U(t) \Psi | U(t) \sigma_a \Psi>
+
+    Parameters
+    ----------
+    propagator: Propagator
+        Propagator of one time step of the system.
+    amp: (N) array_like
+        Coefficients of the system state .math:'|\Psi>'.
+    steps: int or array_like of int
+        Maximal number of time steps or the step counts of the data.
+    qubit: int, optional
+        Index of the qubit of the Pauli operators. The default is 0.
+    imag: bool, optional
+        Flag if the data of the imaginary part of the Green's function is computed,
+        which is the real part of the correlators. Otherwise the imaginary part of the
+        correlators is returned. The default is 'True'.
+
+    Returns
+    -------
+    data: (M, 4) np.ndarray
+        The real data of each time step for the Pauli pairs in the order of 'PAULI_PAIRS'.
+    """
+    n = propagator.n_qubits
+    amp = np.asarray(amp, dtype="complex")
+    paulis = [X_GATE, Y_GATE]
+    initial = [amp] + [apply_matrix(amp, n, pauli, [qubit]) for pauli in paulis]
+    states = propagator.states(np.array(initial), steps)
+    psi_t, sigma_t = states[:, 0], states[:, 1:]
+    corr = list()
+    for pauli in paulis:
+        bra = apply_matrix(psi_t, n, pauli, [qubit])
+        corr.append(np.sum(np.conj(bra)[:, np.newaxis] * sigma_t, axis=-1))
+    # corr[b][:, a] is C_ba, which is measured by the Hadamard test of the pair (a, b)
+    data = np.stack(corr, axis=-1).reshape(-1, 4)
+    return data.real if imag else data.imag
+
+
+def greens_function(data):
+    """ Computes the Green's function from the Hadamard-test data of the Pauli pairs.
+
+    Parameters
+    ----------
+    data: (M, 4) array_like
+        The data of each time step for the Pauli pairs in the order of 'PAULI_PAIRS',
+        see 'measure_correlators'.
+
+    Returns
+    -------
+    gf: (M) np.ndarray
+        The difference of the greater and lesser Green's function.
+    """
+    xx, xy, yx, yy = np.asarray(data).T
+    return gf_greater(xx, yx, xy, yy) - gf_lesser(xx, xy, yx, yy)
+
+
 def gf_fit(t, alpha_1, alpha_2, omega_1, omega_2):
     return 2 * (alpha_1 * np.cos(omega_1 * t) + alpha_2 * np.cos(omega_2 * t))
 
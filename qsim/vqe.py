@@ -100,6 +100,9 @@ class VqeSolver:
         self.circuit = circuit
 
     def expectation(self, params):
+        if self.circuit.plan is None:
+            # Gates without parameters are only built once for all evaluations
+            self.circuit.compile()
         self.circuit.set_params(params)
         self.circuit.run_circuit()
         return self.circuit.expectation(self.ham)
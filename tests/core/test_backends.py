@@ -11,7 +11,10 @@ import numpy as np
 from numpy.testing import assert_array_equal, assert_array_almost_equal
 from qsim.core.utils import *
 from qsim.core.register import QuRegister
-from qsim.core.backends import StateVector
+from qsim.core.backends import StateVector, BatchedStateVector, SnapshotStore, PrefixCache
+from qsim.core.instruction import Gate
+from qsim.core.gates import GATE_REGISTRY, GATE_CACHE, X_GATE, register_gate
+from qsim.core.circuit import Circuit
 
 si, sx, sy, sz = pauli
 
@@ -85,6 +88,15 @@ def test_expectation():
     assert pytest.approx(x, 1e-10) == -1.0
 
 
+def test_expectation_pauli():
+    state.prepare(MINUS, IPLUS)
+    assert pytest.approx(state.expectation("XI"), 1e-10) == -1.0
+    assert pytest.approx(state.expectation("IY"), 1e-10) == +1.0
+    assert pytest.approx(state.expectation("Y", reg[1]), 1e-10) == +1.0
+    assert pytest.approx(state.expectation(sx, reg[0]), 1e-10) == -1.0
+    assert pytest.approx(state.expectation([(2, "XI"), (0.5, {1: "Y"})]), 1e-10) == -1.5
+
+
 def test_project():
     state.prepare(PLUS, PLUS)
     p = state.project(0, P0)
@@ -116,6 +128,19 @@ def test_apply_unitary():
     assert_array_equal(state.amp, [1, 0, 0, 0])
 
 
+def test_apply_gate():
+    state.prepare(PLUS, ONE)
+    u = kron(si, sx).dot(state.amp)
+    state.apply_gate(Gate.x(reg[1]))
+    assert_array_almost_equal(state.amp, u)
+
+    state.prepare(PLUS, ZERO)
+    gate = Gate.x(reg[1], con=reg[0])
+    u = gate.build_matrix(2).dot(state.amp)
+    state.apply_gate(gate)
+    assert_array_almost_equal(state.amp, u)
+
+
 def test_measure_qubit():
     state.prepare([ZERO, ZERO])
     x = state.measure_qubit(reg[0])
@@ -269,3 +294,114 @@ def test_measure():
     state.prepare([ONE, ZERO])
     x = state.measure_z(reg[0:2])
     assert x == [-1, +1]
+
+
+def test_measure_post_state():
+    state.set(np.array([1, 0, 0, 1]) / np.sqrt(2))
+    val = state.measure_z(reg[0])[0]
+    expected = [1, 0, 0, 0] if val == +1 else [0, 0, 0, 1]
+    assert_array_almost_equal(state.amp, expected)
+
+    state.prepare(PLUS, ZERO)
+    val = state.measure_x(reg[0:2])
+    assert val[0] == +1
+    expected = kron(PLUS, PLUS) if val[1] == +1 else kron(PLUS, MINUS)
+    assert_array_almost_equal(state.amp, expected)
+
+
+def test_snapshot_store(tmp_path):
+    store = SnapshotStore(capacity=3)
+    assert len(store) == 0
+    for i in range(5):
+        store.append(np.full(4, i))
+    assert len(store) == 3
+    assert store.count == 5
+    assert_array_equal(store[0], np.full(4, 2))
+    assert_array_equal(store[-1], np.full(4, 4))
+    assert [x[0] for x in store] == [2, 3, 4]
+    with pytest.raises(IndexError):
+        store[3]
+
+    file = str(tmp_path / "snapshots.npy")
+    store = SnapshotStore(capacity=2, file=file)
+    store.append(np.arange(4))
+    store.flush()
+    assert_array_equal(np.load(file)[0], np.arange(4))
+
+
+def test_no_snapshots_by_default():
+    s = StateVector(QuRegister(2))
+    s.set(kron(PLUS, ZERO))
+    s.measure_z(s.qubits[0])
+    # Measurements don't allocate a snapshot buffer unless the store is configured
+    assert len(s.snapshots) == 0 and s.snapshots.size == 0
+    with pytest.raises(ValueError):
+        s.last
+    with pytest.raises(ValueError):
+        s.measure_z(s.qubits[0], snapshot=True)
+
+
+def test_save_snapshot():
+    state.configure_snapshots(capacity=2)
+    state.prepare(PLUS, ZERO)
+    state.measure_z(reg[0], snapshot=True)
+    assert_array_almost_equal(state.last, kron(PLUS, ZERO))
+
+
+def test_batched_statevector():
+    states = [kron(ZERO, ZERO), kron(PLUS, ONE), kron(IPLUS, MINUS)]
+    batch = BatchedStateVector(reg, states)
+    assert batch.batch_size == 3
+
+    gate = Gate.x(reg[1], con=reg[0])
+    batch.apply_gate(gate)
+    for i, s in enumerate(states):
+        state.set(s)
+        state.apply_gate(gate)
+        assert_array_almost_equal(batch[i], state.amp)
+        assert pytest.approx(batch.expectation("ZX")[i], 1e-10) == state.expectation("ZX")
+        expected = state.expectation(sy, reg[0])
+        assert pytest.approx(batch.expectation(sy, reg[0])[i], 1e-10) == expected
+    assert_array_almost_equal(batch.probabilities(reg[0:1]), [[1, 0], [0.5, 0.5], [0.5, 0.5]])
+
+    samples = batch.sample(100, reg[0:1])
+    assert samples.shape == (3, 100)
+    assert np.all(samples[0] == 0)
+    samples = batch.sample(100, rng=np.random.default_rng(1))
+    assert_array_equal(samples, batch.sample(100, rng=np.random.default_rng(1)))
+
+
+def test_prefix_cache():
+    cache = PrefixCache(maxbytes=2 * np.zeros(4, dtype="complex").nbytes, interval=2)
+    assert cache.is_checkpoint(2, 5) and cache.is_checkpoint(5, 5) and not cache.is_checkpoint(3, 5)
+    assert cache.lookup([b"0", b"1", b"2"]) == (0, None)
+
+    cache.store(b"1", np.ones(4, dtype="complex"))
+    cache.store(b"2", 2 * np.ones(4, dtype="complex"))
+    k, amp = cache.lookup([b"0", b"1", b"2", b"3"])
+    assert k == 2
+    assert_array_equal(amp, 2 * np.ones(4))
+    amp[:] = 0
+    assert_array_equal(cache.lookup([b"0", b"1", b"2"])[1], 2 * np.ones(4))
+
+    # Least recently used state is evicted
+    cache.store(b"3", 3 * np.ones(4, dtype="complex"))
+    assert len(cache) == 2 and b"1" not in cache
+    assert cache.hits == 2 and cache.misses == 1
+
+
+def test_add_custom_gate():
+    c = Circuit(1, 0)
+    c.h(0)
+    c.run_circuit()
+    assert_array_almost_equal(c.state.amp, PLUS)
+    spec = GATE_REGISTRY["h"]
+    try:
+        c.state.add_custom_gate("h", lambda *args: X_GATE)
+        c = Circuit(1, 0)
+        c.h(0)
+        c.run_circuit()
+        assert_array_almost_equal(c.state.amp, ONE)
+    finally:
+        register_gate(spec)
+        GATE_CACHE.clear()
@@ -6,10 +6,27 @@ author: Dylan Jones
 project: qsim
 version: 1.0
 """
+import pickle
 import pytest
-from numpy.testing import assert_array_equal
-from qsim.core.utils import kron, ONE, ZERO
-from qsim.core.circuit import Circuit
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from qsim.core.utils import kron, ONE, ZERO, PLUS
+from qsim.core.gates import GATE_REGISTRY, GATE_DICT, GATE_CACHE, GateSpec, register_gate
+from qsim.core.instruction import Gate
+from qsim.core.circuit import Circuit, Result
+from qsim.core.executor import run_parallel
+
+
+@pytest.fixture
+def gate_registry():
+    """ Restores the global gate registry after a test has registered custom gates. """
+    registry, funcs = dict(GATE_REGISTRY), dict(GATE_DICT)
+    yield GATE_REGISTRY
+    GATE_REGISTRY.clear()
+    GATE_REGISTRY.update(registry)
+    GATE_DICT.clear()
+    GATE_DICT.update(funcs)
+    GATE_CACHE.clear()
 
 
 def test_run_shot():
@@ -24,3 +41,452 @@ def test_run_shot():
     res = c.run_circuit(state=s0)
     assert_array_equal(res, [1, -1])
 
+
+def test_params():
+    c1 = Circuit(2, 0)
+    c1.rx(0, 0.1)
+    c1.add_gate("Ry", 1, argidx=0)
+    c2 = Circuit(2, 0)
+    c2.rz(0, 0.2)
+    assert c1.n_params == 1 and c2.n_params == 1
+    assert_array_almost_equal(c1[1].args, [0.1])
+
+    c1.set_params([0.5])
+    assert_array_almost_equal(c1[0].args, [0.5])
+    assert_array_almost_equal(c1[1].args, [0.5])
+    assert_array_almost_equal(c2.params, [0.2])
+
+    c3 = Circuit.from_string(c1.to_string())
+    assert_array_almost_equal(c3[0].args, [0.5])
+    assert_array_almost_equal(c3[1].args, [0.5])
+
+
+def test_add_from_other_circuit():
+    c1 = Circuit(2, 0)
+    c1.h(0)
+    c1.rx(1, 0.3)
+    c1.ry(0, 1.2)
+    c1.add_gate("Rz", 1, argidx=1)
+    c2 = Circuit(2, 0)
+    c2.rz(0, 2.0)
+    remap = dict()
+    for inst in c1:
+        c2.add(inst, remap)
+
+    assert_array_almost_equal(c2.params, [2.0, 0.3, 1.2])
+    assert c2[1].args is None
+    assert_array_almost_equal([c2[i].get_arg() for i in range(2, 5)], [0.3, 1.2, 1.2])
+    # The source circuit keeps its own parameters
+    c2.set_params([0.1, 0.2, 0.7])
+    assert_array_almost_equal(c1.params, [0.3, 1.2])
+    assert_array_almost_equal(c2[4].args, [0.7])
+
+    ref = Circuit(2, 0)
+    ref.rz(0, 0.1)
+    ref.h(0)
+    ref.rx(1, 0.2)
+    ref.ry(0, 0.7)
+    ref.rz(1, 0.7)
+    c2.run_circuit()
+    ref.run_circuit()
+    assert_array_almost_equal(c2.statevector, ref.statevector)
+
+
+def test_terminal_measurements():
+    c = Circuit(2, 2)
+    c.h(0)
+    c.mz(0)
+    c.mx(1)
+    assert len(c.terminal_measurements()) == 2
+
+    c.x(1)
+    assert c.terminal_measurements() is None
+
+
+def test_run_sampled():
+    c = Circuit(3, 3)
+    c.h(0)
+    c.cx(0, 1)
+    c.mz([0, 1])
+    res = c.run(1000)
+    assert res.shape == (1000, 3)
+    assert_array_equal(res.data[:, 0], res.data[:, 1])
+    assert np.all(np.isnan(res.data[:, 2]))
+    assert 0.4 < np.mean(res.data[:, 0] == 1) < 0.6
+
+    c = Circuit(2, 2)
+    c.h(0)
+    c.x(1)
+    c.mx(0)
+    c.mz(1)
+    res = c.run(100)
+    assert_array_equal(res.data, np.tile([1, -1], (100, 1)))
+
+    # The final state before the measurements is saved once
+    c.configure_snapshots(2)
+    c.run(100, snapshot=True)
+    assert len(c.state.snapshots) == 1
+    assert_array_almost_equal(c.state.last, kron(PLUS, ONE))
+
+
+def test_result_formats(tmp_path):
+    c = Circuit(3, 10)
+    c.h(0)
+    c.x(2)
+    c.cx(0, 1)
+    c.mz([0, 1, 2], [0, 1, 9])
+    np.random.seed(0)
+    raw = c.run(500)
+    np.random.seed(0)
+    packed = c.run(500, format="packed")
+    np.random.seed(0)
+    counts = c.run(500, format="counts")
+    assert (raw.format, packed.format, counts.format) == ("raw", "packed", "counts")
+    assert packed.packed().shape == (500, 2) and packed.packed().dtype == np.uint8
+    assert_array_equal(packed.data, raw.data)
+
+    outcomes, freq = counts.outcomes()
+    assert len(outcomes) == 2 and np.sum(freq) == 500
+    # Unmeasured bits are counted as 0 in the histogram of the packed data
+    hist = Result(np.nan_to_num(raw.data, nan=1)).histogram()[1]
+    for res in (packed, counts, raw.convert("counts"), counts.convert("packed")):
+        assert res.shape == (500, 10)
+        assert_array_almost_equal(res.mean(), raw.mean())
+        assert_array_equal(res.histogram()[1], hist)
+        assert_array_equal(np.sort(res.binary(), axis=0), np.sort(raw.binary(), axis=0))
+
+    for res in (raw, packed, counts):
+        res.save(tmp_path / res.format)
+        ext = ".npy" if res.format == "raw" else ".npz"
+        loaded = Result.laod(tmp_path / (res.format + ext))
+        assert loaded.format == res.format
+        assert_array_almost_equal(loaded.mean(), raw.mean())
+        assert_array_equal(loaded.measured, raw.measured)
+
+
+def test_result_wide():
+    c = Circuit(2, 40)
+    c.h(0)
+    c.cx(0, 1)
+    c.mz([0, 1], [0, 39])
+    for fmt in ("raw", "packed", "counts"):
+        res = c.run(100, format=fmt)
+        assert res._basis is None
+        bins, hist = res.histogram()
+        assert len(bins) == 2 and bins[1] == 2 ** 39 + 1
+        assert abs(np.sum(hist) - 1) < 1e-10
+
+
+def test_stream(tmp_path):
+    c = Circuit(2, 2)
+    c.h(0)
+    c.cx(0, 1)
+    c.mz([0, 1])
+    stream = c.stream(chunk_size=64, shots=200, spill=tmp_path / "shots")
+    chunks = [chunk.data for chunk in stream]
+    assert [len(x) for x in chunks] == [64, 64, 64, 8]
+    data = np.concatenate(chunks)
+    assert stream.n_samples == 200 and stream.spill.closed
+    assert_array_equal(np.load(stream.spill.file), data)
+    assert_array_almost_equal(stream.stats.mean(), np.mean(data, axis=0))
+    assert stream.stats.histogram()[1][[1, 2]].sum() == 0
+
+    # Open-ended stream of packed chunks, stopped by the caller
+    c = Circuit(1, 1)
+    c.h(0)
+    c.m(0)
+    stream = c.stream(chunk_size=100, format="packed")
+    for chunk in stream:
+        assert chunk.format == "packed"
+        if stream.stats.stderr()[0] < 0.05:
+            break
+    assert stream.n_samples >= 400
+    assert abs(stream.stats.mean()[0]) < 0.25
+
+
+def test_run_batch():
+    c = Circuit(2, 2)
+    c.h(0)
+    c.cx(0, 1)
+    batch = c.run_batch([kron(ZERO, ZERO), kron(ONE, ZERO)])
+    assert batch.batch_size == 2
+    assert_array_equal(np.round(batch.expectation("ZZ"), 10), [1, 1])
+    assert_array_equal(np.round(batch.expectation("XX"), 10), [1, -1])
+
+
+def test_run_parallel():
+    c = Circuit(2, 2)
+    c.h(0)
+    c.mz(0)
+    c.cx(0, 1)
+    c.mz(1)
+    res = c.run(40, workers=2, seed=1)
+    assert res.shape == (40, 2)
+    assert_array_equal(res.data[:, 0], res.data[:, 1])
+    assert_array_equal(res.data, c.run(40, workers=2, seed=1).data)
+
+    # The seed sequence of the caller isn't consumed by the workers
+    seed = np.random.SeedSequence(5)
+    res = c.run(40, workers=2, seed=seed)
+    assert_array_equal(res.data, c.run(40, workers=2, seed=seed).data)
+    assert seed.n_children_spawned == 0
+    assert res.circuit_hash == c.fingerprint() and len(res.seeds) == 2
+
+    with pytest.raises(ValueError):
+        c.run(40, workers=2, snapshot=True)
+
+
+def flip_gate(arg=None):
+    return np.array([[0, 1], [1, 0]])
+
+
+def test_run_parallel_spawn(gate_registry):
+    Circuit.add_custom_gate("flip", flip_gate)
+    c = Circuit(2, 2)
+    c.add_gate("flip", 0)
+    c.mz(0)
+    c.cx(0, 1)
+    c.mz(1)
+    c.enable_prefix_cache()
+    c.configure_snapshots(4)
+    c.run_circuit(snapshot=True)
+
+    # Only the instructions and parameters are pickled
+    copy = pickle.loads(pickle.dumps(c))
+    assert copy.prefix_cache is None and len(copy.state.snapshots) == 0
+    assert copy.to_string() == c.to_string()
+
+    # Spawned workers only know the custom gate through the initializer of the pool
+    res = run_parallel(c, 6, workers=2, seed=1, mp_context="spawn")
+    assert_array_equal(res.data, -np.ones((6, 2)))
+
+
+def test_control_prefix():
+    # Gate names with an explicit control prefix, as used for Hadamard tests
+    c = Circuit(2, 1)
+    c.h(0)
+    c.add_gate("cX", qubits=1, con=0, trigger=0)
+    c.add_gate("cY", qubits=1, con=0, trigger=1)
+    assert c[1].base_name.lower() == "x" and c[1].con_indices == [0]
+    c.run_circuit()
+    expected = kron(ONE, 1j * ONE) + kron(ZERO, ONE)
+    assert_array_almost_equal(c.state.amp, expected / np.sqrt(2))
+
+
+def test_string_roundtrip():
+    c = Circuit(3, 1)
+    c.h(0)
+    c.cx(0, 1)
+    c.cx([0, 1], 2)
+    c.rz(2, 0.3)
+    c2 = Circuit.from_string(c.to_string())
+    assert c2.to_string() == c.to_string()
+    assert [inst.name for inst in c2] == [inst.name for inst in c]
+    c.run_circuit()
+    c2.run_circuit()
+    assert_array_almost_equal(c2.state.amp, c.state.amp)
+
+
+def test_gate_kernels():
+    c = Circuit(4, 0)
+    c.h([0, 1, 2, 3])
+    c.rz([0, 2], 0.3)
+    c.s(1)
+    c.t(3)
+    c.cz(0, 3)
+    c.crz(1, 2, 0.7, trigger=0)
+    c.xy([[0, 1], [2, 3]], 0.2)
+    c.b([[0, 2], [1, 3]], 0.5)
+    c.ry([1, 3], 0.4)
+    c.cx(2, 0)
+    c.cy(3, 1, trigger=0)
+    c.cx([0, 1], 3)
+    c.swap([[0, 3], [2, 1]])
+
+    amp = kron([ZERO] * 4)
+    for gate in c:
+        amp = gate.build_matrix(4).dot(amp)
+    c.run_circuit()
+    assert_array_almost_equal(c.statevector, amp)
+
+
+def test_two_qubit_gate(gate_registry):
+    def iswap(arg=None):
+        return np.array([[1, 0, 0, 0], [0, 0, 1j, 0], [0, 1j, 0, 0], [0, 0, 0, 1]])
+
+    Circuit.add_two_qubit_gate("iswap", iswap)
+    assert "iswap" in gate_registry
+    c = Circuit(3, 0)
+    c.x(0)
+    gate = c.add(Gate("iswap", [c.qureg.list([0, 2])], n=2))
+    c.run_circuit()
+    assert_array_almost_equal(c.statevector, 1j * kron(ZERO, ZERO, ONE))
+    assert_array_almost_equal(gate.build_matrix(3)[1, 4], 1j)
+
+
+def test_compile_bind():
+    c = Circuit(3, 0)
+    c.ry([0, 1, 2], 0.1)
+    c.cx(0, 1)
+    c.cx(1, 2)
+    c.h(0)
+    c.rz([1, 2], 0.2)
+    plan = c.compile()
+    assert plan.n_parametric > 0
+    steps = enumerate(plan.steps())
+    fixed = [(i, kernels) for i, (_, kernels) in steps if i not in plan.parametric]
+    assert fixed
+
+    for params in [np.linspace(0, 1, c.n_params), np.linspace(1, 3, c.n_params)]:
+        plan.bind(params)
+        c.run_circuit()
+        amp = kron([ZERO] * 3)
+        for gate in c:
+            amp = gate.build_matrix(3).dot(amp)
+        assert_array_almost_equal(c.statevector, amp)
+
+    # Kernels of gates without parameters are never rebuilt
+    assert all(plan.kernels[i] is kernels for i, kernels in fixed)
+
+    # Parameters written directly to the table refresh the plan before the next run
+    c.pmap[0] = 2.5
+    c.run_circuit()
+    amp = kron([ZERO] * 3)
+    for gate in c:
+        amp = gate.build_matrix(3).dot(amp)
+    assert_array_almost_equal(c.statevector, amp)
+    with pytest.raises(ValueError):
+        c.params[0] = 1.0
+
+
+def test_prefix_cache():
+    def trotter_circuit(steps, arg=0.3):
+        c = Circuit(3, 1)
+        c.h([0, 1, 2])
+        for _ in range(steps):
+            c.xy([[0, 1], [1, 2]], arg)
+            c.b([[0, 2]], arg / 2)
+        return c
+
+    cache = None
+    for steps in range(1, 5):
+        c = trotter_circuit(steps)
+        c.run_circuit()
+        expected = c.statevector.copy()
+
+        c = trotter_circuit(steps)
+        cache = c.enable_prefix_cache(cache, interval=1)
+        c.run_circuit()
+        assert_array_almost_equal(c.statevector, expected)
+    # Each run resumes from the final state of the previous one
+    assert cache.hits == 3 and cache.misses == 1
+
+    # Changed parameters of the last layer only invalidate the last checkpoint
+    c = trotter_circuit(4)
+    c.set_param(c.n_params - 1, 0.1)
+    c.run_circuit()
+    expected = c.statevector.copy()
+    c.enable_prefix_cache(cache)
+    c.run_circuit()
+    assert_array_almost_equal(c.statevector, expected)
+    assert cache.hits == 4
+
+    # Measurements are simulated after the cached prefix
+    c = trotter_circuit(1)
+    c.x(0)
+    c.m(0)
+    c.enable_prefix_cache(cache)
+    assert c.run_circuit()[0] in (-1, 1)
+
+
+def test_prefix_cache_register_gate(gate_registry):
+    def x_circuit():
+        c = Circuit(1, 0)
+        for _ in range(3):
+            c.x(0)
+        return c
+
+    c = x_circuit()
+    cache = c.enable_prefix_cache(interval=1)
+    c.run_circuit()
+    assert_array_almost_equal(c.statevector, ONE)
+
+    # Replacing the gate-function invalidates the cached states of the gate
+    register_gate(GateSpec("x", local=lambda *args: np.eye(2)))
+    c = x_circuit()
+    c.enable_prefix_cache(cache)
+    c.run_circuit()
+    assert_array_almost_equal(c.statevector, ZERO)
+    assert cache.hits == 0 and cache.misses == 2
+
+
+def test_custom_gate_metadata(gate_registry):
+    def phase(arg=0):
+        return np.array([1, np.exp(1j * arg)])
+
+    Circuit.add_custom_gate("p", diagonal=phase, n_params=1)
+    c = Circuit(2, 0)
+    c.h([0, 1])
+    gate = c.add_gate("P", 1, arg=0.4)
+    assert gate.kernel == "diagonal"
+    assert_array_almost_equal(gate.build_matrix(2), np.diag(np.tile(phase(0.4), 2)))
+
+    c.run_circuit()
+    expected = np.array([1, np.exp(0.4j), 1, np.exp(0.4j)]) / 2
+    assert_array_almost_equal(c.statevector, expected)
+
+
+def test_custom_gate_cache(gate_registry):
+    def flip(arg=None):
+        return np.array([[0, 1], [1, 0]])
+
+    c = Circuit(2, 0)
+    c.ry(1, 0.3)
+    c.add(Gate.custom("flip", flip, c.qubits[0]))
+    c.run_circuit()
+    entries, hits = len(GATE_CACHE), GATE_CACHE.hits
+
+    # Registering the same function again keeps the cached matrices
+    c.add(Gate.custom("flip", flip, c.qubits[0]))
+    c.run_circuit()
+    assert len(GATE_CACHE) == entries
+    assert GATE_CACHE.hits > hits
+
+    # A new function only removes the matrices of that gate
+    Gate.add_custom_gate("flip", lambda arg=None: np.eye(2))
+    names = [key[1].lower() for key in GATE_CACHE._items]
+    assert "flip" not in names and "ry" in names
+    c.run_circuit()
+    ref = Circuit(2, 0)
+    ref.ry(1, 0.3)
+    ref.run_circuit()
+    assert_array_almost_equal(c.statevector, ref.statevector)
+
+
+def test_compile():
+    c = Circuit(4, 4)
+    c.ry([0, 1, 2, 3], 0.3)
+    c.cx(2, 3)
+    c.ry([2, 3], 0.5)
+    c.cx(0, 2)
+    c.ry([0, 2], 0.2)
+    c.cx(0, 1)
+    c.xy([[1, 2], [0, 3]], 0.4)
+    c.b([1, 3], 0.6)
+    c.crx(3, 1, 0.8, trigger=0)
+    c.run_circuit()
+    expected = c.statevector.copy()
+
+    plan = c.compile(max_width=2)
+    assert plan.n_eliminated > 0
+    assert plan.n_applications + plan.n_eliminated == plan.n_operations
+    c.run_circuit()
+    assert_array_almost_equal(c.statevector, expected)
+
+    plan = c.compile(max_width=4)
+    assert plan.n_applications == 1
+    c.run_circuit()
+    assert_array_almost_equal(c.statevector, expected)
+
+    c.mz()
+    assert c.plan is None
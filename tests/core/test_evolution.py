@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from qsim.core.utils import kron, ZERO, ONE
+from qsim.core.circuit import Circuit
+from qsim.core.evolution import Propagator
+
+
+def trotter_step(n=4, xy_arg=0.2, b_arg=0.3):
+    c = Circuit(n, 0)
+    c.xy([[0, 1], [2, 3]], xy_arg)
+    c.b([[0, 2]], b_arg)
+    return c
+
+
+def reference_states(n, steps, amp):
+    states = list()
+    for k in range(steps + 1):
+        c = trotter_step(n)
+        for _ in range(k - 1):
+            c.xy([[0, 1], [2, 3]], 0.2)
+            c.b([[0, 2]], 0.3)
+        if k == 0:
+            states.append(amp)
+            continue
+        c.run_circuit(amp)
+        states.append(c.statevector.copy())
+    return np.array(states)
+
+
+def test_propagator():
+    amp = kron(ONE, ZERO, ONE, ZERO).astype("complex")
+    expected = reference_states(4, 5, amp)
+
+    prop = Propagator(trotter_step())
+    assert_array_almost_equal(np.array(list(prop.evolve(amp, 5))), expected)
+    assert_array_almost_equal(prop.states(amp, 5), expected)
+    assert_array_almost_equal(prop.states(amp, [1, 3, 4]), expected[[1, 3, 4]])
+    assert_array_almost_equal(prop.apply(amp, 3), expected[3])
+
+
+def test_propagator_spectral():
+    amp = kron(ONE, ZERO, ONE, ZERO).astype("complex")
+    expected = reference_states(4, 5, amp)
+
+    prop = Propagator(trotter_step(), spectral=True)
+    u = prop.matrix()
+    assert_array_almost_equal(u.conj().T @ u, np.eye(16))
+    assert_array_almost_equal(prop.states(amp, 5), expected)
+    assert_array_almost_equal(prop.states(amp, [4, 2]), expected[[4, 2]])
+    assert_array_almost_equal(prop.apply(amp, 5), expected[5])
+
+
+def test_propagator_measurement():
+    c = trotter_step()
+    c.m(0)
+    with pytest.raises(ValueError):
+        Propagator(c)
@@ -6,6 +6,7 @@ author: Dylan Jones
 project: qsim
 version: 1.0
 """
+import pytest
 import numpy as np
 from numpy.testing import assert_array_equal, assert_array_almost_equal
 from qsim.core.gates import *
@@ -160,3 +161,84 @@ def test_b_gate():
     g = b_gatefunc([0, 1], 2, 1.5*np.pi)
     b = 1j * np.diag([1, -1, -1, 1])
     assert_array_almost_equal(g, b, decimal=10)
+
+
+def test_gate_cache():
+    cache = GateCache(maxsize=2)
+    calls = list()
+
+    def build(x):
+        calls.append(x)
+        return np.eye(2) * x
+
+    cache.get("a", build, 1)
+    value = cache.get("a", build, 1)
+    assert calls == [1]
+    assert not value.flags.writeable
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.get("b", build, 2)
+    cache.get("c", build, 3)
+    assert len(cache) == 2
+    assert "a" not in cache
+    assert cache.nbytes == 2 * np.eye(2).nbytes
+
+    cache = GateCache(maxbytes=np.eye(2).nbytes)
+    cache.get("a", build, 1)
+    cache.get("b", build, 2)
+    assert len(cache) == 1 and "b" in cache
+
+    cache = GateCache()
+    cache.get(("matrix", "cX", 1), build, 1)
+    cache.get(("local", "x", "permutation"), build, 2)
+    cache.get(("matrix", "Y", 1), build, 3)
+    cache.invalidate("X")
+    assert list(cache._items) == [("matrix", "Y", 1)]
+    assert cache.nbytes == np.eye(2).nbytes
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+def test_xy_closed_form():
+    for arg in [0.1, 0.37, 1.3]:
+        notc = cgate(1, 0, X_GATE, 2)
+        crx = cgate(0, 1, rx_gate(4 * arg), 2)
+        assert_array_almost_equal(xy_gate(arg), notc.dot(crx.dot(notc)), decimal=10)
+
+    g = xy_gatefunc([2, 0], 3, 0.3)
+    notc = cgate(0, 2, X_GATE, 3)
+    crx = cgate(2, 0, rx_gate(1.2), 3)
+    assert_array_almost_equal(g, notc.dot(crx.dot(notc)), decimal=10)
+
+
+def test_expand_gate():
+    g = expand_gate(X_GATE, [1], 2)
+    assert_array_equal(g, single_gate(1, X_GATE, 2))
+
+    g = expand_gate(cgate(0, 1, X_GATE, 2), [2, 0], 3)
+    assert_array_equal(g, cgate(2, 0, X_GATE, 3))
+
+
+def test_gate_registry():
+    for name, spec in GATE_REGISTRY.items():
+        if spec.is_diagonal:
+            assert_array_almost_equal(np.diag(spec.diagonal(0.3)), spec.local_matrix(0.3))
+        if spec.is_permutation:
+            perm, phases = spec.permutation(0.3)
+            matrix = np.eye(len(perm))[perm]
+            if phases is not None:
+                matrix = phases[:, np.newaxis] * matrix
+            assert_array_almost_equal(matrix, spec.local_matrix(0.3))
+        if spec.generator is not None:
+            assert_array_almost_equal(expm(-1j * 0.3 * spec.generator), spec.local_matrix(0.3))
+        if spec.hermitian:
+            matrix = spec.local_matrix()
+            assert_array_almost_equal(matrix, matrix.conj().T)
+
+    assert GATE_REGISTRY["rz"].kernel == "diagonal"
+    assert GATE_REGISTRY["swap"].kernel == "permutation"
+    assert GATE_REGISTRY["h"].kernel == "matrix"
+    with pytest.raises(KeyError):
+        get_gate_spec("unknown")
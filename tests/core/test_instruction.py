@@ -6,6 +6,11 @@ author: Dylan Jones
 project: qsim
 version: 1.0
 """
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from qsim.core.register import Qubit
+from qsim.core.gates import rx_gate
 from qsim.core.instruction import ParameterMap, Instruction, Measurement, Gate
 
 
@@ -15,10 +20,64 @@ def test_parameter_map():
     pmap.add(200)
     pmap.add()
     pmap.add(idx=[0])
-    assert pmap.params == [100, 200]
-    assert pmap.indices == [[0], [1], None, [0]]
-    assert pmap.args == [[100], [200], None, [100]]
+    assert_array_equal(pmap.params, [100, 200])
+    assert [None if i is None else list(i) for i in pmap.indices] == [[0], [1], None, [0]]
+    args = pmap.args
+    assert args[2] is None
+    assert_array_equal(args[0], [100])
+    assert_array_equal(args[3], [100])
 
+    version = pmap.version
     pmap[0] = 50
-    assert pmap.params == [50, 200]
-    assert pmap.args == [[50], [200], None, [50]]
+    assert_array_equal(pmap.params, [50, 200])
+    assert pmap.version == version + 1
+    assert_array_equal(pmap.get(3), [50])
+
+    pmap.set([1.5, 2.5])
+    assert_array_equal(pmap.get(0), [1.5])
+    assert_array_equal(pmap.get(1), [2.5])
+    pmap.set([1.0])
+    with pytest.raises(IndexError):
+        pmap.get(1)
+
+
+def test_bind():
+    gate = Gate.rx(Qubit(0), arg=0.3)
+    assert not gate.is_bound
+    assert_array_equal(gate.args, [0.3])
+
+    pmap = ParameterMap()
+    pmap.add(1.0)
+    gate.bind(pmap)
+    assert gate.is_bound
+    assert_array_equal(gate.argidx, [1])
+    assert_array_equal(pmap.params, [1.0, 0.3])
+
+    linked = Gate.ry(Qubit(1), argidx=0)
+    linked.bind(pmap)
+    assert_array_equal(linked.args, [1.0])
+    pmap.set([2.0, 0.5])
+    assert_array_equal(linked.args, [2.0])
+    assert_array_equal(gate.args, [0.5])
+
+
+def test_gate_cache_params():
+    pmap = ParameterMap()
+    gate = Gate.rx(Qubit(0), arg=0.0)
+    gate.bind(pmap)
+    idx = gate.argidx[0]
+    assert_array_almost_equal(gate.build_matrix(1), rx_gate(0.0))
+    pmap[idx] = np.pi
+    assert_array_almost_equal(gate.build_matrix(1), rx_gate(np.pi))
+    assert_array_almost_equal(gate.local_matrices()[0][1], rx_gate(np.pi))
+
+
+def test_gate_cache_read_only():
+    gate = Gate.x(Qubit(0))
+    matrix = gate.build_matrix(2)
+    with pytest.raises(ValueError):
+        matrix[0, 0] = 99
+    assert_array_equal(gate.build_matrix(2), Gate.x(Qubit(0)).build_matrix(2))
+    assert matrix[0, 0] == 0
+    with pytest.raises(ValueError):
+        gate.local_matrices()[0][1][0, 0] = 99
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from qsim.core.utils import kron, pauli, expectation, ZERO, ONE, PLUS
+from qsim.core.gates import X_GATE, Z_GATE, HADAMARD_GATE, rx_gate, rz_gate, rz_diag
+from qsim.core.gates import single_gate, cgate
+from qsim.core.gates import Y_GATE, xy_gatefunc, b_gatefunc, b_diag, swap_gate
+from qsim.core.gates import x_perm, y_perm, swap_perm
+from qsim.core.kernels import apply_matrix, apply_controlled, apply_diagonal, apply_permutation
+from qsim.core.kernels import parity, sample_indices
+from qsim.core.kernels import pauli_expectation, pauli_sum_expectation
+
+PAULI = dict(zip("IXYZ", pauli))
+
+
+def random_state(n, seed=0):
+    rng = np.random.RandomState(seed)
+    amp = rng.normal(size=2 ** n) + 1j * rng.normal(size=2 ** n)
+    return amp / np.linalg.norm(amp)
+
+
+def test_apply_matrix():
+    amp = kron(ZERO, ZERO, ZERO)
+    res = apply_matrix(amp, 3, X_GATE, [1])
+    assert_array_almost_equal(res, kron(ZERO, ONE, ZERO))
+
+    res = apply_matrix(amp, 3, HADAMARD_GATE, [2])
+    assert_array_almost_equal(res, kron(ZERO, ZERO, PLUS))
+
+    amp = random_state(4)
+    for q in range(4):
+        expected = single_gate(q, rx_gate(0.3), 4).dot(amp)
+        assert_array_almost_equal(apply_matrix(amp, 4, rx_gate(0.3), [q]), expected)
+
+
+def test_apply_matrix_two_qubit():
+    amp = random_state(4)
+    for qubits in [[0, 1], [1, 3], [3, 0], [2, 1]]:
+        expected = xy_gatefunc(qubits, 4, 0.4).dot(amp)
+        res = apply_matrix(amp, 4, xy_gatefunc([0, 1], 2, 0.4), qubits)
+        assert_array_almost_equal(res, expected)
+
+
+def test_apply_controlled():
+    amp = random_state(4)
+    for con, t, trigger in [([0], 1, 1), ([2], 0, 0), ([0, 3], 1, 1), ([3, 1], 2, 0)]:
+        expected = cgate(con, t, rx_gate(0.7), 4, trigger).dot(amp)
+        res = apply_controlled(amp.copy(), 4, rx_gate(0.7), [t], con, trigger)
+        assert_array_almost_equal(res, expected)
+
+    amp = kron(ONE, ZERO).astype("float")
+    res = apply_controlled(amp, 2, X_GATE, [1], [0])
+    assert_array_almost_equal(res, kron(ONE, ONE))
+
+
+def test_kernels_inplace():
+    kernels = [(apply_controlled, (rx_gate(0.3), [1], [0])),
+               (apply_diagonal, (rz_diag(0.3), [1])),
+               (apply_permutation, x_perm() + ([2], [0]))]
+    for func, args in kernels:
+        amp = random_state(3)
+        initial = amp.copy()
+        # By default all kernels return a new array and leave the input unchanged
+        res = func(amp, 3, *args)
+        assert res is not amp
+        assert_array_equal(amp, initial)
+        out = func(amp, 3, *args, inplace=True)
+        assert_array_almost_equal(out, res)
+        assert out is amp
+
+    amp = random_state(3)
+    initial = amp.copy()
+    assert apply_matrix(amp, 3, HADAMARD_GATE, [0]) is not amp
+    assert_array_equal(amp, initial)
+
+
+def test_apply_diagonal():
+    amp = random_state(3)
+    for q in range(3):
+        expected = single_gate(q, rz_gate(0.3), 3).dot(amp)
+        assert_array_almost_equal(apply_diagonal(amp.copy(), 3, rz_diag(0.3), [q]), expected)
+
+    diag = np.array([1, 2, 3, 4])
+    for qubits in [[0, 2], [2, 0], [1, 2]]:
+        expected = apply_matrix(amp, 3, np.diag(diag), qubits)
+        assert_array_almost_equal(apply_diagonal(amp.copy(), 3, diag, qubits), expected)
+
+    expected = b_gatefunc([0, 2], 3, 0.4).dot(amp)
+    assert_array_almost_equal(apply_diagonal(amp.copy(), 3, b_diag(0.4), [0, 2]), expected)
+
+    expected = cgate([2], 0, Z_GATE, 3, trigger=0).dot(amp)
+    assert_array_almost_equal(apply_diagonal(amp.copy(), 3, [1, -1], [0], [2], 0), expected)
+
+
+def test_apply_permutation():
+    amp = random_state(3)
+    for q in range(3):
+        expected = single_gate(q, X_GATE, 3).dot(amp)
+        assert_array_almost_equal(apply_permutation(amp.copy(), 3, *x_perm(), [q]), expected)
+        expected = single_gate(q, Y_GATE, 3).dot(amp)
+        assert_array_almost_equal(apply_permutation(amp.copy(), 3, *y_perm(), [q]), expected)
+
+    for qubits in [[0, 1], [2, 0], [1, 2]]:
+        expected = apply_matrix(amp, 3, swap_gate(), qubits)
+        assert_array_almost_equal(apply_permutation(amp.copy(), 3, *swap_perm(), qubits), expected)
+
+    # Controlled (CX, CCX) and batched application
+    amp = random_state(4)
+    for con, t, trigger in [([0], 1, 1), ([3], 0, 0), ([0, 2], 3, 1), ([3, 1], 2, 0)]:
+        expected = cgate(con, t, X_GATE, 4, trigger).dot(amp)
+        res = apply_permutation(amp.copy(), 4, *x_perm(), [t], con, trigger)
+        assert_array_almost_equal(res, expected)
+
+    amps = np.array([random_state(3, seed) for seed in range(3)])
+    expected = np.array([apply_matrix(a, 3, Y_GATE, [1]) for a in amps])
+    assert_array_almost_equal(apply_permutation(amps.copy(), 3, *y_perm(), [1]), expected)
+
+
+def test_parity():
+    assert parity(0) == 0
+    assert parity(0b1011) == 1
+    assert list(parity([0, 1, 2, 3, 7])) == [0, 1, 1, 0, 1]
+
+
+def test_pauli_expectation():
+    amp = random_state(4)
+    for string in ["XIZY", "IIII", "YYYY", "ZIIX", "IXYI"]:
+        op = kron([PAULI[c] for c in string])
+        expected = expectation(op, amp)
+        assert abs(pauli_expectation(amp, 4, string) - expected) < 1e-10
+
+    expected = expectation(kron(PAULI["Y"], PAULI["I"], PAULI["X"], PAULI["I"]), amp)
+    assert abs(pauli_expectation(amp, 4, {0: "y", 2: "x"}) - expected) < 1e-10
+
+    for qubit in (4, -1):
+        with pytest.raises(ValueError):
+            pauli_expectation(amp, 4, {qubit: "Z"})
+
+
+def test_pauli_sum_expectation():
+    amp = random_state(3)
+    terms = [(0.5, "XXI"), (-1.5, "YYZ"), (2.0, "ZIZ"), (0.3, "XYI")]
+    op = sum(c * kron([PAULI[x] for x in s]) for c, s in terms)
+    assert abs(pauli_sum_expectation(amp, 3, terms) - expectation(op, amp)) < 1e-10
+
+
+def test_sample_indices():
+    samples = sample_indices([0, 1, 0, 0], 50)
+    assert np.all(samples == 1)
+
+    samples = sample_indices([[0.5, 0.5, 0, 0], [0, 0, 0, 1]], 1000)
+    assert samples.shape == (2, 1000)
+    assert set(samples[0]) == {0, 1}
+    assert np.all(samples[1] == 3)
+
+    probs = [[0.5, 0.5, 0, 0], [0.25, 0.25, 0.25, 0.25]]
+    samples = sample_indices(probs, 100, np.random.default_rng(1))
+    assert_array_equal(samples, sample_indices(probs, 100, np.random.default_rng(1)))
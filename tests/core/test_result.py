@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from qsim.core.circuit import Circuit
+from qsim.core.result import Result
+
+
+def bell_circuit(arg=0.0):
+    c = Circuit(2, 3)
+    c.h(0)
+    c.cx(0, 1)
+    c.rz(1, arg)
+    c.mz([0, 1])
+    return c
+
+
+def test_concat():
+    c = bell_circuit()
+    a = c.run(50, seed=1)
+    b = c.run(30, seed=2)
+    assert a.circuit_hash == b.circuit_hash == c.fingerprint()
+    assert len(a.seeds) == 1
+
+    res = a + b
+    assert res.format == "raw" and res.n_samples == 80
+    assert_array_equal(res.data, np.concatenate([a.data, b.data]))
+    assert res.seeds == a.seeds + b.seeds
+    assert res.circuit_hash == c.fingerprint()
+
+    # Merging is associative and yields the most compact representation
+    d = c.run(20, seed=3, format="counts")
+    for merged in ((a + b) + d, a + (b + d), Result.concat([a, b, d]), sum([a, b, d])):
+        assert merged.format == "counts" and merged.n_samples == 100
+        assert_array_almost_equal(merged.mean(), Result.concat([a, b, d.convert("raw")]).mean())
+        assert len(merged.seeds) == 3
+
+    with pytest.raises(ValueError):
+        Result.concat([a, bell_circuit(0.5).run(10)])
+    with pytest.raises(ValueError):
+        Result.concat([a, Result(np.ones((10, 3)))])
+
+
+def test_seed_local_generator():
+    terminal = bell_circuit()
+    mid = Circuit(2, 2)
+    mid.h(0)
+    mid.mz(0)
+    mid.cx(0, 1)
+    mid.mz(1)
+    for c in (terminal, mid):
+        np.random.seed(0)
+        state = np.random.get_state()[1].copy()
+        a = c.run(50, seed=1)
+        # The global random state of numpy isn't reseeded by the run
+        assert_array_equal(np.random.get_state()[1], state)
+        assert_array_equal(a.data, c.run(50, seed=1).data)
+        assert a.seeds == c.run(50, seed=1).seeds
+
+        # Streams draw all chunks from one local generator as well
+        np.random.seed(0)
+        chunks = [res.data for res in c.stream(chunk_size=20, shots=50, seed=1)]
+        assert_array_equal(np.random.get_state()[1], state)
+        assert_array_equal(np.concatenate(chunks), a.data)
+
+
+def test_fingerprint():
+    c = bell_circuit(0.1)
+    fingerprint = c.fingerprint()
+    assert fingerprint == bell_circuit(0.1).fingerprint()
+    assert fingerprint != bell_circuit(0.2).fingerprint()
+    c.set_params([0.2])
+    assert c.fingerprint() == bell_circuit(0.2).fingerprint()
+
+
+def test_run_parallel_counts():
+    c = Circuit(2, 2)
+    c.h(0)
+    c.mz(0)
+    c.cx(0, 1)
+    c.mz(1)
+    raw = c.run(40, workers=2, seed=1)
+    counts = c.run(40, workers=2, seed=1, format="counts")
+    assert counts.format == "counts" and len(counts.seeds) == 2
+    assert counts.circuit_hash == c.fingerprint()
+    assert_array_equal(counts.histogram()[1], raw.histogram()[1])
+
+
+def test_wide_histogram():
+    # 70 clbits don't fit into integers, the histogram counts the packed rows
+    data = np.ones((5, 70))
+    data[:2, 0] = -1
+    data[4, 69] = -1
+    res = Result(data)
+    for r in (res, res.convert("packed")):
+        bins, hist = r.histogram(normalize=False)
+        assert_array_equal(bins, res.packed()[[2, 4, 0]])
+        assert_array_equal(hist, [2, 1, 2])
+    with pytest.raises(ValueError):
+        res.histogram(sparse=False)
+
+
+def test_wide_counts():
+    # The counts representation stores 64-bit outcomes
+    res = Result(np.ones((5, 70)))
+    with pytest.raises(ValueError, match="packed"):
+        res.convert("counts")
+    c = Circuit(2, 70)
+    c.h(0)
+    c.mz([0, 1], [0, 69])
+    with pytest.raises(ValueError, match="packed"):
+        c.run(10, format="counts")
+    assert c.run(10, format="packed").shape == (10, 70)
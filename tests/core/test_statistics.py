@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from qsim.core.circuit import Circuit, Result
+from qsim.core.statistics import RunningStatistics, ShotSpill, adaptive_estimate
+
+
+def test_running_statistics():
+    data = np.random.choice([-1.0, 1.0], size=(300, 3))
+    data[:, 2] = np.nan
+    full = Result(data)
+
+    stats = RunningStatistics(3)
+    stats.update(Result(data[:100]))
+    stats.update(Result(data[100:200]).convert("packed"))
+    stats.update(Result(data[200:]).convert("counts"))
+    assert stats.n_samples == 300
+    assert_array_almost_equal(stats.mean(), full.mean())
+    assert_array_almost_equal(stats.variance()[:2], np.var(data[:, :2], axis=0, ddof=1))
+    stderr = np.std(data[:, :2], axis=0, ddof=1) / np.sqrt(300)
+    assert_array_almost_equal(stats.stderr()[:2], stderr)
+    assert np.isnan(stats.stderr()[2])
+
+    outcomes, counts = full.outcomes()
+    assert_array_equal(stats.outcomes()[0], outcomes)
+    assert_array_equal(stats.outcomes()[1], counts)
+    assert_array_almost_equal(stats.histogram()[1], full.convert("counts").histogram()[1])
+
+
+def test_running_statistics_wide():
+    data = np.random.choice([-1.0, 1.0], size=(200, 70))
+    data[:, 1:] = 1.0
+    full = Result(data)
+    stats = RunningStatistics(70)
+    stats.update(Result(data[:50]))
+    stats.update(Result(data[50:]).convert("packed"))
+    bins, hist = stats.histogram(normalize=False)
+    expected = full.histogram(normalize=False)
+    assert_array_equal(bins, expected[0])
+    assert_array_equal(hist, expected[1])
+
+
+def test_shot_spill(tmp_path):
+    spill = ShotSpill(tmp_path / "shots", 3, "float")
+    assert spill.file.endswith(".npy")
+    chunks = [np.random.random((n, 3)) for n in (5, 1, 1000)]
+    spill.write(chunks[0])
+    assert_array_equal(spill.load(), chunks[0])
+    for chunk in chunks[1:]:
+        spill.write(chunk)
+    spill.close()
+    assert spill.closed
+    data = np.load(spill.file, mmap_mode="r")
+    assert isinstance(data, np.memmap)
+    assert_array_equal(data, np.concatenate(chunks))
+
+
+def test_estimate():
+    c = Circuit(2, 2)
+    c.h(0)
+    c.cx(0, 1)
+    c.mz([0, 1])
+    # The parity of a Bell state has zero sample variance, the bounded variance
+    # still requires a few hundred shots
+    est = c.estimate([0, 1], target=0.01, initial_shots=50)
+    assert est.value == 1 and 0 < est.stderr <= 0.01
+    assert 200 < est.shots < 1000 and est.batches > 1 and est.converged
+    est = c.estimate([0, 1], target=0.1, min_shots=500)
+    assert est.converged and est.shots >= 500
+
+    est = c.estimate(0, target=0.02)
+    assert est.converged and est.stderr <= 0.02
+    assert 1500 < est.shots < 5000 and est.batches > 1
+    assert abs(est.value) < 0.1
+    a, b = c.estimate(0, target=0.05, seed=1), c.estimate(0, target=0.05, seed=1)
+    assert (a.value, a.shots) == (b.value, b.shots)
+
+    est = c.estimate(lambda data: data[:, 0] + data[:, 1], target=0.05, confidence=0.95)
+    assert est.converged
+    lo, hi = est.interval(0.95)
+    assert hi - lo <= 0.1 + 1e-10
+
+    est = c.estimate(1, target=1e-4, max_shots=1000)
+    assert not est.converged and est.shots == 1000
+
+
+def test_estimate_rare_outcome():
+    p = 0.02
+    rng = np.random.default_rng(0)
+    calls = list()
+
+    def sampler(shots):
+        # The rare outcome doesn't occur in the first batch
+        data = np.ones((shots, 1))
+        if calls:
+            data[rng.random(shots) < p] = -1
+        calls.append(shots)
+        return Result(data)
+
+    est = adaptive_estimate(sampler, 0, target=0.002)
+    assert est.converged and est.batches > 1
+    # The true standard error of the mean 1 - 2p needs about 20 000 shots
+    assert est.shots > 15000
+    assert abs(est.value - (1 - 2 * p)) < 5 * 0.002
+
+
+def test_estimate_invalid_arguments():
+    def sampler(shots):
+        return Result(np.ones((shots, 1)))
+
+    for kwargs in [dict(growth=1.0), dict(target=0.0), dict(min_shots=0)]:
+        kwargs = {"target": 0.1, **kwargs}
+        with pytest.raises(ValueError):
+            adaptive_estimate(sampler, 0, **kwargs)
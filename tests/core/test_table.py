@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import pytest
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from qsim.core.utils import kron, ZERO
+from qsim.core.register import QuRegister, ClRegister
+from qsim.core.instruction import ParameterMap, Instruction, Gate, Measurement
+from qsim.core.backends import apply_gate, apply_kernels
+from qsim.core.table import InstructionTable, GATE, MEASUREMENT
+
+
+def new_table(n=3):
+    return InstructionTable(QuRegister(n), ClRegister(n), ParameterMap())
+
+
+def test_add_gate():
+    table = new_table()
+    argidx = table.pmap.add([0.1, 0.2])
+    g0 = table.add_gate("Rx", [[0], [2]], argidx=argidx)
+    g1 = table.add_gate("X", [[2]], con=[0, 1], trigger=0)
+    g2 = table.add_gate("XY", [[0, 1]], n=2)
+    g3 = table.add_measurement("m", [0, 1], [1, 0], basis="x")
+    assert (g0, g1, g2, g3) == (0, 1, 2, 3)
+    assert len(table) == 4 and table.n_rows == 6
+
+    rows = table.rows
+    assert_array_equal(rows["group"], [0, 0, 1, 2, 3, 3])
+    assert_array_equal(rows["kind"], [GATE] * 4 + [MEASUREMENT] * 2)
+    assert_array_equal(rows["param"], [0, 1, -1, -1, -1, -1])
+    assert_array_equal(rows["targets"][3], [0, 1, 0, 0])
+    assert rows["controls"][2] == 0b011 and rows["trigger"][2] == 0
+    assert_array_equal(table.kinds, [GATE, GATE, GATE, MEASUREMENT])
+
+
+def test_views():
+    table = new_table()
+    table.add_gate("Rx", [[0], [2]], argidx=table.pmap.add([0.1, 0.2]))
+    table.add_gate("X", [[2]], con=[0, 1], trigger=0)
+    table.add_measurement("m", [0, 1], [1, 0], basis="x")
+
+    gate = table[0]
+    assert isinstance(gate, Gate)
+    assert gate.qu_indices == [0, 2]
+    assert_array_almost_equal(gate.args, [0.1, 0.2])
+    table.pmap.set([0.5, 0.6])
+    assert_array_almost_equal(gate.args, [0.5, 0.6])
+
+    gate = table[1]
+    assert gate.name == "ccX" and gate.con_indices == [0, 1] and gate.con_trigger == 0
+
+    m = table[-1]
+    assert isinstance(m, Measurement)
+    assert m.qu_indices == [0, 1] and m.cl_indices == [1, 0] and m.basis == "x"
+    assert table.to_dict(2) == m.to_dict()
+
+    ref = table.ref(0)
+    assert ref._inst is None
+    assert ref.qu_indices == [0, 2]
+
+
+def test_views_read_only():
+    table = new_table()
+    table.add_gate("Rx", [[0]], argidx=table.pmap.add([0.1]))
+    table.add_measurement("m", [0], [0])
+    index = Instruction.INDEX
+    for _ in range(3):
+        views = list(table)
+    # Views are created once and don't count as new instructions
+    assert Instruction.INDEX == index
+    assert table[0] is views[0] and table[0].idx == 0
+    with pytest.raises(AttributeError):
+        table[0].name = "ry"
+    assert table[0].name == "Rx"
+
+    # The converted rows are kept until the table is modified
+    list(table.steps())
+    records = table._records
+    list(table.steps())
+    assert table._records is records
+    table.add_gate("X", [[1]])
+    assert table._records is None
+    assert len(list(table.steps())) == 3
+
+
+def test_kernels():
+    table = new_table()
+    table.add_gate("H", [[0], [1], [2]])
+    table.add_gate("Ry", [[1]], argidx=table.pmap.add([0.4]))
+    table.add_gate("X", [[2]], con=[1])
+    table.add_gate("Rz", [[0]], con=[2], trigger=0, argidx=table.pmap.add([0.3]))
+    table.add_gate("SWAP", [[0, 2]], n=2)
+    table.add_gate("XY", [[1, 2]], n=2, argidx=table.pmap.add([0.7]))
+
+    amp1 = kron([ZERO] * 3).astype("complex")
+    amp2 = amp1.copy()
+    for group, gate in enumerate(table):
+        amp1 = apply_kernels(amp1, 3, table.kernels(group))
+        amp2 = apply_gate(amp2, 3, gate)
+    assert_array_almost_equal(amp1, amp2)
@@ -143,3 +143,36 @@ def test_get_info():
 
     x = get_info(string, "f")
     assert x == ""
+
+
+def test_pack_binary():
+    binary = np.array([[1, 0, 1, 1, 0, 0, 0, 0, 1, 1], [0, 0, 0, 0, 0, 0, 0, 0, 0, 1]])
+    packed = pack_binary(binary)
+    assert packed.shape == (2, 2) and packed.dtype == np.uint8
+    assert_array_equal(unpack_binary(packed, 10), binary)
+    assert_array_equal(packed_to_int(packed, 10), [0b1011000011, 1])
+    assert_array_equal(int_to_binary([0b1011000011, 1], 10), binary)
+
+
+def test_binary_histogram():
+    data = np.array([[0, 1, 1], [1, 0, 0], [0, 1, 1], [0, 0, 0]])
+    bins, hist = binary_histogram(data, normalize=False)
+    assert_array_equal(bins, np.arange(8))
+    assert_array_equal(hist, [1, 0, 0, 2, 1, 0, 0, 0])
+    bins, hist = binary_histogram(data, sparse=True)
+    assert_array_equal(bins, [0, 3, 4])
+    assert_array_almost_equal(hist, [0.25, 0.5, 0.25])
+
+    # Wide registers automatically use the sparse histogram
+    data = np.zeros((5, 40))
+    data[:2, 0] = 1
+    bins, hist = binary_histogram(data, normalize=False)
+    assert_array_equal(bins, [0, 2 ** 39])
+    assert_array_equal(hist, [3, 2])
+
+    # Outcomes of more than 64 bits are counted as rows of packed bytes
+    data = np.zeros((5, 70))
+    data[:2, 0] = 1
+    bins, hist = binary_histogram(data, normalize=False)
+    assert_array_equal(bins, pack_binary(data[[2, 0]]))
+    assert_array_equal(hist, [3, 2])
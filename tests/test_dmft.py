@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import numpy as np
+from qsim.core.utils import kron, ZERO, ONE
+from qsim.core.gates import X_GATE, Y_GATE
+from qsim.core.circuit import Circuit
+from qsim.core.evolution import Propagator
+from qsim.dmft import measure_correlators, greens_function, gf_greater, gf_lesser
+
+
+def test_measure_correlators():
+    c = Circuit(3, 0)
+    c.xy([[0, 1], [1, 2]], 0.3)
+    c.b([[0, 2]], 0.2)
+    c.rz(1, 0.4)
+    amp = kron(ONE, ZERO, ONE).astype("complex")
+    eye = np.eye(4)
+    sigma = {"x": kron(X_GATE, eye), "y": kron(Y_GATE, eye)}
+
+    for spectral in (False, True):
+        prop = Propagator(c, spectral=spectral)
+        u = prop.matrix()
+        data_im = measure_correlators(prop, amp, 4)
+        data_re = measure_correlators(prop, amp, 4, imag=False)
+        assert data_im.shape == (5, 4)
+        assert not np.iscomplexobj(data_im)
+        for i, (a, b) in enumerate(["xx", "xy", "yx", "yy"]):
+            for k in range(5):
+                uk = np.linalg.matrix_power(u, k)
+                expected = amp.conj() @ uk.conj().T @ sigma[b] @ uk @ sigma[a] @ amp
+                assert abs(data_im[k, i] - expected.real) < 1e-10
+                assert abs(data_re[k, i] - expected.imag) < 1e-10
+
+    gf = greens_function(data_im)
+    for k, (xx, xy, yx, yy) in enumerate(data_im):
+        assert abs(gf[k] - (gf_greater(xx, yx, xy, yy) - gf_lesser(xx, xy, yx, yy))) < 1e-10
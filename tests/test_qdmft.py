@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 16 Oct 2026
+author: Dylan Jones
+
+project: qsim
+version: 1.0
+"""
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from qsim.core.utils import kron, ZERO
+from dmft import TwoSiteSiam
+import qdmft
+
+
+def random_groundstate(seed=0):
+    rng = np.random.RandomState(seed)
+    amp = rng.normal(size=16) + 1j * rng.normal(size=16)
+    return kron(ZERO, amp / np.linalg.norm(amp))
+
+
+def hadamard_data(gs, nt, tmax, siam, imag=True):
+    dt = tmax / nt
+    xy_arg, b_arg = dt * siam.v / 2, dt * siam.u / 4
+    data = np.zeros((nt + 1, 4))
+    for step in range(nt + 1):
+        for i, (a, b) in enumerate(["xx", "xy", "yx", "yy"]):
+            data[step, i] = qdmft._measure(gs, xy_arg, b_arg, step, a, b, imag)
+    return data
+
+
+def test_measure_data_cached():
+    siam = TwoSiteSiam(u=4, eps_imp=0, eps_bath=0, v=1, mu=2)
+    gs = random_groundstate()
+    cache = qdmft.PrefixCache(interval=2)
+    dt = 0.5
+    xy_arg, b_arg = dt * siam.v / 2, dt * siam.u / 4
+    for step in range(4):
+        for a, b in ["xx", "xy", "yx", "yy"]:
+            expected = qdmft._measure(gs, xy_arg, b_arg, step, a, b)
+            value = qdmft._measure(gs, xy_arg, b_arg, step, a, b, cache=cache)
+            assert abs(value - expected) < 1e-10
+
+
+def test_measure_data_exact():
+    siam = TwoSiteSiam(u=4, eps_imp=0, eps_bath=0, v=1, mu=2)
+    gs = random_groundstate()
+    for imag in (True, False):
+        times, data = qdmft.measure_data(siam, gs, nt=4, tmax=2, imag=imag)
+        assert_array_almost_equal(times, np.arange(5) * 0.5)
+        assert_array_almost_equal(data, hadamard_data(gs, 4, 2, siam, imag))
+
+
+def test_measure_data_estimate():
+    np.random.seed(0)
+    siam = TwoSiteSiam(u=4, eps_imp=0, eps_bath=0, v=1, mu=2)
+    gs = random_groundstate()
+    _, exact = qdmft.measure_data(siam, gs, nt=2, tmax=1, imag=False)
+    _, data = qdmft.measure_data(siam, gs, nt=2, tmax=1, imag=False, target=0.02)
+    assert np.all(np.abs(data - exact) < 5 * 0.02)